@@ -0,0 +1,799 @@
+#!/usr/bin/env python3
+"""
+性能基准脚本
+在合成的大型 Logseq 图谱上测量转换各阶段的耗时
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+# 添加项目根目录到路径，以便正确导入 src 模块
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.asset_copier import AssetCopier
+from src.conversion_pipeline import ConversionPipeline
+from src.converter import ConversionOptions, Converter
+from src.file_manager import FileManager
+from src.logseq_parser import LogseqParser
+from src.obsidian_formatter import EdnReader, FormatContext, ObsidianFormatter
+from src.storage import MemoryStorage, NullStorage
+
+
+def generate_synthetic_graph(target_dir, pages=2000, blocks_per_page=40, seed=42):
+    """生成合成的 Logseq 图谱（pages + journals），包含页面链接、块引用和块ID"""
+    rng = random.Random(seed)
+    pages_dir = target_dir / "pages"
+    journals_dir = target_dir / "journals"
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    journals_dir.mkdir(parents=True, exist_ok=True)
+
+    uuids = [
+        f"{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}" for i in range(pages * 2)
+    ]
+    page_names = [f"page_{i}" for i in range(pages)]
+
+    for i in range(pages):
+        lines = ["tags:: [[synthetic]], [[benchmark]]", "type:: note", ""]
+        for j in range(blocks_per_page):
+            indent = "  " * (j % 3)
+            link = page_names[rng.randrange(pages)]
+            text = f"{indent}- Block {j} of page {i} mentions [[{link}]] and some plain text"
+            if j % 7 == 0:
+                text += f" see (({uuids[rng.randrange(len(uuids))]}))"
+            if j % 11 == 0:
+                text += f" ![image](../assets/image_{i}_{j}.png)"
+            lines.append(text)
+            if j % 5 == 0:
+                lines.append(
+                    f"{indent}  id:: {uuids[(i * blocks_per_page + j) % len(uuids)]}"
+                )
+
+        if i % 4 == 0:
+            target = journals_dir / f"2024_{(i % 12) + 1:02d}_{(i % 28) + 1:02d}_{i}.md"
+        else:
+            target = pages_dir / f"{page_names[i]}.md"
+        target.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    return target_dir
+
+
+def run_legacy_three_pass(logseq_dir, output_dir):
+    """旧版驱动：三次完整解析整个图谱"""
+    parser = LogseqParser()
+    formatter = ObsidianFormatter(input_assets_dir=logseq_dir / "assets")
+    file_manager = FileManager(output_dir, dry_run=True)
+    md_files = file_manager.list_logseq_files(logseq_dir)
+
+    for md_file in md_files:
+        formatter.collect_referenced_uuids(parser.parse_file(md_file))
+
+    formatter.collect_pdf_highlights(str(logseq_dir))
+    for md_file in md_files:
+        parsed_data = parser.parse_file(md_file)
+        formatter.collect_block_mappings(
+            formatter.generate_filename(md_file.stem), parsed_data
+        )
+
+    outputs = {}
+    for md_file in md_files:
+        parsed_data = parser.parse_file(md_file)
+        output_filename = formatter.generate_filename(md_file.stem)
+        relative_path = md_file.relative_to(logseq_dir)
+        detected_folder = formatter.detect_category_folder(parsed_data)
+        if relative_path.parent.name == "journals":
+            subfolder = "Daily Notes"
+        elif detected_folder:
+            subfolder = detected_folder.title()
+        else:
+            subfolder = ""
+        outputs[(subfolder, output_filename)] = formatter.format_content(
+            parsed_data, output_filename, subfolder
+        )
+    return outputs
+
+
+def run_single_parse_pipeline(logseq_dir, output_dir):
+    """新版驱动：ConversionPipeline 每个文件只解析一次"""
+    formatter = ObsidianFormatter(input_assets_dir=logseq_dir / "assets")
+    file_manager = FileManager(output_dir, dry_run=True)
+    md_files = file_manager.list_logseq_files(logseq_dir)
+
+    pipeline = ConversionPipeline(logseq_dir, formatter)
+    pipeline.load(md_files)
+    pipeline.build_indexes()
+
+    return {
+        (task.subfolder, task.output_filename): task.content
+        for task in pipeline.iter_formatted()
+    }
+
+
+def time_call(func, *args, repeat=3):
+    """多次运行取最短耗时"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark_pipeline(args):
+    """对比三次解析的旧驱动与单次解析流水线"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        output_dir = work_dir / "out"
+        print(f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块")
+
+        legacy_time, legacy_out = time_call(
+            run_legacy_three_pass, logseq_dir, output_dir, repeat=args.repeat
+        )
+        pipeline_time, pipeline_out = time_call(
+            run_single_parse_pipeline, logseq_dir, output_dir, repeat=args.repeat
+        )
+
+        print(f"   旧版三次解析: {legacy_time:.3f}s")
+        print(f"   单次解析流水线: {pipeline_time:.3f}s")
+        print(f"   加速比: {legacy_time / pipeline_time:.2f}x")
+        print(f"   输出一致: {'✅' if legacy_out == pipeline_out else '❌'}")
+        return legacy_out == pipeline_out
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def categorize_pages(md_files, eager):
+    """解析每个页面并检测分类文件夹；eager 时像旧版一样提取全部块和引用"""
+    parser = LogseqParser()
+    formatter = ObsidianFormatter(category_tag="wiki", category_folder="wiki")
+    folders = []
+    for md_file in md_files:
+        parsed = parser.parse_file(md_file)
+        if eager:
+            parsed = dict(parsed)
+        folders.append(formatter.detect_category_folder(parsed))
+    return folders
+
+
+def benchmark_lazy_parse(args):
+    """对比提取全部块和引用的解析与按需解析在分类检测上的耗时"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        md_files = FileManager(work_dir / "out", dry_run=True).list_logseq_files(
+            logseq_dir
+        )
+        print(f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块")
+
+        eager_time, eager_out = time_call(
+            categorize_pages, md_files, True, repeat=args.repeat
+        )
+        lazy_time, lazy_out = time_call(
+            categorize_pages, md_files, False, repeat=args.repeat
+        )
+
+        print(f"   完整解析: {eager_time:.3f}s")
+        print(f"   按需解析: {lazy_time:.3f}s")
+        print(f"   加速比: {eager_time / lazy_time:.2f}x")
+        print(f"   结果一致: {'✅' if eager_out == lazy_out else '❌'}")
+        return eager_out == lazy_out
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def categorize_headers(md_files):
+    """只扫描每个页面的头部并检测分类文件夹"""
+    parser = LogseqParser()
+    formatter = ObsidianFormatter(category_tag="wiki", category_folder="wiki")
+    return [
+        formatter.detect_category_folder(parser.scan_header_file(md_file))
+        for md_file in md_files
+    ]
+
+
+def benchmark_header_scan(args):
+    """对比整体解析与只扫描头部在页面分类上的耗时"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        md_files = FileManager(work_dir / "out", dry_run=True).list_logseq_files(
+            logseq_dir
+        )
+        # 一部分页面以分类标签开头
+        for md_file in md_files[::3]:
+            md_file.write_text(
+                "- #wiki\n" + md_file.read_text(encoding="utf-8"), encoding="utf-8"
+            )
+        print(f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块")
+
+        full_time, full_out = time_call(
+            categorize_pages, md_files, True, repeat=args.repeat
+        )
+        lazy_time, lazy_out = time_call(
+            categorize_pages, md_files, False, repeat=args.repeat
+        )
+        header_time, header_out = time_call(
+            categorize_headers, md_files, repeat=args.repeat
+        )
+
+        print(f"   完整解析: {full_time:.3f}s")
+        print(f"   读取全文、按需解析: {lazy_time:.3f}s")
+        print(f"   只扫描头部: {header_time:.3f}s")
+        print(f"   加速比（相对完整解析）: {full_time / header_time:.2f}x")
+        print(f"   分类为 wiki: {full_out.count('wiki')} 个页面")
+        same = full_out == lazy_out == header_out
+        print(f"   结果一致: {'✅' if same else '❌'}")
+        return same
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def benchmark_jobs(args):
+    """对比串行与多进程格式化（含写入）的耗时，并校验输出逐字节一致"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        print(f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块")
+
+        outputs = {}
+        for jobs in sorted({1, args.jobs}):
+            output_dir = work_dir / f"out-{jobs}"
+            options = ConversionOptions(
+                jobs=jobs, copy_assets=False, write_report=False
+            )
+            start = time.perf_counter()
+            Converter(logseq_dir, output_dir, options).run()
+            elapsed = time.perf_counter() - start
+            print(f"   jobs={jobs}: {elapsed:.3f}s")
+            outputs[jobs] = {
+                p.relative_to(output_dir): p.read_bytes()
+                for p in output_dir.rglob("*")
+                if p.is_file()
+            }
+
+        identical = outputs[1] == outputs[args.jobs]
+        print(f"   输出一致: {'✅' if identical else '❌'}")
+        return identical
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def generate_line_corpus(lines=1_000_000, seed=42):
+    """生成行级语料：大部分为普通文本，其余混合页面链接、块引用、嵌入、资源、块ID和引用块"""
+    rng = random.Random(seed)
+    uuids = [f"{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}" for i in range(1000)]
+    templates = [
+        lambda: f"- Block with some plain text and nothing to convert {rng.randrange(10**6)}",
+        lambda: f"  - Another plain line, with (parentheses) and [brackets] {rng.randrange(10**6)}",
+        lambda: "",
+        lambda: f"- Mentions [[page_{rng.randrange(1000)}]] and [[topic/sub {rng.randrange(100)}]]",
+        lambda: f"  - See (({rng.choice(uuids)})) for details",
+        lambda: f"- {{{{embed (({rng.choice(uuids)}))}}}}",
+        lambda: f"- ![image](../assets/image_{rng.randrange(1000)}.png)",
+        lambda: f"  id:: {rng.choice(uuids)}",
+        lambda: "- > A quoted line with [[a link]]",
+    ]
+    weights = [40, 25, 10, 8, 6, 2, 4, 4, 1]
+    return [rng.choices(templates, weights)[0]() for _ in range(lines)]
+
+
+def benchmark_line_engine(args):
+    """对比逐步调用各转换方法与单次扫描的行重写引擎，并校验输出一致"""
+    corpus = generate_line_corpus(args.lines)
+    formatter = ObsidianFormatter()
+    rng = random.Random(0)
+    for line in corpus:
+        if line.strip().startswith("id:: "):
+            uuid = line.strip()[5:]
+            formatter.block_uuid_map[uuid] = (
+                f"page_{rng.randrange(1000)}.md",
+                f"block{len(formatter.block_uuid_map) + 1}",
+            )
+    context = FormatContext(filename="page_1.md", target_folder="Wiki")
+    print(f"📄 行级语料: {len(corpus)} 行")
+
+    def run_stepwise():
+        return [formatter._convert_line_stepwise(line, context) for line in corpus]
+
+    def run_engine():
+        return [formatter._process_line(line, None, context) for line in corpus]
+
+    stepwise_time, stepwise_out = time_call(run_stepwise, repeat=args.repeat)
+    engine_time, engine_out = time_call(run_engine, repeat=args.repeat)
+
+    print(f"   逐步转换: {stepwise_time:.3f}s")
+    print(f"   单次扫描引擎: {engine_time:.3f}s")
+    print(f"   加速比: {stepwise_time / engine_time:.2f}x")
+    print(f"   输出一致: {'✅' if stepwise_out == engine_out else '❌'}")
+    return stepwise_out == engine_out
+
+
+def benchmark_large_file(args):
+    """对比整体读入与 mmap 流式转换单个超大页面的耗时和内存峰值"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = work_dir / "graph"
+        (logseq_dir / "journals").mkdir(parents=True)
+        source = logseq_dir / "journals" / "2024_01_01.md"
+        content = (
+            "tags:: [[inbox]]\n\n" + "\n".join(generate_line_corpus(args.lines)) + "\n"
+        )
+        source.write_text(content, encoding="utf-8")
+        del content
+        print(f"📄 超大页面: {args.lines} 行，{source.stat().st_size / 1e6:.1f} MB")
+
+        outputs = {}
+        for label, threshold in (("整体读入", 0), ("mmap 流式", 1)):
+            output_dir = work_dir / f"out-{threshold}"
+            options = ConversionOptions(
+                copy_assets=False, write_report=False, large_file_threshold=threshold
+            )
+            tracemalloc.start()
+            start = time.perf_counter()
+            Converter(logseq_dir, output_dir, options).run()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"   {label}: {elapsed:.3f}s（含 tracemalloc 开销），内存峰值 {peak / 1e6:.1f} MB"
+            )
+            outputs[threshold] = (
+                output_dir / "Daily Notes" / "2024-01-01.md"
+            ).read_bytes()
+
+        identical = outputs[0] == outputs[1]
+        print(f"   输出一致: {'✅' if identical else '❌'}")
+        return identical
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+@dataclass
+class LegacyBlock:
+    """旧版的块数据结构：普通 dataclass，每个实例带有 __dict__"""
+
+    content: str
+    block_id: Optional[str] = None
+    level: int = 0
+    line_number: int = 0
+
+
+def traced_size(build):
+    """构建对象并返回 (对象, tracemalloc 统计的新增内存)"""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = build()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, after - before
+
+
+def benchmark_parser_memory(args):
+    """对比普通 dataclass、slots dataclass 与按列存储的块表的内存占用"""
+    content = "\n".join(generate_line_corpus(args.lines))
+    parser = LogseqParser()
+    print(f"📄 语料: {args.lines} 行，{len(content) / 1e6:.1f} MB")
+
+    legacy, legacy_size = traced_size(
+        lambda: [
+            LegacyBlock(b.content, b.block_id, b.level, b.line_number)
+            for b in parser.iter_blocks(content)
+        ]
+    )
+    slotted, slotted_size = traced_size(lambda: list(parser.iter_blocks(content)))
+    table, table_size = traced_size(lambda: parser.parse_content(content)["blocks"])
+
+    print(f"   块数: {len(table)}")
+    print(f"   普通 dataclass 列表: {legacy_size / 1e6:.1f} MB")
+    print(f"   slots dataclass 列表: {slotted_size / 1e6:.1f} MB")
+    print(f"   按列存储的块表（含引用等其他解析结果）: {table_size / 1e6:.1f} MB")
+    print(
+        f"   块表每块: {(table.starts.itemsize + table.lengths.itemsize + table.levels.itemsize + table.line_numbers.itemsize)} 字节"
+    )
+
+    same = [(b.content, b.block_id, b.level, b.line_number) for b in legacy] == [
+        (b.content, b.block_id, b.level, b.line_number) for b in table
+    ]
+    print(f"   内容一致: {'✅' if same and slotted == table else '❌'}")
+    return same and slotted == table
+
+
+LEGACY_EDN_PATTERN = r':id #uuid "([^"]+)".*?:page (\d+).*?:position \{:bounding \{:x1 ([^,]+),.*?:y1 ([^,]+),.*?:x2 ([^,]+),.*?:y2 ([^,]+),.*?:width ([^,]+),.*?:height ([^}]+)'
+
+
+def generate_edn(highlights=20000, seed=42):
+    """生成 Logseq PDF 高亮 .edn 内容"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(highlights):
+        page = rng.randrange(1, 500)
+        box = f":x1 {rng.uniform(0, 500):.3f}, :y1 {rng.uniform(0, 700):.3f}, :x2 {rng.uniform(0, 600):.3f}, :y2 {rng.uniform(0, 790):.3f}, :width 612, :height 792"
+        records.append(
+            f'{{:id #uuid "{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}", :page {page}, '
+            f":position {{:bounding {{{box}}}, :rects ({{{box}}} {{{box}}}), :page {page}}}, "
+            f':content {{:text "highlight {i} with some text"}}, :properties {{:color "yellow"}}}}'
+        )
+    return "{:highlights [" + "\n".join(records) + "], :extra {:page 1}}"
+
+
+def parse_edn_legacy(content):
+    """旧版：对整个文件运行 DOTALL 正则"""
+    return [
+        (m.group(1), m.group(2), tuple(float(m.group(i)) for i in range(3, 9)))
+        for m in re.finditer(LEGACY_EDN_PATTERN, content, re.DOTALL)
+    ]
+
+
+def parse_edn_streaming(content):
+    """新版：流式 EdnReader"""
+    coordinate_keys = ("x1", "y1", "x2", "y2", "width", "height")
+    return [
+        (r["id"], r["page"], tuple(r["coordinates"][k] for k in coordinate_keys))
+        for r in EdnReader(io.StringIO(content)).iter_highlights()
+    ]
+
+
+def benchmark_edn(args):
+    """对比 DOTALL 正则与流式 EdnReader 解析高亮 .edn 文件"""
+    content = generate_edn(args.highlights)
+    print(f"📄 .edn 文件: {args.highlights} 条高亮，{len(content) / 1e6:.1f} MB")
+
+    legacy_time, legacy_out = time_call(parse_edn_legacy, content, repeat=args.repeat)
+    streaming_time, streaming_out = time_call(
+        parse_edn_streaming, content, repeat=args.repeat
+    )
+    print(f"   DOTALL 正则: {legacy_time:.3f}s")
+    print(f"   流式解析: {streaming_time:.3f}s")
+    print(f"   输出一致: {'✅' if legacy_out == streaming_out else '❌'}")
+
+    # 末尾一条缺少坐标的记录：正则会从这里一直回溯扫描到文件末尾
+    malformed = (
+        '{:highlights [{:id #uuid "broken", :page 1, :content {:text "x"}}\n'
+        + content[len("{:highlights [") :]
+    )
+    legacy_time, _ = time_call(parse_edn_legacy, malformed, repeat=1)
+    streaming_time, _ = time_call(parse_edn_streaming, malformed, repeat=1)
+    print(f"   开头含残缺记录 - DOTALL 正则: {legacy_time:.3f}s，流式解析: {streaming_time:.3f}s")
+    return legacy_out == streaming_out
+
+
+def benchmark_screenshots(args):
+    """对比逐条 glob 与一次性索引查找高亮截图"""
+    rng = random.Random(42)
+    keys = [
+        (
+            str(rng.randrange(1, 500)),
+            f"{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}",
+        )
+        for i in range(args.highlights)
+    ]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        screenshot_dir = Path(temp_dir)
+        for page, uuid in keys:
+            (screenshot_dir / f"{page}_{uuid}_1690000000000.png").write_bytes(b"")
+        print(f"🖼️  截图目录: {len(keys)} 条高亮，{len(keys)} 张截图")
+
+        def glob_each():
+            return [
+                next(iter(screenshot_dir.glob(f"{page}_{uuid}_*.png")), None)
+                for page, uuid in keys
+            ]
+
+        def index_once():
+            index = ObsidianFormatter._index_screenshots(screenshot_dir)
+            return [index.get(key) for key in keys]
+
+        glob_time, glob_out = time_call(glob_each, repeat=1)
+        index_time, index_out = time_call(index_once, repeat=args.repeat)
+        same = [p.name if p else None for p in glob_out] == index_out
+        print(f"   逐条 glob: {glob_time:.3f}s")
+        print(f"   一次性索引: {index_time:.3f}s")
+        print(f"   加速比: {glob_time / index_time:.1f}x")
+        print(f"   输出一致: {'✅' if same else '❌'}")
+    return same
+
+
+def benchmark_index_cache(args):
+    """对比不使用索引缓存、冷缓存、热缓存以及少量页面变化后构建索引（parse + index）的耗时"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        (logseq_dir / "assets").mkdir(exist_ok=True)
+        (logseq_dir / "assets" / "book.edn").write_text(
+            generate_edn(args.highlights), encoding="utf-8"
+        )
+        md_files = FileManager(work_dir / "out", dry_run=True).list_logseq_files(
+            logseq_dir
+        )
+        cache_path = work_dir / "index.sqlite"
+        print(
+            f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块，{args.highlights} 条 .edn 高亮"
+        )
+
+        def build_indexes(index_cache):
+            options = ConversionOptions(dry_run=True, index_cache=index_cache)
+            converter = Converter(logseq_dir, work_dir / "out", options)
+            start = time.perf_counter()
+            report = converter.validate()
+            return time.perf_counter() - start, report
+
+        baseline_time, baseline = build_indexes(None)
+        cold_time, cold = build_indexes(cache_path)
+        warm_time, warm = min(build_indexes(cache_path) for _ in range(args.repeat))
+
+        # 修改 1% 的页面
+        for md_file in md_files[::100]:
+            with open(md_file, "a", encoding="utf-8") as f:
+                f.write("- 新增的块 ((00000000-0000-4000-8000-000000000000))\n")
+        changed_time, changed = build_indexes(cache_path)
+        expected_time, expected = build_indexes(None)
+
+        print(f"   不使用缓存: {baseline_time:.3f}s")
+        print(f"   冷缓存（首次写入）: {cold_time:.3f}s")
+        print(f"   热缓存: {warm_time:.3f}s（加速比 {baseline_time / warm_time:.1f}x）")
+        print(f"   1% 页面变化后: {changed_time:.3f}s")
+        print(f"   缓存文件: {cache_path.stat().st_size / 1e6:.1f} MB")
+        same = baseline == cold == warm and changed == expected
+        print(f"   结果一致: {'✅' if same else '❌'}")
+        return same
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def benchmark_writer(args):
+    """模拟网络存储的写入延迟，对比格式化后直接写入与后台写入线程"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    write_lines = FileManager.write_lines
+
+    def slow_write_lines(self, *write_args, **kwargs):
+        time.sleep(args.latency / 1000)
+        return write_lines(self, *write_args, **kwargs)
+
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        print(f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块，每次写入延迟 {args.latency}ms")
+
+        FileManager.write_lines = slow_write_lines
+        outputs = {}
+        for threads in (0, args.jobs):
+            output_dir = work_dir / f"out-{threads}"
+            options = ConversionOptions(
+                write_threads=threads, copy_assets=False, write_report=False
+            )
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                Converter(logseq_dir, output_dir, options).run()
+            elapsed = time.perf_counter() - start
+            print(f"   write_threads={threads}: {elapsed:.3f}s")
+            outputs[threads] = {
+                p.relative_to(output_dir): p.read_bytes()
+                for p in output_dir.rglob("*")
+                if p.is_file()
+            }
+
+        identical = outputs[0] == outputs[args.jobs]
+        print(f"   输出一致: {'✅' if identical else '❌'}")
+        return identical
+    finally:
+        FileManager.write_lines = write_lines
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def benchmark_assets(args):
+    """对比逐个 shutil.copy2 与并行资源复制（首次复制、再次运行跳过未变化的文件）"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        assets_dir = work_dir / "assets"
+        rng = random.Random(42)
+        for i in range(args.assets):
+            target = (
+                assets_dir / f"book_{i % 20}" / f"{i}.png"
+                if i % 3
+                else assets_dir / f"file_{i}.pdf"
+            )
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(
+                rng.randbytes(rng.randrange(1, 2 * args.asset_kb * 1024))
+            )
+        total = sum(p.stat().st_size for p in assets_dir.rglob("*") if p.is_file())
+        print(f"📁 资源文件: {args.assets} 个，{total / 1e6:.1f} MB")
+
+        def copy2_each(output_dir):
+            for source in sorted(assets_dir.rglob("*")):
+                if source.is_file():
+                    target = output_dir / source.relative_to(assets_dir)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(source, target)
+
+        start = time.perf_counter()
+        copy2_each(work_dir / "out-copy2")
+        copy2_time = time.perf_counter() - start
+
+        file_manager = FileManager(work_dir / "out", log=lambda message: None)
+        copier = AssetCopier(threads=args.jobs)
+        start = time.perf_counter()
+        file_manager.copy_asset_tree(assets_dir, "attachments", copier)
+        cold_time = time.perf_counter() - start
+        start = time.perf_counter()
+        file_manager.copy_asset_tree(assets_dir, "attachments", copier)
+        warm_time = time.perf_counter() - start
+
+        same = all(
+            (work_dir / "out" / "attachments" / p.relative_to(assets_dir)).read_bytes()
+            == p.read_bytes()
+            for p in assets_dir.rglob("*")
+            if p.is_file()
+        )
+        print(f"   逐个 shutil.copy2: {copy2_time:.3f}s")
+        print(f"   并行复制（{args.jobs} 线程）: {cold_time:.3f}s")
+        print(f"   再次运行（全部跳过）: {warm_time:.3f}s")
+        print(f"   内容一致: {'✅' if same else '❌'}")
+        return same
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def benchmark_archive(args):
+    """对比先写入目录再打包成 zip 与直接写入 zip 归档"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        print(f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块")
+
+        def directory_then_zip():
+            output_dir = work_dir / "out"
+            options = ConversionOptions(write_report=False)
+            with contextlib.redirect_stdout(io.StringIO()):
+                Converter(logseq_dir, output_dir, options).run()
+            with zipfile.ZipFile(
+                work_dir / "two-step.zip", "w", zipfile.ZIP_DEFLATED
+            ) as archive:
+                for path in sorted(output_dir.rglob("*")):
+                    if path.is_file():
+                        archive.write(path, path.relative_to(output_dir).as_posix())
+            shutil.rmtree(output_dir)
+
+        def direct_zip():
+            options = ConversionOptions(write_report=False, archive_format="zip")
+            with contextlib.redirect_stdout(io.StringIO()):
+                Converter(logseq_dir, work_dir / "direct.zip", options).run()
+
+        two_step_time, _ = time_call(directory_then_zip, repeat=args.repeat)
+        direct_time, _ = time_call(direct_zip, repeat=args.repeat)
+
+        def contents(path):
+            with zipfile.ZipFile(path) as archive:
+                return {name: archive.read(name) for name in archive.namelist()}
+
+        same = contents(work_dir / "two-step.zip") == contents(work_dir / "direct.zip")
+        print(f"   写入目录后打包: {two_step_time:.3f}s")
+        print(f"   直接写入归档: {direct_time:.3f}s")
+        print(f"   内容一致: {'✅' if same else '❌'}")
+        return same
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def benchmark_storage(args):
+    """对比写入本地目录、内存和空后端（不写入）的端到端转换耗时"""
+    work_dir = Path(tempfile.mkdtemp(prefix="l2o-bench-"))
+    try:
+        logseq_dir = generate_synthetic_graph(
+            work_dir / "graph", args.pages, args.blocks
+        )
+        print(f"📁 合成图谱: {args.pages} 个页面，每页 {args.blocks} 个块")
+
+        def convert(storage=None):
+            options = ConversionOptions(write_report=False, storage=storage)
+            with contextlib.redirect_stdout(io.StringIO()):
+                Converter(logseq_dir, work_dir / "out", options).run()
+            return storage
+
+        local_time, _ = time_call(convert, repeat=args.repeat)
+        memory_time, memory = time_call(
+            lambda: convert(MemoryStorage()), repeat=args.repeat
+        )
+        null_time, null = time_call(lambda: convert(NullStorage()), repeat=args.repeat)
+
+        output_dir = work_dir / "out"
+        expected = {
+            path.relative_to(output_dir).as_posix(): path.read_bytes()
+            for path in output_dir.rglob("*")
+            if path.is_file()
+        }
+        same = memory.files == expected and null.files_written == len(expected)
+        print(f"   本地目录: {local_time:.3f}s")
+        print(
+            f"   内存: {memory_time:.3f}s（{sum(map(len, memory.files.values())) / 1e6:.1f} MB）"
+        )
+        print(f"   空后端（不写入）: {null_time:.3f}s")
+        print(f"   内容一致: {'✅' if same else '❌'}")
+        return same
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    "pipeline": benchmark_pipeline,
+    "jobs": benchmark_jobs,
+    "lazy-parse": benchmark_lazy_parse,
+    "header-scan": benchmark_header_scan,
+    "line-engine": benchmark_line_engine,
+    "parser-memory": benchmark_parser_memory,
+    "large-file": benchmark_large_file,
+    "edn": benchmark_edn,
+    "screenshots": benchmark_screenshots,
+    "index-cache": benchmark_index_cache,
+    "writer": benchmark_writer,
+    "assets": benchmark_assets,
+    "archive": benchmark_archive,
+    "storage": benchmark_storage,
+}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="logseq2obsidian 性能基准")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), help="要运行的基准")
+    parser.add_argument("--pages", type=int, default=2000, help="合成图谱的页面数")
+    parser.add_argument("--blocks", type=int, default=40, help="每个页面的块数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最短耗时）")
+    parser.add_argument(
+        "--jobs", type=int, default=4, help="jobs 基准使用的进程数、writer / assets 基准使用的线程数"
+    )
+    parser.add_argument("--assets", type=int, default=2000, help="assets 基准的资源文件数")
+    parser.add_argument(
+        "--asset-kb", type=int, default=256, help="assets 基准资源文件的平均大小（KB）"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=2.0, help="writer 基准模拟的每次写入延迟（毫秒）"
+    )
+    parser.add_argument(
+        "--lines",
+        type=int,
+        default=1_000_000,
+        help="line-engine / large-file / parser-memory 基准的语料行数",
+    )
+    parser.add_argument(
+        "--highlights",
+        type=int,
+        default=20000,
+        help="edn / screenshots / index-cache 基准的高亮数",
+    )
+
+    args = parser.parse_args()
+    return BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -17,6 +17,7 @@ sys.path.insert(0, str(project_root))
 from src.logseq_parser import LogseqParser
 from src.obsidian_formatter import ObsidianFormatter
 from src.file_manager import FileManager
+from src.conversion_pipeline import ConversionPipeline
 
 # 路径配置
 LOGSEQ_DATA_DIR = project_root / "examples" / "logseq_data"
@@ -88,100 +89,52 @@ def convert_logseq_to_obsidian(remove_top_level_bullets=False, category_tag=None
         print("❌ 没有找到 markdown 文件")
         return []
     
-    # 第一阶段：收集所有被引用的 UUID
-    print("\n🔍 第一阶段：收集被引用的块...")
+    # 每个文件只解析一次，后续阶段复用同一份解析结果
+    pipeline = ConversionPipeline(LOGSEQ_DATA_DIR, formatter, parser)
     
-    for i, md_file in enumerate(md_files, 1):
-        try:
-            parsed_data = parser.parse_file(md_file)
-            # 收集被引用的 UUID
-            formatter.collect_referenced_uuids(parsed_data)
-        except Exception as e:
-            print(f"   ⚠️  收集引用失败 [{i}/{len(md_files)}] {md_file.stem}: {e}")
+    # 第一阶段：解析文件并收集所有被引用的 UUID
+    print("\n🔍 第一阶段：解析文件并收集被引用的块...")
+    
+    tasks = pipeline.load(md_files)
+    for i, task in enumerate(tasks, 1):
+        if task.error:
+            print(f"   ⚠️  解析失败 [{i}/{len(tasks)}] {task.source_path.stem}: {task.error}")
     
     print(f"   ✅ 收集完成，共 {len(formatter.referenced_uuids)} 个被引用的块")
     
     # 第二阶段：收集PDF高亮信息并为被引用的块分配ID
     print("\n🔍 第二阶段：收集块ID映射和PDF高亮信息...")
     
-    # 收集 PDF 高亮信息
-    formatter.collect_pdf_highlights(str(LOGSEQ_DATA_DIR))
+    pipeline.build_indexes()
     print(f"   ✅ 收集PDF高亮完成，共 {len(formatter.pdf_highlight_map)} 个高亮注释")
-    
-    # 收集块ID映射（只为被引用的块分配ID）
-    for i, md_file in enumerate(md_files, 1):
-        try:
-            parsed_data = parser.parse_file(md_file)
-            # 生成文件名用于映射
-            output_filename = formatter.generate_filename(md_file.stem)
-            # 收集这个文件的块映射
-            formatter.collect_block_mappings(output_filename, parsed_data)
-        except Exception as e:
-            print(f"   ⚠️  收集映射失败 [{i}/{len(md_files)}] {md_file.stem}: {e}")
-    
     print(f"   ✅ 收集完成，共 {len(formatter.block_uuid_map)} 个被引用的块映射")
     
     # 第三阶段：转换每个文件
     print("\n🔄 第三阶段：转换文件内容...")
-    for i, md_file in enumerate(md_files, 1):
-        relative_path = md_file.relative_to(LOGSEQ_DATA_DIR)
-        print(f"\n📄 [{i}/{len(md_files)}] {relative_path}")
+    for i, task in enumerate(pipeline.iter_formatted(), 1):
+        relative_path = task.relative_path
+        print(f"\n📄 [{i}/{len(tasks)}] {relative_path}")
         
-        try:
-            # 解析文件
-            parsed_data = parser.parse_file(md_file)
-            
-            # 生成输出文件名
-            output_filename = formatter.generate_filename(md_file.stem)
-            
-            # 检测分类文件夹
-            detected_folder = formatter.detect_category_folder(parsed_data)
-            
-            # 决定最终的子文件夹 - 扁平化逻辑
-            if relative_path.parent.name == 'journals':
-                # journals 文件夹 -> Daily Notes
-                subfolder = "Daily Notes"
-                print("   📅 日记文件，归类到 Daily Notes/ 文件夹")
-            elif detected_folder:
-                # 使用检测到的分类文件夹（如 wiki -> Wiki）
-                subfolder = detected_folder.title()  # 首字母大写
-                print(f"   🏷️  检测到 #{formatter.category_tag} 标签，归类到 {subfolder}/ 文件夹")
-            else:
-                # 其他文件直接放在根目录（扁平化）
-                subfolder = ""
-                print("   📄 主要笔记，放在根目录")
-            
-            # 格式转换（传递目标文件夹信息以正确处理资源路径）
-            converted_content = formatter.format_content(parsed_data, output_filename, subfolder)
-            
-            # 直接使用转换后的内容，不添加 frontmatter
-            final_content = converted_content
-            
-            # 写入文件
-            if subfolder:
-                file_manager.write_file(output_filename, final_content, subfolder)
-            else:
-                file_manager.write_file(output_filename, final_content)
-            
-            # 获取转换摘要
-            conversion_summary = formatter.get_conversion_summary(parsed_data, converted_content)
-            
+        if not task.success:
+            print(f"   ❌ 转换失败: {task.error}")
             conversions.append({
                 'source_file': str(relative_path),
-                'target_file': output_filename,
-                'success': True,
-                'summary': conversion_summary
+                'success': False,
+                'error': task.error
             })
-            
-            # 显示转换统计
-            orig = conversion_summary['original']
-            conv = conversion_summary['converted']
-            print("   ✅ 转换完成")
-            print(f"   📊 页面链接: {orig['page_links']} → {conv['page_links']}")
-            print(f"   📊 块引用: {orig['block_refs']} → {conv['block_refs']} (注释)")
-            print(f"   📊 块ID: {orig['block_ids']} → {conv['block_ids']}")
-            print(f"   📊 资源: {orig['assets']} → {conv['assets']}")
-            
+            continue
+        
+        subfolder = task.subfolder
+        if subfolder == ConversionPipeline.JOURNALS_FOLDER:
+            print("   📅 日记文件，归类到 Daily Notes/ 文件夹")
+        elif subfolder:
+            print(f"   🏷️  检测到 #{formatter.category_tag} 标签，归类到 {subfolder}/ 文件夹")
+        else:
+            print("   📄 主要笔记，放在根目录")
+        
+        try:
+            # 写入文件
+            file_manager.write_file(task.output_filename, task.content, subfolder)
         except Exception as e:
             print(f"   ❌ 转换失败: {e}")
             conversions.append({
@@ -189,6 +142,24 @@ def convert_logseq_to_obsidian(remove_top_level_bullets=False, category_tag=None
                 'success': False,
                 'error': str(e)
             })
+            continue
+        
+        conversion_summary = task.summary
+        conversions.append({
+            'source_file': str(relative_path),
+            'target_file': task.output_filename,
+            'success': True,
+            'summary': conversion_summary
+        })
+        
+        # 显示转换统计
+        orig = conversion_summary['original']
+        conv = conversion_summary['converted']
+        print("   ✅ 转换完成")
+        print(f"   📊 页面链接: {orig['page_links']} → {conv['page_links']}")
+        print(f"   📊 块引用: {orig['block_refs']} → {conv['block_refs']} (注释)")
+        print(f"   📊 块ID: {orig['block_ids']} → {conv['block_ids']}")
+        print(f"   📊 资源: {orig['assets']} → {conv['assets']}")
     
     return conversions
 
@@ -205,19 +176,14 @@ def copy_assets():
     print(f"\n📁 复制资源文件: {assets_source} → {assets_target}")
     
     try:
-        if assets_target.exists():
-            shutil.rmtree(assets_target)
-        
-        shutil.copytree(assets_source, assets_target)
-        
-        # 统计复制的文件
-        asset_files = list(assets_target.rglob("*"))
-        asset_files = [f for f in asset_files if f.is_file()]
+        # 并行复制，大小和修改时间未变化的文件直接跳过，不需要先删除整个目录
+        file_manager = FileManager(OBSIDIAN_OUTPUT_DIR, dry_run=False)
+        asset_files = file_manager.copy_asset_tree(assets_source, "attachments")
         
         total_size = sum(f.stat().st_size for f in asset_files)
         size_mb = total_size / (1024 * 1024)
         
-        print(f"   ✅ 复制了 {len(asset_files)} 个资源文件")
+        print(f"   ✅ 资源文件: {len(asset_files)} 个")
         print(f"   📊 总大小: {size_mb:.1f} MB")
         
     except Exception as e:
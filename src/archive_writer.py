@@ -0,0 +1,158 @@
+"""
+归档输出
+把转换后的页面和资源文件直接流式写入 zip 或 tar（tar.gz、tar.zst）归档，
+不在磁盘上生成中间目录；tar.zst 需要可选依赖 zstandard
+"""
+
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import IO, Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖：pip install zstandard
+    zstandard = None
+
+ARCHIVE_ZIP = "zip"
+ARCHIVE_TAR = "tar"
+ARCHIVE_TAR_GZ = "tar.gz"
+ARCHIVE_TAR_ZST = "tar.zst"
+ARCHIVE_FORMATS = (ARCHIVE_ZIP, ARCHIVE_TAR, ARCHIVE_TAR_GZ, ARCHIVE_TAR_ZST)
+
+# 已经压缩过的资源文件在 zip 中直接存储，不再压缩
+STORED_SUFFIXES = frozenset(
+    (".png", ".jpg", ".jpeg", ".gif", ".webp", ".pdf", ".zip", ".gz")
+    + (".mp3", ".mp4", ".m4a", ".mov", ".webm", ".epub", ".docx", ".xlsx")
+)
+
+# tar 条目需要预先知道大小：流式输出的页面先写入临时文件，超过该大小时写到磁盘
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# 复制资源文件内容时每次读取的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ArchiveWriter:
+    """按顺序把文件写入归档
+
+    归档一次只能写入一个条目，多个写入线程通过锁串行写入；
+    条目名称使用 / 分隔的相对路径
+    """
+
+    def __init__(self, path: Path, archive_format: str):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"未知的归档格式: {archive_format}")
+        if archive_format == ARCHIVE_TAR_ZST and zstandard is None:
+            raise ValueError("tar.zst 归档需要安装 zstandard：pip install zstandard")
+
+        self.path = Path(path)
+        self.archive_format = archive_format
+        self._lock = threading.Lock()
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        self._file: Optional[IO[bytes]] = None
+        self._compressor = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if archive_format == ARCHIVE_ZIP:
+            self._zip = zipfile.ZipFile(
+                self.path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6
+            )
+        elif archive_format == ARCHIVE_TAR_ZST:
+            self._file = open(self.path, "wb")
+            self._compressor = zstandard.ZstdCompressor().stream_writer(self._file)
+            self._tar = tarfile.open(fileobj=self._compressor, mode="w|")
+        else:
+            # 流式模式（w|），只顺序写入，不回头修改
+            mode = "w|gz" if archive_format == ARCHIVE_TAR_GZ else "w|"
+            self._tar = tarfile.open(str(self.path), mode)
+
+    def write_lines(self, name: str, lines: Iterable[str]):
+        """写入文本文件，行之间用换行连接（UTF-8 编码）"""
+        if self._zip is not None:
+            with self._lock, self._zip.open(self._zip_info(name), "w") as f:
+                self._write_encoded(f, lines)
+            return
+
+        # tar 条目头部需要大小，先写入临时文件（较小时在内存中）
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            self._write_encoded(spool, lines)
+            size = spool.tell()
+            spool.seek(0)
+            with self._lock:
+                self._tar.addfile(self._tar_info(name, size), spool)
+
+    def write_bytes(self, name: str, data: bytes):
+        """写入二进制内容"""
+        with self._lock:
+            if self._zip is not None:
+                self._zip.writestr(self._zip_info(name), data)
+            else:
+                self._tar.addfile(self._tar_info(name, len(data)), io.BytesIO(data))
+
+    def add_file(self, name: str, source: Path):
+        """写入磁盘上的文件（如资源文件），保留修改时间"""
+        stat = os.stat(source)
+        with self._lock, open(source, "rb") as src:
+            if self._zip is not None:
+                info = self._zip_info(name, stat.st_mtime)
+                if Path(name).suffix.lower() in STORED_SUFFIXES:
+                    info.compress_type = zipfile.ZIP_STORED
+                # 预先给出大小，超过 4GB 的文件自动使用 zip64
+                info.file_size = stat.st_size
+                with self._zip.open(info, "w") as dst:
+                    while True:
+                        chunk = src.read(COPY_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+            else:
+                info = self._tar_info(name, stat.st_size, stat.st_mtime)
+                self._tar.addfile(info, src)
+
+    def close(self):
+        """写入归档结尾并关闭文件"""
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+        if self._compressor is not None:
+            self._compressor.close()
+        elif self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _write_encoded(f: IO[bytes], lines: Iterable[str]):
+        for index, line in enumerate(lines):
+            if index:
+                f.write(b"\n")
+            f.write(line.encode("utf-8"))
+
+    @staticmethod
+    def _zip_info(name: str, mtime: Optional[float] = None) -> zipfile.ZipInfo:
+        # zip 的时间戳不能早于 1980 年
+        timestamp = time.localtime(max(mtime or time.time(), 315532800))[:6]
+        info = zipfile.ZipInfo(name, timestamp)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        return info
+
+    @staticmethod
+    def _tar_info(name: str, size: int, mtime: Optional[float] = None):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(mtime or time.time())
+        info.mode = 0o644
+        return info
@@ -0,0 +1,258 @@
+"""
+资源复制
+在线程池中复制资源文件：目标文件的大小和修改时间与源文件一致时跳过；
+优先使用写时复制克隆（Linux FICLONE，btrfs/xfs 等），其次 copy_file_range，
+最后 shutil.copyfile（Linux 上使用 sendfile）；也可以选择使用硬链接。
+也提供按内容哈希查找重复资源文件的函数，用于资源去重
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# 计算内容哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 修改时间的比较精度：FAT/exFAT 等文件系统只保存到 2 秒
+MTIME_TOLERANCE_NS = 2_000_000_000
+
+# 复制方式
+COPY_SKIPPED = "skipped"
+COPY_HARDLINK = "hardlink"
+COPY_REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+COPY_FILE = "copyfile"
+
+# 克隆、copy_file_range、硬链接不可用时的错误，遇到后回退到下一种方式；
+# 其他错误（如权限不足）不回退，记录为复制失败
+_UNSUPPORTED_ERRORS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+}
+
+
+@dataclass
+class AssetCopyStats:
+    """资源复制统计"""
+
+    # 复制方式 -> 文件数
+    methods: Dict[str, int] = field(default_factory=dict)
+    # 实际复制的字节数（跳过、硬链接和克隆的文件不计）
+    bytes_copied: int = 0
+    # (源文件, 错误信息)
+    failed: List[Tuple[Path, str]] = field(default_factory=list)
+
+    @property
+    def skipped(self) -> int:
+        return self.methods.get(COPY_SKIPPED, 0)
+
+    @property
+    def transferred(self) -> int:
+        return sum(self.methods.values()) - self.skipped
+
+
+def is_up_to_date(
+    source_stat: os.stat_result, target: Path, allow_link: bool = False
+) -> bool:
+    """目标文件存在，且大小和修改时间与源文件一致
+
+    allow_link 为 False 时，目标是源文件的硬链接也视为需要重新复制
+    （从硬链接模式切换回复制模式）
+    """
+    try:
+        target_stat = os.stat(target)
+    except OSError:
+        return False
+    if not allow_link and (target_stat.st_dev, target_stat.st_ino) == (
+        source_stat.st_dev,
+        source_stat.st_ino,
+    ):
+        return False
+    return (
+        target_stat.st_size == source_stat.st_size
+        and abs(target_stat.st_mtime_ns - source_stat.st_mtime_ns) < MTIME_TOLERANCE_NS
+    )
+
+
+def file_digest(path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """分块读取文件并计算 SHA-256，不把整个文件读入内存"""
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+def find_duplicates(paths: Iterable[Path], threads: int = 4) -> List[List[Path]]:
+    """找出内容相同的文件组（每组至少两个文件，组内保持输入顺序）
+
+    先按大小分组，只对大小相同的文件计算哈希；无法读取的文件不参与去重
+    """
+    sizes: Dict[Path, int] = {}
+    for path in paths:
+        try:
+            sizes[path] = os.stat(path).st_size
+        except OSError:
+            continue
+    counts: Dict[int, int] = {}
+    for size in sizes.values():
+        counts[size] = counts.get(size, 0) + 1
+    candidates = [path for path, size in sizes.items() if counts[size] > 1]
+
+    def digest(path: Path) -> Optional[str]:
+        try:
+            return file_digest(path)
+        except OSError:
+            return None
+
+    if threads > 1 and len(candidates) > 1:
+        # hashlib 处理较大的数据时释放 GIL，多个线程可以同时计算
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            digests = list(executor.map(digest, candidates))
+    else:
+        digests = [digest(path) for path in candidates]
+
+    groups: Dict[Tuple[int, str], List[Path]] = {}
+    for path, path_digest in zip(candidates, digests):
+        if path_digest is not None:
+            groups.setdefault((sizes[path], path_digest), []).append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+class AssetCopier:
+    """并行复制资源文件
+
+    Args:
+        threads: 复制线程数，0 或 1 表示在当前线程中逐个复制
+        hardlink: 优先使用硬链接（目标文件与源文件是同一个文件，
+            在 Obsidian 中修改附件会同时修改 Logseq 中的文件）
+        ensure_dir: 创建目标目录的函数（如 FileManager.ensure_dir）
+    """
+
+    def __init__(
+        self,
+        threads: int = 4,
+        hardlink: bool = False,
+        ensure_dir: Optional[Callable[[Path], None]] = None,
+    ):
+        self.threads = threads
+        self.hardlink = hardlink
+        self.ensure_dir = ensure_dir or (
+            lambda directory: directory.mkdir(parents=True, exist_ok=True)
+        )
+        # 已知不支持克隆 / 硬链接的 (源设备, 目标目录)，不再尝试
+        self._no_reflink: Set[Tuple[int, Path]] = set()
+        self._no_hardlink: Set[Tuple[int, Path]] = set()
+        self._lock = threading.Lock()
+
+    def copy_files(self, pairs: Iterable[Tuple[Path, Path]]) -> AssetCopyStats:
+        """复制 (源文件, 目标文件) 列表"""
+        stats = AssetCopyStats()
+
+        def copy(pair: Tuple[Path, Path]):
+            source, target = pair
+            try:
+                method, size = self.copy_file(source, target)
+            except OSError as e:
+                with self._lock:
+                    stats.failed.append((source, str(e)))
+                return
+            with self._lock:
+                stats.methods[method] = stats.methods.get(method, 0) + 1
+                stats.bytes_copied += size
+
+        pairs = list(pairs)
+        # 先在当前线程中创建目标目录，避免各线程重复创建
+        for directory in sorted({target.parent for _, target in pairs}):
+            self.ensure_dir(directory)
+
+        if self.threads > 1 and len(pairs) > 1:
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                list(executor.map(copy, pairs))
+        else:
+            for pair in pairs:
+                copy(pair)
+        return stats
+
+    def copy_file(self, source: Path, target: Path) -> Tuple[str, int]:
+        """复制单个文件，返回 (复制方式, 实际复制的字节数)；目标目录必须已存在"""
+        source_stat = os.stat(source)
+        if is_up_to_date(source_stat, target, allow_link=self.hardlink):
+            return COPY_SKIPPED, 0
+
+        key = (source_stat.st_dev, target.parent)
+        if self.hardlink and key not in self._no_hardlink:
+            try:
+                if os.path.lexists(target):
+                    os.unlink(target)
+                os.link(source, target)
+                return COPY_HARDLINK, 0
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRORS | {errno.EMLINK}:
+                    raise
+                self._no_hardlink.add(key)
+
+        if os.path.lexists(target):
+            # 先删除旧文件：目标可能是源文件的硬链接，直接写入会修改源文件
+            os.unlink(target)
+        method = self._copy_data(source, target, key, source_stat.st_size)
+        shutil.copystat(source, target)
+        return method, 0 if method == COPY_REFLINK else source_stat.st_size
+
+    def _copy_data(self, source: Path, target: Path, key, size: int) -> str:
+        """复制文件内容：克隆 -> copy_file_range -> shutil.copyfile"""
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            if fcntl is not None and key not in self._no_reflink:
+                try:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                    return COPY_REFLINK
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_ERRORS:
+                        raise
+                    self._no_reflink.add(key)
+
+            if size and hasattr(os, "copy_file_range"):
+                try:
+                    copied = 0
+                    while copied < size:
+                        sent = os.copy_file_range(
+                            src.fileno(), dst.fileno(), size - copied
+                        )
+                        if sent == 0:
+                            break
+                        copied += sent
+                    if copied == size:
+                        return COPY_FILE_RANGE
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_ERRORS:
+                        raise
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+
+        # Linux 上 copyfile 内部使用 sendfile，macOS 上使用 fcopyfile
+        shutil.copyfile(source, target)
+        return COPY_FILE
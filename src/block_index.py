@@ -0,0 +1,141 @@
+"""
+块索引
+全局的块 UUID 索引：UUID -> 定义位置（源页面、行号）和输出块 ID，
+并批量报告重复定义的 UUID 和没有定义的块引用
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from .obsidian_formatter import BLOCK_REF_UUID_PATTERN
+
+# 块 ID 定义 "id:: uuid"（允许缩进）；[^\S\n] 保证匹配不会跨行
+BLOCK_ID_DEFINITION_PATTERN = re.compile(r"^[^\S\n]*id:: ([a-zA-Z0-9-]+)", re.MULTILINE)
+
+# (uuid, 行号) 列表
+LocatedUuids = List[Tuple[str, int]]
+
+
+class BlockLocation(NamedTuple):
+    """块 UUID 在源文件中的位置（line 为 0 表示未知，如增量转换中没有重新读取的页面）"""
+
+    page: str
+    line: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.page}:{self.line}" if self.line else self.page
+
+
+@dataclass(frozen=True, slots=True)
+class BlockEntry:
+    """块索引的查询结果；块没有被引用时不分配输出块 ID"""
+
+    uuid: str
+    page: str
+    line: int
+    output_filename: Optional[str] = None
+    block_id: Optional[str] = None
+
+
+def scan_block_uuids(
+    text: str, first_line_number: int = 1
+) -> Tuple[LocatedUuids, LocatedUuids]:
+    """单遍扫描文本中的块 ID 定义和块引用，返回 (定义, 引用)，均为按出现顺序的 (uuid, 行号)"""
+    return (
+        list(_iter_located(BLOCK_ID_DEFINITION_PATTERN, text, first_line_number)),
+        list(_iter_located(BLOCK_REF_UUID_PATTERN, text, first_line_number)),
+    )
+
+
+def _iter_located(
+    pattern: Pattern[str], text: str, first_line_number: int
+) -> Iterator[Tuple[str, int]]:
+    """产出每个匹配的 (uuid, 行号)，行号只统计上一个匹配之后的换行符"""
+    line_number = first_line_number
+    position = 0
+    for match in pattern.finditer(text):
+        line_number += text.count("\n", position, match.start())
+        position = match.start()
+        yield match.group(1), line_number
+
+
+class BlockIndex:
+    """全局块 UUID 索引
+
+    同一个 UUID 被多次定义时与格式化器一致，以最后一次定义为准，
+    所有定义位置都记录在重复定义中
+    """
+
+    def __init__(self):
+        # UUID -> 生效的定义位置
+        self.definitions: Dict[str, BlockLocation] = {}
+        # 被多次定义的 UUID -> 所有定义位置
+        self.duplicates: Dict[str, List[BlockLocation]] = {}
+        # UUID -> 引用它的位置
+        self.references: Dict[str, List[BlockLocation]] = {}
+        # UUID -> (输出文件名, 块 ID)，由格式化器分配
+        self._block_ids: Dict[str, Tuple[str, str]] = {}
+
+    def add_page(
+        self, page: str, definitions: Iterable[Tuple[str, int]], references=()
+    ):
+        """记录页面中的块 ID 定义和块引用，均为 (uuid, 行号)"""
+        for uuid, line in definitions:
+            location = BlockLocation(page, line)
+            previous = self.definitions.get(uuid)
+            if previous is not None:
+                self.duplicates.setdefault(uuid, [previous]).append(location)
+            self.definitions[uuid] = location
+
+        for uuid, line in references:
+            self.references.setdefault(uuid, []).append(BlockLocation(page, line))
+
+    def attach_block_ids(self, block_uuid_map: Dict[str, Tuple[str, str]]):
+        """关联格式化器分配的输出块 ID（UUID -> (输出文件名, 块 ID)）"""
+        self._block_ids = block_uuid_map
+
+    def lookup(self, uuid: str) -> Optional[BlockEntry]:
+        """查询 UUID 的定义位置和输出块 ID，没有定义时返回 None"""
+        location = self.definitions.get(uuid)
+        if location is None:
+            return None
+        output_filename, block_id = self._block_ids.get(uuid, (None, None))
+        return BlockEntry(uuid, location.page, location.line, output_filename, block_id)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.definitions
+
+    def __len__(self) -> int:
+        return len(self.definitions)
+
+    def dangling_references(
+        self, known_uuids: Iterable[str] = ()
+    ) -> Dict[str, List[BlockLocation]]:
+        """没有定义的块引用：UUID -> 引用位置
+
+        Args:
+            known_uuids: 不在页面中定义、但可以解析的 UUID（如 .edn 中的 PDF 高亮）
+        """
+        known = set(known_uuids)
+        return {
+            uuid: locations
+            for uuid, locations in self.references.items()
+            if uuid not in self.definitions and uuid not in known
+        }
+
+    def report(self, known_uuids: Iterable[str] = ()) -> Dict:
+        """校验报告（可以直接序列化为 JSON）"""
+        dangling = self.dangling_references(known_uuids)
+        return {
+            "defined": len(self.definitions),
+            "referenced": len(self.references),
+            "duplicates": {
+                uuid: [str(location) for location in locations]
+                for uuid, locations in sorted(self.duplicates.items())
+            },
+            "dangling": {
+                uuid: [str(location) for location in locations]
+                for uuid, locations in sorted(dangling.items())
+            },
+        }
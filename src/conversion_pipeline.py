@@ -0,0 +1,423 @@
+"""
+转换流水线
+每个文件只解析一次，从同一份解析结果中收集被引用的 UUID、块 ID 映射，然后格式化
+"""
+
+import hashlib
+import json
+import posixpath
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .block_index import BlockIndex, LocatedUuids, scan_block_uuids
+from .index_cache import CachedPage, IndexCache
+from .logseq_parser import LogseqParser, MappedFile
+from .obsidian_formatter import ObsidianFormatter
+
+# 大文件模式下需要解码的行：包含页面链接、块引用、块ID或资源引用标记
+LARGE_FILE_SYNTAX_PATTERN = re.compile(rb"\[\[|\(\(|id::|!\[")
+
+
+@dataclass
+class PageTask:
+    """单个页面的转换任务"""
+
+    source_path: Path
+    relative_path: Path
+    output_filename: str
+    parsed_data: Optional[Dict] = None
+    subfolder: str = ""
+    content: Optional[str] = None
+    # 大文件模式的流式输出（用 "\n" 连接即为完整内容），由写入阶段消费
+    lines: Optional[Iterator[str]] = None
+    summary: Optional[Dict] = None
+    error: Optional[str] = None
+    # 页面定义的块 UUID（id:: uuid）和引用的块 UUID（((uuid))），按出现顺序
+    defined_uuids: List[str] = field(default_factory=list)
+    referenced_uuids: List[str] = field(default_factory=list)
+    # 页面中 hls__ 高亮链接引用的块标识
+    hls_link_blocks: List[str] = field(default_factory=list)
+    # 页面中 ../assets/ 资源引用的路径
+    asset_paths: List[str] = field(default_factory=list)
+    # 页面内容哈希（未解析的已知任务由调用方提供）
+    content_hash: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and (
+            self.content is not None or self.lines is not None
+        )
+
+
+class ConversionPipeline:
+    """单次解析的 Logseq -> Obsidian 转换流水线
+
+    流程：
+    1. load: 逐个解析文件，同时收集被引用的 UUID
+    2. build_indexes: 收集 PDF 高亮，并基于已解析的数据分配块 ID
+    3. iter_formatted: 按顺序格式化页面，格式化后释放解析数据
+
+    大于 large_file_threshold 字节的文件使用大文件模式：通过 mmap 只解码带有语法
+    标记的行来收集索引，格式化结果以逐行迭代器（task.lines）的形式流式写出
+
+    使用索引缓存（index_cache）时，未变化的页面、hls__ 文件和 .edn 文件在构建索引时
+    不读取，页面在格式化时再解析
+    """
+
+    JOURNALS_FOLDER = "Daily Notes"
+    # 格式化阶段实际使用的解析数据字段
+    FORMAT_KEYS = (
+        "filename",
+        "content",
+        "meta_properties",
+        "header_lines",
+        "first_content_line",
+        "large_file",
+        "original_stats",
+    )
+
+    def __init__(
+        self,
+        logseq_dir: Path,
+        formatter: ObsidianFormatter,
+        parser: Optional[LogseqParser] = None,
+        large_file_threshold: int = 0,
+        index_cache: Optional[IndexCache] = None,
+    ):
+        self.logseq_dir = Path(logseq_dir)
+        self.formatter = formatter
+        self.parser = parser or LogseqParser()
+        # 达到该大小（字节）的文件使用大文件模式，0 表示不使用
+        self.large_file_threshold = large_file_threshold
+        # 索引缓存：文件未变化时直接使用上次提取的索引数据，不读取文件
+        self.index_cache = index_cache
+        self.tasks: List[PageTask] = []
+        # 全局块 UUID 索引（定义位置、引用位置），在 load 时构建
+        self.block_index = BlockIndex()
+
+    def load(
+        self,
+        md_files: Sequence[Path],
+        known: Optional[Dict[Path, PageTask]] = None,
+        keep_parsed: bool = True,
+    ) -> List[PageTask]:
+        """解析所有文件（每个文件只读取一次），收集被引用的 UUID 并构建块索引
+
+        Args:
+            md_files: 要转换的文件列表
+            known: 已知未变化的文件 -> 任务（已带有 defined_uuids、referenced_uuids、
+                hls_link_blocks、asset_paths、content_hash 和 subfolder），
+                这些文件不会被读取，需要格式化时再解析
+            keep_parsed: 是否保留解析数据；只校验、不格式化时不需要保留
+        """
+        known = known or {}
+        self.tasks = []
+        self.block_index = BlockIndex()
+
+        for md_file in md_files:
+            task = known.get(md_file)
+            if task is None:
+                task = PageTask(
+                    source_path=md_file,
+                    relative_path=self._relative_path(md_file),
+                    output_filename=self.formatter.generate_filename(md_file.stem),
+                )
+                definitions, references = self._load_task(task)
+                if not keep_parsed:
+                    task.parsed_data = None
+            else:
+                # 未重新读取的页面只有 UUID，没有行号
+                definitions = [(uuid, 0) for uuid in task.defined_uuids]
+                references = [(uuid, 0) for uuid in task.referenced_uuids]
+
+            self.block_index.add_page(str(task.relative_path), definitions, references)
+            self.formatter.referenced_uuids.update(task.referenced_uuids)
+            self.tasks.append(task)
+
+        return self.tasks
+
+    def build_indexes(self):
+        """构建全局索引：PDF 高亮映射和块 ID 映射"""
+        self.formatter.collect_pdf_highlights(
+            str(self.logseq_dir), self.index_cache.cached if self.index_cache else None
+        )
+
+        for task in self.tasks:
+            if task.error is not None:
+                continue
+            # 块 ID 映射依赖完整的 referenced_uuids，因此必须在 load 之后进行
+            self.formatter.assign_block_ids(task.output_filename, task.defined_uuids)
+
+        self.block_index.attach_block_ids(self.formatter.block_uuid_map)
+
+    def validation_report(self) -> Dict:
+        """块索引校验报告：重复定义的 UUID 和没有定义的块引用（需要在 build_indexes 之后）"""
+        # .edn 中的 PDF 高亮不在页面中定义，但块引用可以解析
+        return self.block_index.report(self.formatter.pdf_highlight_map)
+
+    def referenced_assets(self) -> List[str]:
+        """页面引用的资源文件，相对于 assets 目录的路径（需要在 build_indexes 之后）
+
+        包括页面中的 ../assets/ 资源引用，以及块引用和 hls__ 链接指向的 PDF 高亮
+        所在的 PDF 文件和高亮截图；解析失败的页面不计入
+        """
+        highlight_map = self.formatter.pdf_highlight_map
+        paths = set()
+        for task in self.tasks:
+            if task.error is not None:
+                continue
+            paths.update(task.asset_paths)
+            for uuid in task.referenced_uuids:
+                highlight = highlight_map.get(uuid)
+                if highlight:
+                    # 块引用转换为 PDF 链接，有截图时附带截图
+                    paths.add(highlight["pdf_path"])
+                    paths.add(highlight.get("screenshot_path"))
+            for block_id in task.hls_link_blocks:
+                highlight = highlight_map.get(block_id)
+                if highlight:
+                    paths.add(highlight["pdf_path"])
+
+        assets = {asset_relative_path(path) for path in paths if path}
+        assets.discard(None)
+        return sorted(assets)
+
+    def highlight_assets(self) -> Set[str]:
+        """PDF 高亮直接引用的 PDF 文件和截图（相对于 assets 目录），这些路径不经过资源路径转换"""
+        assets = set()
+        for highlight in self.formatter.pdf_highlight_map.values():
+            for path in (highlight["pdf_path"], highlight.get("screenshot_path")):
+                relative_path = asset_relative_path(path) if path else None
+                if relative_path:
+                    assets.add(relative_path)
+        return assets
+
+    def ensure_parsed(self, task: PageTask) -> PageTask:
+        """确保任务已解析（用于 load 时跳过读取的已知任务）"""
+        if task.parsed_data is None and task.error is None:
+            self._parse_task(task)
+        return task
+
+    def dependency_hash(self, task: PageTask) -> str:
+        """计算页面输出所依赖的全局索引条目的哈希
+
+        页面的输出只依赖自身内容，以及它定义和引用的 UUID、hls__ 链接的块标识
+        在块 ID 映射、PDF 高亮映射中的解析结果和资源去重的别名；
+        这些结果不变时页面输出也不变
+        """
+        dependencies = {}
+        for uuid in sorted(set(task.defined_uuids) | set(task.referenced_uuids)):
+            dependencies[uuid] = [
+                self.formatter.block_uuid_map.get(uuid),
+                self.formatter.pdf_highlight_map.get(uuid),
+            ]
+        for block_id in sorted(set(task.hls_link_blocks)):
+            dependencies[f"hls__#{block_id}"] = self.formatter.pdf_highlight_map.get(
+                block_id
+            )
+        for path in sorted(set(task.asset_paths)):
+            canonical = self.formatter.canonical_asset_path(path)
+            if canonical != path:
+                # 没有别名时不记录，未启用去重时哈希与之前一致
+                dependencies[f"asset:{path}"] = canonical
+        payload = json.dumps(dependencies, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def iter_formatted(self) -> Iterator[PageTask]:
+        """按顺序逐个格式化页面
+
+        每个任务都会被产出；失败的任务 content 为 None，错误信息保存在 error 中
+        """
+        for task in self.tasks:
+            self.ensure_parsed(task)
+            if task.parsed_data is not None:
+                self.format_task(task)
+            yield task
+
+    def format_task(self, task: PageTask) -> PageTask:
+        """格式化单个任务，完成后释放解析数据"""
+        try:
+            task.subfolder = self.resolve_subfolder(task)
+            if task.parsed_data.get("large_file"):
+                task.summary = {}
+                task.lines = self._iter_large_output(task, task.parsed_data)
+                return task
+            task.content = self.formatter.format_content(
+                task.parsed_data, task.output_filename, task.subfolder
+            )
+            task.summary = self.formatter.get_conversion_summary(
+                task.parsed_data, task.content
+            )
+        except Exception as e:
+            task.error = str(e)
+        finally:
+            # 格式化完成后不再需要解析数据，及时释放内存
+            task.parsed_data = None
+
+        return task
+
+    def _iter_large_output(self, task: PageTask, parsed_data: Dict) -> Iterator[str]:
+        """大文件模式：重新映射源文件，逐行格式化
+
+        输出全部产出后，转换摘要写入 task.summary
+        """
+        converted_stats = dict.fromkeys(parsed_data["original_stats"], 0)
+        with MappedFile(task.source_path) as mapped:
+            for line in self.formatter.iter_output_lines(
+                parsed_data,
+                mapped.iter_text_lines(),
+                task.output_filename,
+                task.subfolder,
+            ):
+                # 不含任何标记的行不需要统计
+                if "[" in line or "<!--" in line or "^" in line:
+                    counts = self.formatter.count_converted_syntax(line)
+                    for key, count in counts.items():
+                        converted_stats[key] += count
+                yield line
+
+        task.summary.update(
+            self.formatter.build_summary(parsed_data["original_stats"], converted_stats)
+        )
+
+    def detach_task(self, task: PageTask) -> PageTask:
+        """复制任务，只保留格式化所需的解析数据，用于发送到其他进程"""
+        parsed_data = task.parsed_data or {}
+        return PageTask(
+            source_path=task.source_path,
+            relative_path=task.relative_path,
+            output_filename=task.output_filename,
+            parsed_data={
+                key: parsed_data[key] for key in self.FORMAT_KEYS if key in parsed_data
+            },
+        )
+
+    def resolve_subfolder(self, task: PageTask) -> str:
+        """决定页面输出的子文件夹（扁平化结构）
+
+        journals 下的文件 -> Daily Notes/
+        带有分类标签的文件 -> 分类文件夹（首字母大写）
+        其他文件 -> 根目录
+        """
+        if task.relative_path.parent.name == "journals":
+            return self.JOURNALS_FOLDER
+
+        detected_folder = self.formatter.detect_category_folder(task.parsed_data)
+        if detected_folder:
+            return detected_folder.title()
+
+        return ""
+
+    def _load_task(self, task: PageTask) -> Tuple[LocatedUuids, LocatedUuids]:
+        """提取任务的索引数据，索引缓存中的记录仍然有效时不读取文件"""
+        if self.index_cache is None:
+            return self._parse_task(task)
+
+        # 在读取之前获取修改时间和大小，读取期间文件被修改时下次会重新读取
+        key = self.index_cache.file_key(task.source_path)
+        cached = self.index_cache.get_page(task.source_path, key)
+        if cached is not None:
+            task.defined_uuids = [uuid for uuid, _ in cached.definitions]
+            task.referenced_uuids = [uuid for uuid, _ in cached.references]
+            task.hls_link_blocks = cached.hls_link_blocks
+            task.asset_paths = cached.asset_paths
+            task.content_hash = cached.content_hash
+            return cached.definitions, cached.references
+
+        definitions, references = self._parse_task(task)
+        if task.error is None:
+            self.index_cache.put_page(
+                task.source_path,
+                key,
+                CachedPage(
+                    task.content_hash,
+                    definitions,
+                    references,
+                    task.hls_link_blocks,
+                    task.asset_paths,
+                ),
+            )
+        return definitions, references
+
+    def _parse_task(self, task: PageTask) -> Tuple[LocatedUuids, LocatedUuids]:
+        """解析任务对应的文件，并提取块 UUID 和内容哈希
+
+        Returns:
+            (块 ID 定义, 块引用)，均为 (uuid, 行号)；解析失败时为空
+        """
+        try:
+            if self.large_file_threshold and (
+                task.source_path.stat().st_size >= self.large_file_threshold
+            ):
+                definitions, references = self._parse_large_task(task)
+            else:
+                task.parsed_data = self.parser.parse_file(task.source_path)
+                content = task.parsed_data["content"]
+                definitions, references = scan_block_uuids(content)
+                task.hls_link_blocks = self.formatter.extract_hls_link_blocks(
+                    task.parsed_data
+                )
+                task.asset_paths = self.formatter.extract_asset_paths(task.parsed_data)
+                task.content_hash = content_hash(content)
+        except Exception as e:
+            task.error = str(e)
+            return [], []
+
+        task.defined_uuids = [uuid for uuid, _ in definitions]
+        task.referenced_uuids = [uuid for uuid, _ in references]
+        return definitions, references
+
+    def _parse_large_task(self, task: PageTask) -> Tuple[LocatedUuids, LocatedUuids]:
+        """大文件模式：只解析文件头部，块 UUID 等索引只从带有语法标记的行中提取"""
+        definitions: LocatedUuids = []
+        references: LocatedUuids = []
+
+        with MappedFile(task.source_path) as mapped:
+            task.parsed_data = self.parser.parse_mapped_file(mapped)
+
+            def located_lines():
+                for line_number, line in mapped.iter_numbered_matching_lines(
+                    LARGE_FILE_SYNTAX_PATTERN
+                ):
+                    line_definitions, line_references = scan_block_uuids(
+                        line, line_number
+                    )
+                    definitions.extend(line_definitions)
+                    references.extend(line_references)
+                    yield line
+
+            scan = self.formatter.scan_page_lines(located_lines())
+
+        task.hls_link_blocks = scan["hls_link_blocks"]
+        task.asset_paths = scan["asset_paths"]
+        task.parsed_data["original_stats"] = scan["original_stats"]
+        task.content_hash = task.parsed_data["content_hash"]
+        return definitions, references
+
+    def _relative_path(self, md_file: Path) -> Path:
+        """计算相对于 Logseq 目录的路径"""
+        try:
+            return md_file.relative_to(self.logseq_dir)
+        except ValueError:
+            return Path(md_file.name)
+
+
+def asset_relative_path(path: str) -> Optional[str]:
+    """资源引用（../assets/x、../attachments/x、attachments/x）-> 相对于 assets 目录的路径
+
+    不在 assets 目录中的路径（如 ../assets/../x）返回 None
+    """
+    for prefix in ("../assets/", "../attachments/", "attachments/"):
+        if path.startswith(prefix):
+            relative = posixpath.normpath(path[len(prefix) :])
+            if relative == ".." or relative.startswith(("../", "/")):
+                return None
+            return relative
+    return None
+
+
+def content_hash(content: str) -> str:
+    """计算页面内容的哈希"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
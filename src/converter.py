@@ -0,0 +1,645 @@
+"""
+转换引擎
+组合解析、索引、格式化、写入和资源复制各阶段，并记录每个阶段的耗时
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .archive_writer import ARCHIVE_FORMATS
+from .asset_copier import AssetCopier, find_duplicates
+from .block_index import BlockIndex
+from .conversion_pipeline import ConversionPipeline, PageTask
+from .file_manager import FileManager
+from .index_cache import IndexCache
+from .logseq_parser import LogseqParser
+from .manifest import ConversionManifest, ManifestEntry
+from .obsidian_formatter import BLOCK_ID_SEQUENTIAL, ObsidianFormatter
+from .page_writer import PageWriter
+from .storage import StorageBackend
+
+# 资源复制模式：all 复制整个 assets 目录，referenced 只复制被转换页面引用的资源文件
+# （包括块引用、hls__ 链接指向的 PDF 和高亮截图）
+ASSET_MODE_ALL = "all"
+ASSET_MODE_REFERENCED = "referenced"
+ASSET_MODES = (ASSET_MODE_ALL, ASSET_MODE_REFERENCED)
+
+
+@dataclass
+class ConversionOptions:
+    """转换选项"""
+
+    remove_top_level_bullets: bool = False
+    category_tag: Optional[str] = None
+    category_folder: Optional[str] = None
+    dry_run: bool = False
+    copy_assets: bool = True
+    write_report: bool = True
+    # 并行格式化的进程数，1 表示串行
+    jobs: int = 1
+    # 增量转换：根据输出目录中的转换清单，只重新转换变化的页面
+    incremental: bool = False
+    # 块 ID 模式：sequential（block1、block2...）或 stable（由 UUID 哈希得到）
+    block_id_mode: str = BLOCK_ID_SEQUENTIAL
+    # 达到该大小（字节）的文件使用 mmap 流式转换，0 表示不使用
+    large_file_threshold: int = 16 * 1024 * 1024
+    # 索引缓存文件（SQLite），多次转换之间复用未变化文件的索引数据，None 表示不使用
+    index_cache: Optional[Path] = None
+    # 后台写入线程数（串行格式化时与格式化重叠进行，也用于并行复制资源文件），
+    # 0 表示在格式化后直接写入
+    write_threads: int = 4
+    # 资源文件使用硬链接而不是复制（输出目录与 Logseq 目录需要在同一文件系统上；
+    # 在 Obsidian 中修改附件会同时修改 Logseq 中的文件）
+    hardlink_assets: bool = False
+    # 资源复制模式：all 或 referenced
+    asset_mode: str = ASSET_MODE_ALL
+    # 资源去重：内容相同的资源文件只复制一份，页面中的引用改为指向保留的文件
+    dedupe_assets: bool = False
+    # 归档格式（zip、tar、tar.gz、tar.zst）：设置时输出目录作为归档文件路径，
+    # 页面和资源文件直接写入归档，不生成输出目录
+    archive_format: Optional[str] = None
+    # 输出存储后端（如 MemoryStorage 在内存中保存转换结果），设置时忽略 archive_format；
+    # 预览模式下不使用
+    storage: Optional[StorageBackend] = None
+
+
+@dataclass
+class ConversionResult:
+    """转换结果"""
+
+    conversions: List[Dict] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    # 块索引校验报告：重复定义的 UUID 和没有定义的块引用
+    validation: Dict = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return len(self.conversions)
+
+    @property
+    def successful(self) -> int:
+        return len([c for c in self.conversions if c.get("success", False)])
+
+    @property
+    def skipped(self) -> int:
+        return len([c for c in self.conversions if c.get("skipped", False)])
+
+    @property
+    def failed(self) -> int:
+        return self.total - self.successful
+
+    @property
+    def success(self) -> bool:
+        return self.failed == 0
+
+
+class StageTimer:
+    """阶段计时器，按阶段名称累计耗时（秒）"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    @property
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+
+class Converter:
+    """Logseq -> Obsidian 转换引擎
+
+    用法：
+        converter = Converter(logseq_dir, output_dir, ConversionOptions(...))
+        result = converter.run()
+        print(result.timings)
+    """
+
+    ASSETS_SOURCE_DIR = "assets"
+    ASSETS_TARGET_DIR = "attachments"
+
+    def __init__(
+        self,
+        logseq_dir: Path,
+        output_dir: Path,
+        options: Optional[ConversionOptions] = None,
+    ):
+        self.logseq_dir = Path(logseq_dir)
+        self.output_dir = Path(output_dir)
+        self.options = options or ConversionOptions()
+
+        if bool(self.options.category_tag) != bool(self.options.category_folder):
+            raise ValueError("category_tag 和 category_folder 必须同时指定")
+        if self.options.jobs < 1:
+            raise ValueError("jobs 必须大于等于 1")
+        if self.options.large_file_threshold < 0:
+            raise ValueError("large_file_threshold 不能为负数")
+        if self.options.write_threads < 0:
+            raise ValueError("write_threads 不能为负数")
+        if self.options.asset_mode not in ASSET_MODES:
+            raise ValueError(f"未知的资源复制模式: {self.options.asset_mode}")
+        if self.options.archive_format is not None:
+            if self.options.archive_format not in ARCHIVE_FORMATS:
+                raise ValueError(f"未知的归档格式: {self.options.archive_format}")
+            if self.options.incremental:
+                raise ValueError("归档输出不支持增量转换")
+
+        self.parser = LogseqParser()
+        self.formatter = ObsidianFormatter(
+            remove_top_level_bullets=self.options.remove_top_level_bullets,
+            category_tag=self.options.category_tag,
+            category_folder=self.options.category_folder,
+            input_assets_dir=self.logseq_dir / self.ASSETS_SOURCE_DIR,
+            block_id_mode=self.options.block_id_mode,
+        )
+        self.file_manager = FileManager(
+            self.output_dir,
+            dry_run=self.options.dry_run,
+            archive_format=self.options.archive_format,
+            storage=None if self.options.dry_run else self.options.storage,
+        )
+        self.timer = StageTimer()
+        # 最近一次 run 或 validate 构建的全局块索引
+        self.block_index: Optional[BlockIndex] = None
+
+    def run(self) -> ConversionResult:
+        """执行完整转换流程"""
+        if not self.logseq_dir.exists():
+            raise ValueError(f"Logseq 目录不存在: {self.logseq_dir}")
+
+        self.file_manager.open()
+        try:
+            return self._run()
+        finally:
+            self.file_manager.close()
+
+    def _run(self) -> ConversionResult:
+        result = ConversionResult(timings=self.timer.timings)
+        pipeline = self._create_pipeline()
+
+        with self.timer.stage("discover"):
+            md_files = self.file_manager.list_logseq_files(self.logseq_dir)
+            stats = self._stat_files(md_files)
+            previous = self._load_manifest() if self.options.incremental else None
+
+        self._build_indexes(
+            pipeline, md_files, self._known_tasks(pipeline, stats, previous)
+        )
+
+        # 要复制的资源文件；资源去重需要在格式化之前完成，格式化时引用改为指向保留的文件
+        assets = None
+        if self.options.copy_assets:
+            with self.timer.stage("assets"):
+                assets = self._select_assets(pipeline)
+
+        with self.timer.stage("index"):
+            dependency_hashes = [pipeline.dependency_hash(t) for t in pipeline.tasks]
+            result.validation = pipeline.validation_report()
+            self.block_index = pipeline.block_index
+
+        records: Dict[int, Dict] = {}
+        pending = []
+        for index, task in enumerate(pipeline.tasks):
+            entry = previous.get(str(task.relative_path)) if previous else None
+            if self._is_up_to_date(task, entry, dependency_hashes[index]):
+                task.parsed_data = None
+                task.subfolder = entry.subfolder
+                records[index] = skipped_record(task)
+            else:
+                pending.append((index, task))
+
+        if self.options.jobs > 1 and len(pending) > 1:
+            with self.timer.stage("format+write"):
+                records.update(self._format_parallel(pipeline, pending))
+        else:
+            records.update(self._format_serial(pipeline, pending))
+
+        result.conversions = [records[index] for index in sorted(records)]
+
+        with self.timer.stage("manifest"):
+            manifest = self._build_manifest(
+                pipeline, stats, dependency_hashes, records, previous
+            )
+            if previous:
+                self._remove_stale_outputs(previous, manifest)
+            self.file_manager.write_manifest(manifest.to_dict(), manifest.FILENAME)
+
+        if self.options.copy_assets:
+            with self.timer.stage("assets"):
+                self.copy_assets(assets)
+
+        if self.options.write_report:
+            with self.timer.stage("report"):
+                self.file_manager.create_conversion_report(
+                    result.conversions, self.timer.timings
+                )
+
+        return result
+
+    def validate(self) -> Dict:
+        """只解析和构建索引，不写入任何文件，返回块索引校验报告"""
+        if not self.logseq_dir.exists():
+            raise ValueError(f"Logseq 目录不存在: {self.logseq_dir}")
+
+        pipeline = self._create_pipeline()
+
+        with self.timer.stage("discover"):
+            md_files = self.file_manager.list_logseq_files(self.logseq_dir)
+
+        self._build_indexes(pipeline, md_files, keep_parsed=False)
+
+        self.block_index = pipeline.block_index
+        return pipeline.validation_report()
+
+    def _create_pipeline(self) -> ConversionPipeline:
+        return ConversionPipeline(
+            self.logseq_dir,
+            self.formatter,
+            self.parser,
+            large_file_threshold=self.options.large_file_threshold,
+        )
+
+    def _build_indexes(
+        self,
+        pipeline: ConversionPipeline,
+        md_files: List[Path],
+        known: Optional[Dict[Path, PageTask]] = None,
+        keep_parsed: bool = True,
+    ):
+        """解析页面并构建全局索引（parse、index 阶段），使用索引缓存时在结束后保存"""
+        if self.options.index_cache:
+            pipeline.index_cache = IndexCache(self.options.index_cache)
+
+        try:
+            with self.timer.stage("parse"):
+                pipeline.load(md_files, known, keep_parsed)
+
+            with self.timer.stage("index"):
+                pipeline.build_indexes()
+                if pipeline.index_cache:
+                    pipeline.index_cache.prune(self.logseq_dir)
+        finally:
+            if pipeline.index_cache:
+                pipeline.index_cache.close()
+                pipeline.index_cache = None
+
+    def _format_serial(
+        self, pipeline: ConversionPipeline, pending: List[Tuple[int, PageTask]]
+    ) -> Dict[int, Dict]:
+        """逐个格式化页面，由后台线程写入，分别统计格式化和写入耗时
+
+        write 阶段只统计主线程等待写入的时间（队列已满时的背压和最后等待写完）
+        """
+        records: Dict[int, Dict] = {}
+        writer = None
+        if self.options.write_threads:
+            writer = PageWriter(
+                self.file_manager, write_page, threads=self.options.write_threads
+            )
+
+        try:
+            for index, task in pending:
+                with self.timer.stage("format"):
+                    pipeline.ensure_parsed(task)
+                    if task.parsed_data is not None:
+                        pipeline.format_task(task)
+                with self.timer.stage("write"):
+                    if writer is None or task.lines is not None:
+                        # 大文件的输出在写入时才逐行格式化，在主线程中写入
+                        records[index] = write_page(self.file_manager, task)
+                    else:
+                        writer.submit(index, task)
+        finally:
+            if writer is not None:
+                with self.timer.stage("write"):
+                    records.update(writer.close())
+        return records
+
+    def _format_parallel(
+        self, pipeline: ConversionPipeline, pending: List[Tuple[int, PageTask]]
+    ) -> Dict[int, Dict]:
+        """在进程池中并行格式化并写入页面
+
+        全局索引（块 ID 映射、PDF 高亮映射等）在 build_indexes 之后不再变化，
+        随格式化器通过 initializer 只发送给每个工作进程一次；
+        每个任务只携带该页面自己的内容。
+        """
+        records: Dict[int, Dict] = {}
+        jobs_input = []
+        # 存储后端不能在工作进程中写入时（如归档、内存），工作进程只格式化，由主进程写入
+        worker_storage = self.file_manager.storage.for_worker()
+        in_main = worker_storage is None
+        for index, task in pending:
+            pipeline.ensure_parsed(task)
+            if task.parsed_data is None:
+                records[index] = write_page(self.file_manager, task)
+            elif in_main and task.parsed_data.get("large_file"):
+                # 大文件的输出是逐行迭代器，不能发送回主进程，直接在主进程中格式化
+                pipeline.format_task(task)
+                records[index] = write_page(self.file_manager, task)
+            else:
+                jobs_input.append((index, task))
+
+        jobs = min(self.options.jobs, max(len(jobs_input), 1))
+        chunksize = max(1, len(jobs_input) // (jobs * 8))
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_format_worker,
+            initargs=(
+                self.logseq_dir,
+                self.formatter,
+                self.output_dir,
+                worker_storage,
+            ),
+        ) as executor:
+            page_records = executor.map(
+                _format_page if in_main else _format_and_write_page,
+                [pipeline.detach_task(task) for _, task in jobs_input],
+                chunksize=chunksize,
+            )
+            for (index, task), record in zip(jobs_input, page_records):
+                if in_main:
+                    task.subfolder, task.content, task.summary, task.error = record
+                    record = write_page(self.file_manager, task)
+                    task.content = None
+                # 工作进程中的任务是副本，把结果同步回主进程的任务
+                task.parsed_data = None
+                task.subfolder = record.get("subfolder", "")
+                if not record.get("success", False):
+                    task.error = record.get("error")
+                records[index] = record
+
+        return records
+
+    def _stat_files(self, md_files: List[Path]) -> Dict[Path, Tuple[int, int]]:
+        """获取源文件的修改时间和大小"""
+        stats = {}
+        for md_file in md_files:
+            try:
+                stat = md_file.stat()
+            except OSError:
+                continue
+            stats[md_file] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def _manifest_options(self) -> Dict:
+        """影响输出内容的选项，变化时清单失效"""
+        return {
+            "remove_top_level_bullets": self.options.remove_top_level_bullets,
+            "category_tag": self.options.category_tag,
+            "category_folder": self.options.category_folder,
+            "block_id_mode": self.options.block_id_mode,
+        }
+
+    def _load_manifest(self) -> Optional[ConversionManifest]:
+        """读取上一次转换的清单，选项不一致时视为不存在"""
+        data = self.file_manager.read_manifest(ConversionManifest.FILENAME)
+        manifest = ConversionManifest.from_dict(data) if data else None
+        if manifest is None or manifest.options != self._manifest_options():
+            return None
+        return manifest
+
+    def _known_tasks(
+        self,
+        pipeline: ConversionPipeline,
+        stats: Dict[Path, Tuple[int, int]],
+        previous: Optional[ConversionManifest],
+    ) -> Dict[Path, PageTask]:
+        """修改时间和大小都未变化的文件直接使用清单中的记录，不读取文件"""
+        known: Dict[Path, PageTask] = {}
+        if not previous:
+            return known
+
+        for md_file, (mtime_ns, size) in stats.items():
+            relative_path = md_file.relative_to(self.logseq_dir)
+            entry = previous.get(str(relative_path))
+            if entry and entry.matches_stat(mtime_ns, size):
+                known[md_file] = PageTask(
+                    source_path=md_file,
+                    relative_path=relative_path,
+                    output_filename=entry.output_filename,
+                    subfolder=entry.subfolder,
+                    defined_uuids=list(entry.defined_uuids),
+                    referenced_uuids=list(entry.referenced_uuids),
+                    hls_link_blocks=list(entry.hls_link_blocks),
+                    asset_paths=list(entry.asset_paths),
+                    content_hash=entry.content_hash,
+                )
+        return known
+
+    def _is_up_to_date(
+        self, task: PageTask, entry: Optional[ManifestEntry], dependency_hash: str
+    ) -> bool:
+        """页面内容、依赖的全局索引条目都未变化，且输出文件仍然存在"""
+        return (
+            entry is not None
+            and task.error is None
+            and entry.content_hash == task.content_hash
+            and entry.dependency_hash == dependency_hash
+            and entry.output_filename == task.output_filename
+            and self.file_manager.exists(entry.output_path)
+        )
+
+    def _build_manifest(
+        self,
+        pipeline: ConversionPipeline,
+        stats: Dict[Path, Tuple[int, int]],
+        dependency_hashes: List[str],
+        records: Dict[int, Dict],
+        previous: Optional[ConversionManifest] = None,
+    ) -> ConversionManifest:
+        """根据本次转换结果生成新清单
+
+        失败的页面沿用上一次的记录（保留旧的输出文件），并清空内容哈希，下次会重新转换
+        """
+        manifest = ConversionManifest(self._manifest_options())
+
+        for index, task in enumerate(pipeline.tasks):
+            if not records[index].get("success", False):
+                entry = previous.get(str(task.relative_path)) if previous else None
+                if entry is not None:
+                    manifest.set(replace(entry, content_hash=""))
+                continue
+            mtime_ns, size = stats.get(task.source_path, (0, 0))
+            output_path = self.file_manager.output_path(
+                task.output_filename, task.subfolder
+            )
+            manifest.set(
+                ManifestEntry(
+                    source=str(task.relative_path),
+                    content_hash=task.content_hash or "",
+                    mtime_ns=mtime_ns,
+                    size=size,
+                    output_filename=task.output_filename,
+                    subfolder=task.subfolder,
+                    output_path=output_path.relative_to(self.output_dir).as_posix(),
+                    defined_uuids=task.defined_uuids,
+                    referenced_uuids=task.referenced_uuids,
+                    hls_link_blocks=task.hls_link_blocks,
+                    asset_paths=task.asset_paths,
+                    dependency_hash=dependency_hashes[index],
+                )
+            )
+
+        return manifest
+
+    def _remove_stale_outputs(
+        self, previous: ConversionManifest, current: ConversionManifest
+    ):
+        """删除源文件已被删除或输出位置已改变的旧输出文件"""
+        current_outputs = {entry.output_path for entry in current.entries.values()}
+        for source in previous.sources():
+            entry = previous.get(source)
+            if entry.output_path not in current_outputs:
+                self.file_manager.remove_file(entry.output_path)
+
+    def _select_assets(self, pipeline: ConversionPipeline) -> Optional[List[str]]:
+        """决定要复制的资源文件（相对于 assets 目录的路径），None 表示整个 assets 目录
+
+        启用资源去重时，内容重复的文件不复制，格式化器的资源别名指向保留的文件
+        """
+        assets_dir = self.logseq_dir / self.ASSETS_SOURCE_DIR
+        if not assets_dir.exists():
+            return None
+        if self.options.asset_mode == ASSET_MODE_REFERENCED:
+            assets = self.file_manager.resolve_assets(
+                assets_dir, pipeline.referenced_assets()
+            )
+        elif self.options.dedupe_assets:
+            assets = [
+                path.relative_to(assets_dir).as_posix()
+                for path in sorted(assets_dir.rglob("*"))
+                if path.is_file()
+            ]
+        else:
+            return None
+
+        if not self.options.dedupe_assets:
+            return assets
+        aliases = self._asset_aliases(assets_dir, assets, pipeline.highlight_assets())
+        self.formatter.asset_aliases = aliases
+        return [path for path in assets if path not in aliases]
+
+    def _asset_aliases(
+        self, assets_dir: Path, assets: List[str], pinned: Set[str]
+    ) -> Dict[str, str]:
+        """内容相同的资源文件 -> 保留的文件（组内第一个文件）
+
+        PDF 高亮直接引用的文件（pinned）不会被替换，总是保留
+        """
+        groups = find_duplicates(
+            [assets_dir / path for path in assets],
+            threads=max(self.options.write_threads, 1),
+        )
+        aliases: Dict[str, str] = {}
+        saved = 0
+        for group in groups:
+            paths = [path.relative_to(assets_dir).as_posix() for path in group]
+            kept = [path for path in paths if path in pinned] or paths[:1]
+            for path, source in zip(paths, group):
+                if path not in kept:
+                    aliases[path] = kept[0]
+                    saved += source.stat().st_size
+        if aliases:
+            self.file_manager.log(
+                f"资源去重: {len(aliases)} 个重复文件不复制，节省 {saved / 1e6:.1f} MB"
+            )
+        return aliases
+
+    def copy_assets(self, assets: Optional[List[str]] = None) -> List[Path]:
+        """复制 assets 目录到输出目录的 attachments 目录（保留子目录结构）
+
+        assets 为相对于 assets 目录的路径列表时只复制这些文件；
+        使用后台写入线程数并行复制，大小和修改时间未变化的文件跳过
+        """
+        assets_dir = self.logseq_dir / self.ASSETS_SOURCE_DIR
+        if not assets_dir.exists():
+            return []
+        copier = AssetCopier(
+            threads=self.options.write_threads, hardlink=self.options.hardlink_assets
+        )
+        if assets is not None:
+            return self.file_manager.copy_referenced_assets(
+                assets_dir, assets, self.ASSETS_TARGET_DIR, copier
+            )
+        return self.file_manager.copy_asset_tree(
+            assets_dir, self.ASSETS_TARGET_DIR, copier
+        )
+
+
+def skipped_record(task: PageTask) -> Dict:
+    """增量转换中未变化页面的转换记录"""
+    return {
+        "source_file": str(task.relative_path),
+        "target_file": task.output_filename,
+        "subfolder": task.subfolder,
+        "success": True,
+        "skipped": True,
+    }
+
+
+def write_page(file_manager: FileManager, task: PageTask) -> Dict:
+    """写入单个转换结果，返回转换记录"""
+    source_file = str(task.relative_path)
+    if not task.success:
+        return {"source_file": source_file, "success": False, "error": task.error}
+
+    try:
+        if task.lines is not None:
+            file_manager.write_lines(task.output_filename, task.lines, task.subfolder)
+        else:
+            file_manager.write_file(task.output_filename, task.content, task.subfolder)
+    except Exception as e:
+        return {"source_file": source_file, "success": False, "error": str(e)}
+
+    return {
+        "source_file": source_file,
+        "target_file": task.output_filename,
+        "subfolder": task.subfolder,
+        "success": True,
+        "summary": task.summary,
+    }
+
+
+# 工作进程内的全局状态，由 _init_format_worker 在进程启动时设置一次
+_worker_pipeline: Optional[ConversionPipeline] = None
+_worker_file_manager: Optional[FileManager] = None
+
+
+def _init_format_worker(
+    logseq_dir: Path,
+    formatter: ObsidianFormatter,
+    output_dir: Path,
+    storage: Optional[StorageBackend] = None,
+) -> None:
+    """工作进程初始化：接收已构建好全局索引的格式化器和可以直接写入的存储后端"""
+    global _worker_pipeline, _worker_file_manager
+    _worker_pipeline = ConversionPipeline(logseq_dir, formatter)
+    # 没有存储后端时工作进程不写入，只格式化
+    if storage is not None:
+        _worker_file_manager = FileManager(output_dir, storage=storage)
+
+
+def _format_and_write_page(task: PageTask) -> Dict:
+    """在工作进程中格式化并写入单个页面"""
+    assert _worker_pipeline is not None and _worker_file_manager is not None
+    _worker_pipeline.format_task(task)
+    return write_page(_worker_file_manager, task)
+
+
+def _format_page(task: PageTask) -> Tuple:
+    """在工作进程中只格式化单个页面，返回 (子文件夹, 内容, 转换摘要, 错误信息)"""
+    assert _worker_pipeline is not None
+    _worker_pipeline.format_task(task)
+    return task.subfolder, task.content, task.summary, task.error
@@ -3,91 +3,199 @@
 负责文件的读取、写入和目录管理
 """
 
-import shutil
+import copy
+import json
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote
 
+from .asset_copier import AssetCopier
 from .filename_processor import FilenameProcessor
+from .logseq_parser import LogseqParser
+from .storage import StorageBackend, create_storage
 
 
 class FileManager:
-    """文件管理器"""
-
-    def __init__(self, output_dir: Path, dry_run: bool = False):
+    """文件管理器
+
+    输出通过存储后端写入（本地目录、内存、归档文件等，见 storage 模块）；
+    未指定 storage 时根据 dry_run 和 archive_format 选择
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        dry_run: bool = False,
+        log: Callable[[str], None] = print,
+        archive_format: Optional[str] = None,
+        storage: Optional[StorageBackend] = None,
+    ):
         self.output_dir = Path(output_dir)
-        self.dry_run = dry_run
-
-        if not dry_run:
-            # 确保输出目录存在
-            self.output_dir.mkdir(parents=True, exist_ok=True)
+        # 输出消息的函数（如后台写入时收集消息，按批输出）
+        self.log = log
+        self.storage = storage or create_storage(
+            self.output_dir, dry_run, archive_format, log
+        )
+        self.dry_run = self.storage.preview
+
+    def open(self):
+        """开始写入（归档模式下创建归档文件）"""
+        self.storage.open()
+
+    def close(self):
+        """结束写入（归档模式下写入归档结尾）"""
+        self.storage.close()
+
+    def _name(self, path: Path) -> str:
+        """输出路径在存储后端中的名称"""
+        return path.relative_to(self.output_dir).as_posix()
+
+    def _done(self, action: str) -> str:
+        """消息中的动作：预览模式下为“[DRY RUN] 会…”"""
+        return f"[DRY RUN] 会{action}" if self.dry_run else f"已{action}"
+
+    def with_log(self, log: Callable[[str], None]) -> "FileManager":
+        """使用另一个输出函数的副本，与原对象共享存储后端"""
+        clone = copy.copy(self)
+        clone.log = log
+        return clone
+
+    def output_path(self, filename: str, subfolder: str = "") -> Path:
+        """计算文件写入后的实际路径（不写入）"""
+        processed_filename = FilenameProcessor.process_filename(filename)
+        if subfolder:
+            return self.output_dir / subfolder / processed_filename
+        return self.output_dir / processed_filename
 
     def write_file(self, filename: str, content: str, subfolder: str = "") -> Path:
         """写入文件"""
+        return self.write_lines(filename, (content,), subfolder)
+
+    def write_lines(
+        self, filename: str, lines: Iterable[str], subfolder: str = ""
+    ) -> Path:
+        """逐行写入文件，行之间用换行连接（用于大文件的流式输出）"""
         # 处理文件名：解码 URL 编码并替换 Obsidian 不支持的字符
         processed_filename = FilenameProcessor.process_filename(filename)
 
         # 构造完整路径
-        if subfolder:
-            target_dir = self.output_dir / subfolder
-            if not self.dry_run:
-                target_dir.mkdir(parents=True, exist_ok=True)
-        else:
-            target_dir = self.output_dir
-
-        file_path = target_dir / processed_filename
-
-        if self.dry_run:
-            print(f"[DRY RUN] 会写入文件: {file_path}")
-            if processed_filename != filename:
-                print(f"[DRY RUN] 文件名转换: {filename} -> {processed_filename}")
-            print(f"[DRY RUN] 内容长度: {len(content)} 字符")
-            return file_path
-
+        file_path = self.output_path(filename, subfolder)
+        name = self._name(file_path)
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            if processed_filename != filename:
-                print(f"文件名转换: {filename} -> {processed_filename}")
-            print(f"已写入文件: {file_path}")
-            return file_path
-
+            self.storage.write_lines(name, lines)
         except Exception as e:
             raise ValueError(f"写入文件 {file_path} 时出错: {e}") from e
 
+        if processed_filename != filename:
+            self.log(f"文件名转换: {filename} -> {processed_filename}")
+        self.log(f"{self._done('写入')}文件: {self.storage.location(name)}")
+        return file_path
+
+    def exists(self, relative_path: str) -> bool:
+        """输出中是否存在该文件（相对于输出目录的路径）"""
+        return self.storage.exists(relative_path)
+
     def copy_assets(
-        self, source_paths: List[Path], target_subdir: str = "attachments"
+        self,
+        source_paths: List[Path],
+        target_subdir: str = "attachments",
+        copier: Optional[AssetCopier] = None,
     ) -> List[Path]:
         """复制资源文件"""
         target_dir = self.output_dir / target_subdir
-        copied_files = []
-
-        if not self.dry_run:
-            target_dir.mkdir(parents=True, exist_ok=True)
-
+        pairs = []
         for source_path in source_paths:
             if not source_path.exists():
-                print(f"警告：源文件不存在: {source_path}")
-                continue
-
-            target_path = target_dir / source_path.name
-
-            if self.dry_run:
-                print(f"[DRY RUN] 会复制文件: {source_path} -> {target_path}")
-                copied_files.append(target_path)
+                self.log(f"警告：源文件不存在: {source_path}")
                 continue
+            pairs.append((source_path, target_dir / source_path.name))
 
-            try:
-                shutil.copy2(source_path, target_path)
-                print(f"已复制资源文件: {source_path} -> {target_path}")
-                copied_files.append(target_path)
-
-            except Exception as e:
-                print(f"复制文件失败 {source_path}: {e}")
+        return self._copy_files(pairs, target_dir, copier)
 
-        return copied_files
+    def copy_asset_tree(
+        self,
+        assets_dir: Path,
+        target_subdir: str = "attachments",
+        copier: Optional[AssetCopier] = None,
+    ) -> List[Path]:
+        """递归复制资源目录，保留子目录结构（如 PDF 高亮截图目录）"""
+        assets_path = Path(assets_dir)
+        target_dir = self.output_dir / target_subdir
+        pairs = [
+            (source_path, target_dir / source_path.relative_to(assets_path))
+            for source_path in sorted(assets_path.rglob("*"))
+            if source_path.is_file()
+        ]
+        return self._copy_files(pairs, target_dir, copier)
+
+    def copy_referenced_assets(
+        self,
+        assets_dir: Path,
+        relative_paths: Iterable[str],
+        target_subdir: str = "attachments",
+        copier: Optional[AssetCopier] = None,
+    ) -> List[Path]:
+        """只复制资源目录中指定的文件（相对于资源目录的路径），保留子目录结构"""
+        assets_path = Path(assets_dir)
+        target_dir = self.output_dir / target_subdir
+        pairs = [
+            (assets_path / relative_path, target_dir / relative_path)
+            for relative_path in self.resolve_assets(assets_path, relative_paths)
+        ]
+        return self._copy_files(pairs, target_dir, copier)
+
+    def resolve_assets(
+        self, assets_dir: Path, relative_paths: Iterable[str]
+    ) -> List[str]:
+        """资源目录中实际存在的文件（相对于资源目录的路径），不存在的文件给出警告
+
+        路径不存在时尝试 URL 解码后的路径（Logseq 可能对资源链接进行 URL 编码）
+        """
+        assets_path = Path(assets_dir)
+        resolved = []
+        for relative_path in relative_paths:
+            for candidate in dict.fromkeys((relative_path, unquote(relative_path))):
+                if (assets_path / candidate).is_file():
+                    resolved.append(candidate)
+                    break
+            else:
+                self.log(f"警告：引用的资源文件不存在: {assets_path / relative_path}")
+        return list(dict.fromkeys(resolved))
+
+    def _copy_files(
+        self,
+        pairs: List[Tuple[Path, Path]],
+        target_dir: Path,
+        copier: Optional[AssetCopier],
+    ) -> List[Path]:
+        """复制 (源文件, 目标文件)，跳过未变化的文件，返回复制成功（或无需复制）的目标文件"""
+        stats = self.storage.copy_files(
+            [
+                (source_path, self._name(target_path))
+                for source_path, target_path in pairs
+            ],
+            copier or AssetCopier(),
+        )
+
+        for source_path, error in stats.failed:
+            self.log(f"复制文件失败 {source_path}: {error}")
+        skipped = f"，{stats.skipped} 个未变化已跳过" if stats.skipped else ""
+        self.log(
+            f"{self._done('复制')} {stats.transferred} 个资源文件到: "
+            f"{self.storage.location(self._name(target_dir))}{skipped}"
+        )
+
+        failed = {source_path for source_path, _ in stats.failed}
+        return [
+            target_path
+            for source_path, target_path in pairs
+            if source_path not in failed
+        ]
 
-    def create_conversion_report(self, conversions: List[Dict]) -> Path:
-        """创建转换报告"""
+    def create_conversion_report(
+        self, conversions: List[Dict], timings: Optional[Dict[str, float]] = None
+    ) -> Path:
+        """创建转换报告（可选附带各阶段耗时）"""
         report_lines = [
             "# Logseq to Obsidian 转换报告",
             f"生成时间: {self._get_timestamp()}",
@@ -96,16 +204,27 @@ class FileManager:
             f"- 总文件数: {len(conversions)}",
             f"- 成功转换: {len([c for c in conversions if c.get('success', False)])}",
             f"- 转换失败: {len([c for c in conversions if not c.get('success', False)])}",
-            "",
-            "## 详细信息",
-            "",
         ]
 
+        skipped = len([c for c in conversions if c.get("skipped", False)])
+        if skipped:
+            report_lines.append(f"- 未变化（跳过）: {skipped}")
+        report_lines.append("")
+
+        if timings:
+            report_lines.extend(["## 阶段耗时", ""])
+            for stage, seconds in timings.items():
+                report_lines.append(f"- {stage}: {seconds:.3f}s")
+            report_lines.append(f"- 合计: {sum(timings.values()):.3f}s")
+            report_lines.append("")
+
+        report_lines.extend(["## 详细信息", ""])
+
         for i, conversion in enumerate(conversions, 1):
             report_lines.extend(
                 [
                     f"### {i}. {conversion.get('source_file', 'Unknown')}",
-                    f"- 状态: {'✅ 成功' if conversion.get('success', False) else '❌ 失败'}",
+                    f"- 状态: {self._status_text(conversion)}",
                     f"- 目标文件: {conversion.get('target_file', 'N/A')}",
                     "",
                 ]
@@ -134,6 +253,45 @@ class FileManager:
         report_content = "\n".join(report_lines)
         return self.write_file("conversion_report.md", report_content)
 
+    def _status_text(self, conversion: Dict) -> str:
+        """报告中的转换状态"""
+        if not conversion.get("success", False):
+            return "❌ 失败"
+        if conversion.get("skipped", False):
+            return "⏭️ 未变化（跳过）"
+        return "✅ 成功"
+
+    def write_manifest(self, manifest_data: Dict, filename: str) -> Path:
+        """写入转换清单（JSON），与转换报告放在同一目录"""
+        manifest_path = self.output_dir / filename
+        data = json.dumps(manifest_data, ensure_ascii=False, indent=1)
+        try:
+            self.storage.write_bytes(filename, data.encode("utf-8"))
+        except Exception as e:
+            raise ValueError(f"写入转换清单 {manifest_path} 时出错: {e}") from e
+        return manifest_path
+
+    def read_manifest(self, filename: str) -> Optional[Dict]:
+        """读取转换清单，不存在或无法解析时返回 None"""
+        data = self.storage.read_bytes(filename)
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            return None
+
+    def remove_file(self, relative_path: str) -> bool:
+        """删除输出中的文件（用于清理已删除或已移动的页面）"""
+        if self.dry_run:
+            self.log(f"[DRY RUN] 会删除文件: {self.output_dir / relative_path}")
+            return True
+
+        if not self.storage.remove(relative_path):
+            return False
+        self.log(f"已删除文件: {self.storage.location(relative_path)}")
+        return True
+
     def _get_timestamp(self) -> str:
         """获取当前时间戳"""
         from datetime import datetime
@@ -171,16 +329,15 @@ class FileManager:
 
     def get_asset_paths(self, logseq_dir: Path, content: str) -> List[Path]:
         """从内容中提取资源文件路径"""
-        import re
-
         logseq_path = Path(logseq_dir)
         asset_paths = []
 
-        # 提取图片等资源文件引用
-        asset_pattern = re.compile(r"!\[([^\]]*)\]\(([^)]+)\)")
-
-        for match in asset_pattern.finditer(content):
-            asset_url = match.group(2)
+        # 逐个消费资源引用，不构建完整的引用列表（meta 属性中的资源也包含在内）
+        references = LogseqParser().iter_references(
+            content, types=("asset",), include_meta=True
+        )
+        for reference in references:
+            asset_url = reference.target
 
             # 处理相对路径
             if asset_url.startswith("../assets/"):
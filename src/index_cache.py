@@ -0,0 +1,212 @@
+"""
+索引缓存
+把每个源文件提取出的索引数据（块 UUID、hls__ 链接、资源路径、内容哈希、PDF 高亮）保存在
+SQLite 数据库中，按文件的修改时间和大小判断是否失效，多次转换之间共享
+"""
+
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .block_index import LocatedUuids
+
+# (修改时间 ns, 大小)
+FileKey = Tuple[int, int]
+
+
+@dataclass(slots=True)
+class CachedPage:
+    """页面的索引数据"""
+
+    content_hash: str
+    # (uuid, 行号)，按出现顺序
+    definitions: LocatedUuids
+    references: LocatedUuids
+    hls_link_blocks: List[str]
+    # ../assets/ 资源引用的路径，按出现顺序
+    asset_paths: List[str] = field(default_factory=list)
+
+
+class IndexCache:
+    """保存在 SQLite 中的索引缓存
+
+    文件以绝对路径为键，同一个缓存文件可以被多个 Logseq 目录共享；
+    所有修改在 close 时一次提交
+    """
+
+    VERSION = 2
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS pages ("
+        "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, content_hash TEXT, "
+        "definitions TEXT, refs TEXT, hls_link_blocks TEXT, asset_paths TEXT)",
+        "CREATE TABLE IF NOT EXISTS sources ("
+        "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, payload TEXT)",
+    )
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 本次打开后读取或写入过的文件，用于清理已删除文件的记录
+        self._seen: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        # 页面记录：路径 -> 数据库中的一行，第一次查询时读取
+        self._pages: Optional[Dict[str, tuple]] = None
+
+        self.connection = sqlite3.connect(str(self.path))
+        try:
+            self._ensure_schema()
+        except sqlite3.DatabaseError:
+            # 不是有效的数据库文件（如损坏），重新创建
+            self.connection.close()
+            self.path.unlink()
+            self.connection = sqlite3.connect(str(self.path))
+            self._ensure_schema()
+
+    def _ensure_schema(self):
+        """创建表；版本不一致时丢弃旧缓存"""
+        try:
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'version'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # 新数据库，还没有 meta 表
+            row = None
+
+        if row is None or row[0] != str(self.VERSION):
+            for table in ("meta", "pages", "sources"):
+                self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(self.VERSION),)
+        )
+
+    @staticmethod
+    def file_key(path: Path) -> Optional[FileKey]:
+        """文件的修改时间和大小，无法访问时返回 None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _cache_path(path: Path) -> str:
+        # abspath 只处理字符串，不像 resolve 那样逐级访问文件系统
+        return os.path.abspath(path)
+
+    def get_page(self, path: Path, key: Optional[FileKey]) -> Optional[CachedPage]:
+        """读取页面的索引数据，文件已变化或没有记录时返回 None"""
+        if key is None:
+            return None
+        if self._pages is None:
+            # 第一次查询时一次性读取所有页面记录，避免逐个查询
+            self._pages = {
+                row[0]: row[1:]
+                for row in self.connection.execute(
+                    "SELECT path, mtime_ns, size, content_hash, definitions, refs, "
+                    "hls_link_blocks, asset_paths FROM pages"
+                )
+            }
+
+        cache_path = self._cache_path(path)
+        row = self._pages.get(cache_path)
+        if row is None or (row[0], row[1]) != key:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._seen.add(cache_path)
+        content_hash, definitions, references, hls_link_blocks, asset_paths = row[2:]
+        return CachedPage(
+            content_hash=content_hash,
+            definitions=_load_located(definitions),
+            references=_load_located(references),
+            hls_link_blocks=hls_link_blocks.split("\n") if hls_link_blocks else [],
+            asset_paths=asset_paths.split("\n") if asset_paths else [],
+        )
+
+    def put_page(self, path: Path, key: Optional[FileKey], page: CachedPage):
+        """保存页面的索引数据（key 应在读取文件之前获取）"""
+        if key is None:
+            return
+        cache_path = self._cache_path(path)
+        self._seen.add(cache_path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                cache_path,
+                *key,
+                page.content_hash,
+                _dump_located(page.definitions),
+                _dump_located(page.references),
+                "\n".join(page.hls_link_blocks),
+                "\n".join(page.asset_paths),
+            ),
+        )
+
+    def cached(self, path: Path, load: Callable[[Path], Dict]) -> Dict:
+        """返回 load(path) 的结果，文件未变化时直接使用缓存
+
+        load 的返回值必须可以序列化为 JSON；每个文件只对应一种 load 函数
+        （hls__ 文件、.edn 文件），load 的结果格式变化时需要增加 VERSION
+        """
+        key = self.file_key(path)
+        cache_path = self._cache_path(path)
+        if key is not None:
+            row = self.connection.execute(
+                "SELECT payload FROM sources WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (cache_path, *key),
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                self._seen.add(cache_path)
+                return json.loads(row[0])
+
+        self.misses += 1
+        result = load(path)
+        if key is not None:
+            self._seen.add(cache_path)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                (cache_path, *key, json.dumps(result, ensure_ascii=False)),
+            )
+        return result
+
+    def prune(self, root: Path):
+        """删除 root 目录下本次没有用到的记录（源文件已删除）"""
+        prefix = os.path.join(self._cache_path(root), "")
+        for table in ("pages", "sources"):
+            stale = [
+                (path,)
+                for (path,) in self.connection.execute(f"SELECT path FROM {table}")
+                if path.startswith(prefix) and path not in self._seen
+            ]
+            self.connection.executemany(f"DELETE FROM {table} WHERE path = ?", stale)
+
+    def close(self):
+        """提交修改并关闭数据库"""
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self) -> "IndexCache":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _dump_located(located: LocatedUuids) -> str:
+    """(uuid, 行号) 列表编码为 "uuid 行号 uuid 行号 ..."（UUID 中没有空白字符）"""
+    return " ".join(f"{uuid} {line}" for uuid, line in located)
+
+
+def _load_located(data: str) -> LocatedUuids:
+    items = data.split()
+    return [(items[i], int(items[i + 1])) for i in range(0, len(items), 2)]
@@ -3,13 +3,46 @@ Logseq 解析器
 负责解析 Logseq markdown 文件，提取关键元素
 """
 
+import codecs
+import hashlib
+import mmap
+import os
 import re
-from dataclasses import dataclass
+from array import array
+from collections.abc import MutableMapping, Sequence
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    Union,
+)
 
+# 大文件模式下校验编码、计算哈希时每次处理的字节数
+LARGE_FILE_CHUNK_SIZE = 1 << 20
 
-@dataclass
+REFERENCE_TYPES = frozenset(("page_link", "block_ref", "asset"))
+
+# 解析结果中按引用类型分组的字段
+REFERENCE_KEYS = {
+    "page_links": "page_link",
+    "block_refs": "block_ref",
+    "assets": "asset",
+}
+
+SPACE_RUN_PATTERN = re.compile(r" +")
+
+# 块的属性行（如 "id:: ..."、"collapsed:: true"）
+PROPERTY_LINE_PATTERN = re.compile(r"^\s*(\w+(?:-\w+)*):: ?(.*?)\s*$")
+
+
+@dataclass(slots=True)
 class LogseqBlock:
     """Logseq 块数据结构"""
 
@@ -19,7 +52,7 @@ class LogseqBlock:
     line_number: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class LogseqReference:
     """Logseq 引用数据结构"""
 
@@ -29,7 +62,7 @@ class LogseqReference:
     position: Tuple[int, int] = (0, 0)  # (start, end)
 
 
-@dataclass
+@dataclass(slots=True)
 class LogseqMetaProperty:
     """Logseq meta 属性数据结构"""
 
@@ -39,6 +72,405 @@ class LogseqMetaProperty:
     line_number: int
 
 
+class BlockTable(Sequence):
+    """按列存储的块表（struct-of-arrays）
+
+    每个块只占用几个数组元素（内容偏移、长度、缩进层级、行号），
+    块内容不单独保存字符串，访问时才从文件内容中切片并创建 LogseqBlock
+    """
+
+    __slots__ = ("content", "starts", "lengths", "levels", "line_numbers", "block_ids")
+
+    def __init__(self, content: str):
+        self.content = content
+        self.starts = array("Q")
+        self.lengths = array("I")
+        self.levels = array("I")
+        self.line_numbers = array("I")
+        # 只有少数块带有块 ID：行索引 -> 块 ID
+        self.block_ids: Dict[int, str] = {}
+
+    def append(
+        self,
+        start: int,
+        length: int,
+        level: int,
+        line_number: int,
+        block_id: Optional[str] = None,
+    ):
+        """添加一个块（start、length 为块内容在文件内容中的位置）"""
+        if block_id is not None:
+            self.block_ids[len(self.starts)] = block_id
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.levels.append(level)
+        self.line_numbers.append(line_number)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("block index out of range")
+        start = self.starts[index]
+        return LogseqBlock(
+            content=self.content[start : start + self.lengths[index]],
+            block_id=self.block_ids.get(index),
+            level=self.levels[index],
+            line_number=self.line_numbers[index],
+        )
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (BlockTable, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"BlockTable({list(self)!r})"
+
+
+@dataclass(slots=True, eq=False)
+class OutlineNode:
+    """大纲树中的块：块自身的行（首行、属性行、续行）和子块
+
+    不以列表符号开头的顶层文本（如标题、段落）也作为一个节点，is_bullet 为 False
+    """
+
+    line_number: int
+    level: int
+    lines: List[str]
+    is_bullet: bool = True
+    block_id: Optional[str] = None
+    properties: Dict[str, str] = field(default_factory=dict)
+    children: List["OutlineNode"] = field(default_factory=list)
+    parent: Optional["OutlineNode"] = field(default=None, repr=False)
+
+    @property
+    def content(self) -> str:
+        """首行去掉缩进和列表符号后的内容"""
+        head = self.lines[0].strip()
+        if self.is_bullet:
+            head = head[2:] if head.startswith("- ") else head[1:]
+        return head
+
+    def walk(self) -> Iterator["OutlineNode"]:
+        """先序遍历自身和所有后代（不递归，嵌套再深也不会超出递归深度）"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def iter_lines(self) -> Iterator[str]:
+        """按原文顺序产出自身和所有后代的行"""
+        if not self.children:
+            return iter(self.lines)
+        return (line for node in self.walk() for line in node.lines)
+
+
+def indent_level(whitespace: str) -> int:
+    """缩进层级：制表符算 1 级，连续的空格每 2 个算 1 级，其他空白字符不计"""
+    if not whitespace.strip(" "):
+        return len(whitespace) // 2
+    return whitespace.count("\t") + sum(
+        len(run) // 2 for run in SPACE_RUN_PATTERN.findall(whitespace)
+    )
+
+
+def outline_level(line: str) -> int:
+    """行在大纲中的层级，行首不是制表符或两个空格时为顶层（0）"""
+    if not line.startswith(("\t", "  ")):
+        return 0
+    return indent_level(line[: len(line) - len(line.lstrip())])
+
+
+def _is_bullet(body: str) -> bool:
+    """去掉缩进后的行是否为列表项（"- 内容" 或单独的 "-"）"""
+    return body.startswith("- ") or body.rstrip() == "-"
+
+
+def iter_top_level_blocks(
+    lines: Iterable[str], first_line_number: int = 1
+) -> Iterator[Tuple[int, List[str]]]:
+    """把行按大纲的顶层块分组，产出 (首行行号, 块及其所有后代的行)
+
+    与 iter_outline 的顶层节点一一对应，但不创建节点，适合只需要按顶层块处理的场景：
+    - 列表项的层级不超过当前顶层块时开始新的顶层块
+    - 空行、缩进的行属于当前块；顶层的非列表文本在列表项之后开始新的顶层块
+    """
+    group: Optional[List[str]] = None
+    group_line_number = first_line_number
+    root_level = 0
+    last_is_bullet = False
+
+    for line_number, line in enumerate(lines, first_line_number):
+        body = line.lstrip()
+        level = outline_level(line) if len(body) != len(line) else 0
+        is_bullet = _is_bullet(body)
+
+        if group is not None:
+            if is_bullet:
+                nested = level > root_level
+            else:
+                nested = not body or level > 0 or not last_is_bullet
+            if nested:
+                group.append(line)
+                last_is_bullet = last_is_bullet or is_bullet
+                continue
+            yield group_line_number, group
+
+        group = [line]
+        group_line_number = line_number
+        root_level = level
+        last_is_bullet = is_bullet
+
+    if group is not None:
+        yield group_line_number, group
+
+
+def iter_outline(
+    lines: Iterable[str], first_line_number: int = 1
+) -> Iterator[OutlineNode]:
+    """用一个栈单遍构建大纲树，每个顶层块结束时产出它
+
+    - 列表项按层级挂到栈中最近的更浅的块下，每行最多入栈、出栈一次
+    - 属性行、续行和空行属于最近开始的块；id:: 记录为块 ID
+    - 顶层的非列表文本开始一个新的顶层节点
+
+    同一时间只保留当前顶层块，因此可以用于流式的行迭代器
+    """
+    for line_number, group in iter_top_level_blocks(lines, first_line_number):
+        yield _build_block_tree(group, line_number)
+
+
+def _build_block_tree(lines: List[str], first_line_number: int) -> OutlineNode:
+    """从一个顶层块的行构建子树（首行为顶层节点）"""
+    root = OutlineNode(
+        first_line_number,
+        outline_level(lines[0]),
+        [lines[0]],
+        is_bullet=_is_bullet(lines[0].lstrip()),
+    )
+    stack = [root]
+    for line_number, line in enumerate(lines[1:], first_line_number + 1):
+        body = line.lstrip()
+        if _is_bullet(body):
+            level = outline_level(line)
+            while stack[-1].level >= level:
+                stack.pop()
+            node = OutlineNode(line_number, level, [line], parent=stack[-1])
+            stack[-1].children.append(node)
+            stack.append(node)
+            continue
+
+        owner = stack[-1]
+        owner.lines.append(line)
+        match = PROPERTY_LINE_PATTERN.match(line) if "::" in line else None
+        if match and match.group(1) == "id":
+            owner.block_id = match.group(2)
+        elif match:
+            owner.properties[match.group(1)] = match.group(2)
+    return root
+
+
+class ParseResult(MutableMapping):
+    """parse_content 的解析结果
+
+    filename、content、meta_properties 立即可用；blocks、references、page_links、
+    block_refs、assets 在第一次访问时才计算并缓存。用法与 dict 相同，
+    只需要 meta 属性或内容的调用方（如分类检测）不再为提取块和引用付出代价
+    """
+
+    LAZY_KEYS = ("blocks", "references", *REFERENCE_KEYS)
+
+    __slots__ = ("_parser", "_data", "_pending")
+
+    def __init__(self, parser: "LogseqParser", data: Dict):
+        self._parser = parser
+        self._data = data
+        # 尚未计算的字段
+        self._pending = set(self.LAZY_KEYS) - data.keys()
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            self._data[key] = self._compute(key)
+            self._pending.discard(key)
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        if key in self._pending:
+            self._pending.discard(key)
+        else:
+            del self._data[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._data or key in self._pending
+
+    def __iter__(self):
+        yield from self._data
+        yield from (key for key in self.LAZY_KEYS if key in self._pending)
+
+    def __len__(self) -> int:
+        return len(self._data) + len(self._pending)
+
+    def __repr__(self) -> str:
+        pending = ", ".join(key for key in self.LAZY_KEYS if key in self._pending)
+        return f"ParseResult({self._data!r}, pending=[{pending}])"
+
+    def _compute(self, key: str):
+        content = self._data["content"]
+        if key == "blocks":
+            return self._parser.build_block_table(content)
+        if key == "references":
+            return list(self._parser.iter_references(content))
+
+        # 按类型分组：已经有完整的引用列表时直接筛选，否则只扫描这一种引用
+        reference_type = REFERENCE_KEYS[key]
+        if "references" in self._data:
+            return [
+                ref for ref in self._data["references"] if ref.type == reference_type
+            ]
+        return list(self._parser.iter_references(content, types=(reference_type,)))
+
+
+def decode_utf8(raw_bytes: bytes) -> Tuple[str, List[Tuple[int, int]]]:
+    """按 UTF-8 解码，无效字节替换为 U+FFFD，并返回无效字节的区间"""
+    try:
+        return raw_bytes.decode("utf-8"), []
+    except UnicodeDecodeError:
+        pass
+
+    # 从上一个错误之后继续严格解码；memoryview 切片不复制数据，
+    # 每段只解码到下一个错误为止，总代价与文件大小成线性
+    view = memoryview(raw_bytes)
+    parts: List[str] = []
+    error_spans: List[Tuple[int, int]] = []
+    position = 0
+    while position < len(raw_bytes):
+        try:
+            text, _ = codecs.utf_8_decode(view[position:], "strict", True)
+            parts.append(text)
+            break
+        except UnicodeDecodeError as e:
+            parts.append(str(view[position : position + e.start], "utf-8"))
+            parts.append("\ufffd")
+            error_spans.append((position + e.start, position + e.end))
+            position += e.end
+    return "".join(parts), error_spans
+
+
+def iter_lines(content: Union[str, Iterable[str]]) -> Iterator[str]:
+    """逐行产出内容（与 content.split("\n") 一致），不构建行列表"""
+    if not isinstance(content, str):
+        yield from content
+        return
+
+    start = 0
+    while True:
+        end = content.find("\n", start)
+        if end < 0:
+            yield content[start:]
+            return
+        yield content[start:end]
+        start = end + 1
+
+
+class MappedFile:
+    """只读内存映射的文件（大文件模式）
+
+    按行产出字节切片，只有需要时才解码，内存占用与单行大小相当，而不是整个文件
+    """
+
+    def __init__(self, file_path: Path, chunk_size: int = LARGE_FILE_CHUNK_SIZE):
+        self.path = Path(file_path)
+        self.chunk_size = chunk_size
+        self.data = b""
+        self._file = None
+
+    def __enter__(self) -> "MappedFile":
+        self._file = open(self.path, "rb")
+        # 空文件不能映射
+        if os.fstat(self._file.fileno()).st_size:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc_info):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b""
+        self._file.close()
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """按 "\n" 分割为字节行，结果与 content.split("\n") 一一对应"""
+        data = self.data
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                yield data[start:]
+                return
+            yield data[start:end]
+            start = end + 1
+
+    def iter_text_lines(self) -> Iterator[str]:
+        """逐行解码（无效字节替换为 U+FFFD）"""
+        for line in self.iter_lines():
+            yield decode_utf8(line)[0]
+
+    def iter_numbered_matching_lines(
+        self, pattern: Pattern[bytes]
+    ) -> Iterator[Tuple[int, str]]:
+        """只解码包含 pattern 匹配的行，产出 (行号, 行)，其余行不会被解码
+
+        行号只统计上一个匹配行之后的换行符，不会重新扫描整个文件
+        """
+        data = self.data
+        next_start = 0
+        line_number = 1
+        for match in pattern.finditer(data):
+            if match.start() < next_start:
+                continue
+            start = data.rfind(b"\n", 0, match.start()) + 1
+            end = data.find(b"\n", match.end())
+            if end < 0:
+                end = len(data)
+            line_number += self._count_newlines(next_start, start)
+            yield line_number, decode_utf8(data[start:end])[0]
+            next_start = end + 1
+            line_number += 1
+
+    def _count_newlines(self, start: int, end: int) -> int:
+        """统计 [start, end) 中的换行符数量，按块切片，避免复制大段数据"""
+        count = 0
+        for chunk_start in range(start, end, self.chunk_size):
+            chunk_end = min(chunk_start + self.chunk_size, end)
+            count += self.data[chunk_start:chunk_end].count(b"\n")
+        return count
+
+    def iter_chunks(self) -> Iterator[Tuple[int, bytes]]:
+        """按行边界切分的字节块 (offset, chunk)
+
+        无效的 UTF-8 序列不会跨过换行符，因此逐块解码与整体解码结果一致
+        """
+        data = self.data
+        start = 0
+        while start < len(data):
+            end = data.find(b"\n", start + self.chunk_size)
+            end = len(data) if end < 0 else end + 1
+            yield start, data[start:end]
+            start = end
+
+
 class LogseqParser:
     """Logseq 文件解析器"""
 
@@ -51,190 +483,333 @@ class LogseqParser:
         # Meta 属性模式（支持前面有列表标记）
         self.meta_pattern = re.compile(r"^(?:[-*]\s+)?(\w+(?:-\w+)*)::\s*(.+)$")
 
-    def _read_file_robust(self, file_path: Path) -> Tuple[str, bool]:
+    def _read_file_robust(self, file_path: Path) -> Tuple[str, List[Tuple[int, int]]]:
         """
         健壮地读取文件，处理UTF-8编码错误
 
+        文件只以二进制方式读取一次，解码在内存中完成：无效的 UTF-8 字节
+        替换为 U+FFFD（与 errors="replace" 结果一致）。
+
         Returns:
-            Tuple[str, bool]: (文件内容, 是否有编码错误)
+            Tuple[str, List[Tuple[int, int]]]: (文件内容, 无效字节的区间列表)
         """
-        # 首先尝试正常读取
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            return content, False
-        except UnicodeDecodeError:
-            pass
-
-        # 如果UTF-8失败，尝试使用 'replace' 错误处理
-        try:
-            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                content = f.read()
-                print(f"⚠️  文件 {file_path.name} 含有无效UTF-8字符，已使用替换字符处理")
-                return content, True
-        except OSError:
-            pass
-
-        # 如果还是失败，尝试 'ignore' 错误处理
-        try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-                print(f"⚠️  文件 {file_path.name} 含有无效UTF-8字符，已忽略错误字符")
-                return content, True
-        except OSError:
-            pass
-
-        # 最后尝试二进制读取并手动处理
-        try:
-            with open(file_path, "rb") as f:
-                raw_bytes = f.read()
-
-            # 尝试解码，如果遇到错误就替换
-            content = raw_bytes.decode("utf-8", errors="replace")
-            print(f"⚠️  文件 {file_path.name} 使用二进制读取模式处理编码错误")
-            return content, True
-
-        except OSError as e:
-            # 如果所有方法都失败，返回错误信息
-            error_content = f"# 文件读取失败\n\n无法读取文件 {file_path.name}，错误：{e}\n"
-            print(f"❌ 无法读取文件 {file_path.name}: {e}")
-            return error_content, True
+        with open(file_path, "rb") as f:
+            raw_bytes = f.read()
+
+        content, error_spans = decode_utf8(raw_bytes)
+        if error_spans:
+            print(
+                f"⚠️  文件 {file_path.name} 含有 {len(error_spans)} 处无效UTF-8字符，"
+                f"已使用替换字符处理"
+            )
+        return content, error_spans
 
     def parse_file(self, file_path: Path) -> Dict:
         """解析单个 Logseq 文件"""
         try:
-            content, has_encoding_errors = self._read_file_robust(file_path)
+            content, error_spans = self._read_file_robust(file_path)
 
             result = self.parse_content(content, file_path.name)
 
-            # 在结果中添加编码错误信息
-            result["has_encoding_errors"] = has_encoding_errors
+            # 在结果中添加编码错误信息（字节偏移区间）
+            result["has_encoding_errors"] = bool(error_spans)
+            result["encoding_error_count"] = len(error_spans)
+            result["encoding_error_offsets"] = error_spans
 
             return result
 
         except Exception as e:
             raise ValueError(f"解析文件 {file_path} 时出错: {e}") from e
 
-    def parse_content(self, content: str, filename: str = "") -> Dict:
-        """解析 Logseq 文件内容"""
+    def parse_content(self, content: str, filename: str = "") -> ParseResult:
+        """解析 Logseq 文件内容
+
+        只立即解析文件开头的 meta 属性，块和引用在第一次访问时才提取（见 ParseResult）
+        """
+        meta_properties, _ = self._parse_meta_header(iter_lines(content))
+        return ParseResult(
+            self,
+            {
+                "filename": filename,
+                "content": content,
+                "meta_properties": meta_properties,
+            },
+        )
+
+    def build_block_table(self, content: str) -> BlockTable:
+        """提取正文（meta 区域之后）中的所有块"""
         lines = content.split("\n")
+        blocks = BlockTable(content)
+
+        offset = None
+        for line_num, line in self._iter_body_lines(lines):
+            # 当前行在文件内容中的起始位置（正文行是连续的）
+            if offset is None:
+                offset = sum(len(previous) + 1 for previous in lines[: line_num - 1])
+
+            fields = self._block_fields(line)
+            if fields:
+                start, end, level, block_id = fields
+                blocks.append(offset + start, end - start, level, line_num, block_id)
+            offset += len(line) + 1
+
+        return blocks
+
+    def iter_blocks(self, content: Union[str, Iterable[str]]) -> Iterator[LogseqBlock]:
+        """逐个产出块（与 parse_content 的 blocks 一致），不构建列表
 
-        blocks = []
-        references = []
+        Args:
+            content: 文件内容，或逐行的迭代器（如 MappedFile.iter_text_lines()）
+        """
+        for line_num, line in self._iter_body_lines(iter_lines(content)):
+            block = self._parse_line_as_block(line, line_num)
+            if block:
+                yield block
+
+    def parse_outline(self, content: Union[str, Iterable[str]]) -> List[OutlineNode]:
+        """构建正文（meta 区域之后）的大纲树，返回顶层块
+
+        Args:
+            content: 文件内容，或逐行的迭代器
+        """
+        body = self._iter_body_lines(iter_lines(content))
+        first = next(body, None)
+        if first is None:
+            return []
+
+        first_line_number, first_line = first
+
+        def body_lines():
+            yield first_line
+            for _, line in body:
+                yield line
+
+        return list(iter_outline(body_lines(), first_line_number))
+
+    def iter_references(
+        self,
+        content: Union[str, Iterable[str]],
+        types: Optional[Iterable[str]] = None,
+        include_meta: bool = False,
+    ) -> Iterator[LogseqReference]:
+        """逐个产出引用（与 parse_content 的 references 一致），不构建列表
+
+        Args:
+            content: 文件内容，或逐行的迭代器
+            types: 只产出这些类型（'page_link'、'block_ref'、'asset'），默认全部
+            include_meta: 是否包含文件开头 meta 区域中的引用
+        """
+        types = REFERENCE_TYPES if types is None else frozenset(types)
+        lines = iter_lines(content)
+        if include_meta:
+            numbered_lines = enumerate(lines, 1)
+        else:
+            numbered_lines = self._iter_body_lines(lines)
+
+        for _, line in numbered_lines:
+            yield from self._iter_line_references(line, types)
+
+    def _iter_body_lines(self, lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+        """跳过文件开头的 meta 区域，逐行产出 (行号, 行)"""
+        in_header = True
+        for line_num, line in enumerate(lines, 1):
+            if in_header and self._is_header_line(line):
+                continue
+            in_header = False
+            yield line_num, line
+
+    def _is_header_line(self, line: str) -> bool:
+        """是否为文件开头 meta 区域中的行（空行、meta 属性、单独的标签或 '-'）"""
+        stripped_line = line.strip()
+        return (
+            not stripped_line
+            or bool(self.meta_pattern.match(line))
+            or bool(re.match(r"^[-*]\s+#\w+\s*$", line))
+            or stripped_line == "-"
+        )
+
+    def _parse_meta_header(
+        self, lines: Iterable[str]
+    ) -> Tuple[List[LogseqMetaProperty], int]:
+        """解析文件开头的 meta 属性，返回 (meta 属性, meta 区域的行数)
+
+        遇到第一行实际内容时停止，不会读取之后的行
+        """
         meta_properties = []
 
-        # First pass: extract meta properties from the beginning of the file
         # Meta properties can be interspersed with other lines (like tags) at the beginning
         meta_line_count = 0
 
         for i, line in enumerate(lines):
-            stripped_line = line.strip()
-
-            # Skip empty lines
-            if not stripped_line:
-                meta_line_count = i + 1
-                continue
-
             # Check if this is a meta property
             if self.meta_pattern.match(line):
                 meta_prop = self._extract_meta_property(line, i + 1)
                 if meta_prop:
                     meta_properties.append(meta_prop)
-                meta_line_count = i + 1
-                continue
+            # Empty lines, simple tag lines like "- #tag" and bare bullets continue
+            # the scan; anything else is actual content, stop scanning for meta properties
+            elif not self._is_header_line(line):
+                break
 
-            # Check if this looks like a simple tag line or bullet point
-            # Allow lines like "- #tag" to continue scanning for meta properties
-            if re.match(r"^[-*]\s+#\w+\s*$", line) or stripped_line == "-":
-                meta_line_count = i + 1
-                continue
+            meta_line_count = i + 1
 
-            # If we get here, we've hit actual content, stop scanning for meta properties
-            break
+        return meta_properties, meta_line_count
 
-        # Second pass: parse blocks and references starting after meta properties
-        for line_num in range(meta_line_count + 1, len(lines) + 1):
-            if line_num > len(lines):
-                break
-            line = lines[line_num - 1]
+    def scan_header(self, content: Union[str, Iterable[str]]) -> Dict:
+        """只扫描文件头部：解析 meta 属性，找到第一行实际内容后立即停止
 
-            # 解析块
-            block = self._parse_line_as_block(line, line_num)
-            if block:
-                blocks.append(block)
+        Args:
+            content: 文件内容，或逐行的迭代器
 
-            # 解析引用
-            line_refs = self._extract_references(line, line_num)
-            references.extend(line_refs)
+        Returns:
+            - meta_properties: meta 属性
+            - first_content_line: 第一行实际内容（跳过 meta 属性行和空行），没有时为 None
+            - header_lines: 读取过的行（到第一行实际内容为止）
+        """
+        header_lines: List[str] = []
+
+        def recorded_lines():
+            for line in iter_lines(content):
+                header_lines.append(line)
+                yield line
+
+        meta_properties, _ = self._parse_meta_header(recorded_lines())
+
+        # 头部中的列表标签行（如 "- #wiki"）不是 meta 属性，也算实际内容
+        meta_line_numbers = {prop.line_number for prop in meta_properties}
+        first_content_line = next(
+            (
+                line
+                for line_num, line in enumerate(header_lines, 1)
+                if line_num not in meta_line_numbers and line.strip()
+            ),
+            None,
+        )
 
         return {
-            "filename": filename,
-            "content": content,
-            "blocks": blocks,
-            "references": references,
             "meta_properties": meta_properties,
-            "page_links": [ref for ref in references if ref.type == "page_link"],
-            "block_refs": [ref for ref in references if ref.type == "block_ref"],
-            "assets": [ref for ref in references if ref.type == "asset"],
+            "first_content_line": first_content_line,
+            "header_lines": header_lines,
+        }
+
+    def scan_header_file(self, file_path: Path) -> Dict:
+        """只读取文件开头到第一行实际内容为止，用于分类、列出页面等不需要正文的场景"""
+        try:
+            with open(file_path, "rb") as f:
+                # 按缓冲区逐行读取，扫描结束后不再读取文件的其余部分
+                lines = (
+                    decode_utf8(raw[:-1] if raw.endswith(b"\n") else raw)[0]
+                    for raw in f
+                )
+                result = self.scan_header(lines)
+        except Exception as e:
+            raise ValueError(f"解析文件 {file_path} 时出错: {e}") from e
+
+        result["filename"] = file_path.name
+        return result
+
+    def parse_mapped_file(self, mapped: "MappedFile") -> Dict:
+        """大文件模式：只解析文件头部，不把整个文件解码到内存
+
+        返回的结果没有 content、blocks 和 references，而是带有：
+        - header_lines: 文件开头到第一行实际内容为止的行（用于分类检测）
+        - content_hash: 内容哈希（与 content_hash(content) 一致）
+        - large_file / source_path: 格式化时据此重新映射文件逐行读取
+        """
+        header = self.scan_header(mapped.iter_text_lines())
+
+        # 按行边界分块校验编码并计算哈希；纯 ASCII 的块不需要解码
+        digest = hashlib.sha256()
+        error_spans: List[Tuple[int, int]] = []
+        for offset, chunk in mapped.iter_chunks():
+            if chunk.isascii():
+                digest.update(chunk)
+                continue
+            text, spans = decode_utf8(chunk)
+            digest.update(text.encode("utf-8") if spans else chunk)
+            error_spans.extend((offset + start, offset + end) for start, end in spans)
+
+        if error_spans:
+            print(
+                f"⚠️  文件 {mapped.path.name} 含有 {len(error_spans)} 处无效UTF-8字符，"
+                f"已使用替换字符处理"
+            )
+
+        return {
+            "filename": mapped.path.name,
+            "source_path": str(mapped.path),
+            "large_file": True,
+            "meta_properties": header["meta_properties"],
+            "header_lines": header["header_lines"],
+            "first_content_line": header["first_content_line"],
+            "content_hash": digest.hexdigest(),
+            "has_encoding_errors": bool(error_spans),
+            "encoding_error_count": len(error_spans),
+            "encoding_error_offsets": error_spans,
         }
 
     def _parse_line_as_block(self, line: str, line_num: int) -> Optional[LogseqBlock]:
         """解析单行为块"""
-        if not line.strip():
+        fields = self._block_fields(line)
+        if not fields:
             return None
 
-        # 计算缩进层级
-        level = 0
-        for char in line:
-            if char in " \t":
-                level += 1
-            else:
-                break
-
-        # 检查是否有块 ID
-        block_id_match = self.block_id_pattern.search(line)
-        block_id = block_id_match.group(1) if block_id_match else None
-
+        start, end, level, block_id = fields
         return LogseqBlock(
-            content=line.strip(), block_id=block_id, level=level, line_number=line_num
+            content=line[start:end],
+            block_id=block_id,
+            level=level,
+            line_number=line_num,
         )
 
-    def _extract_references(self, line: str, line_num: int) -> List[LogseqReference]:
-        """从行中提取所有引用"""
-        references = []
+    def _block_fields(self, line: str) -> Optional[Tuple[int, int, int, Optional[str]]]:
+        """计算块的字段：(内容起点, 内容终点, 缩进层级, 块 ID)，空行返回 None"""
+        stripped_start = len(line) - len(line.lstrip())
+        if stripped_start == len(line):
+            return None
+
+        # 计算缩进层级（前导空格和制表符的数量）
+        level = len(line) - len(line.lstrip(" \t"))
+
+        # 检查是否有块 ID
+        block_id = None
+        if "id:: " in line:
+            block_id_match = self.block_id_pattern.search(line)
+            block_id = block_id_match.group(1) if block_id_match else None
+
+        return stripped_start, len(line.rstrip()), level, block_id
 
+    def _iter_line_references(
+        self, line: str, types: FrozenSet[str] = REFERENCE_TYPES
+    ) -> Iterator[LogseqReference]:
+        """逐个产出行中的引用，只匹配 types 中的类型"""
         # 页面链接 [[]]
-        for match in self.page_link_pattern.finditer(line):
-            references.append(
-                LogseqReference(
+        if "page_link" in types:
+            for match in self.page_link_pattern.finditer(line):
+                yield LogseqReference(
                     type="page_link",
                     target=match.group(1),
                     position=(match.start(), match.end()),
                 )
-            )
 
         # 块引用 (())
-        for match in self.block_ref_pattern.finditer(line):
-            references.append(
-                LogseqReference(
+        if "block_ref" in types:
+            for match in self.block_ref_pattern.finditer(line):
+                yield LogseqReference(
                     type="block_ref",
                     target=match.group(1),
                     position=(match.start(), match.end()),
                 )
-            )
 
         # 资源文件 ![](url)
-        for match in self.asset_pattern.finditer(line):
-            references.append(
-                LogseqReference(
+        if "asset" in types:
+            for match in self.asset_pattern.finditer(line):
+                yield LogseqReference(
                     type="asset",
                     target=match.group(2),
                     display_text=match.group(1),
                     position=(match.start(), match.end()),
                 )
-            )
-
-        return references
 
     def _extract_meta_property(
         self, line: str, line_num: int
@@ -8,20 +8,131 @@ Logseq2Obsidian - 将 Logseq 笔记迁移到 Obsidian 格式的工具
 import argparse
 import sys
 from pathlib import Path
+from typing import Dict
 
-from .logseq_parser import LogseqParser
-from .obsidian_formatter import ObsidianFormatter
-from .file_manager import FileManager
+from .archive_writer import ARCHIVE_FORMATS
+from .converter import (
+    ASSET_MODE_ALL,
+    ASSET_MODES,
+    ConversionOptions,
+    ConversionResult,
+    Converter,
+)
+from .obsidian_formatter import BLOCK_ID_MODES, BLOCK_ID_SEQUENTIAL
 
 
-def main() -> None:
-    """主程序入口"""
+def build_arg_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
     parser = argparse.ArgumentParser(description="将 Logseq 笔记迁移到 Obsidian 格式")
     parser.add_argument("input_dir", help="Logseq 笔记目录路径")
     parser.add_argument("output_dir", help="Obsidian 输出目录路径")
     parser.add_argument("--dry-run", action="store_true", help="只预览转换结果，不实际写入文件")
+    parser.add_argument(
+        "--remove-top-level-bullets",
+        action="store_true",
+        help="删除第一级列表符号，将其转换为段落格式",
+    )
+    parser.add_argument(
+        "--category-tag", help="分类标签名称（如 wiki），与 --category-folder 一起使用"
+    )
+    parser.add_argument(
+        "--category-folder", help="分类文件夹名称（如 wiki），与 --category-tag 一起使用"
+    )
+    parser.add_argument("--no-assets", action="store_true", help="不复制 assets 资源文件")
+    parser.add_argument("--no-report", action="store_true", help="不生成转换报告")
+    parser.add_argument("--profile", action="store_true", help="输出各阶段耗时")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="并行格式化页面的进程数（默认 1，串行）"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量转换：跳过自上次转换以来未变化的页面",
+    )
+    parser.add_argument(
+        "--block-ids",
+        choices=BLOCK_ID_MODES,
+        default=BLOCK_ID_SEQUENTIAL,
+        help="块 ID 生成方式：sequential 按顺序编号，stable 由块 UUID 哈希得到，" "不随其他页面的增删而变化",
+    )
+    parser.add_argument(
+        "--large-file-threshold",
+        type=int,
+        default=16,
+        metavar="MB",
+        help="达到该大小（MB）的文件使用 mmap 逐行流式转换（默认 16，0 表示不使用）",
+    )
+    parser.add_argument(
+        "--index-cache",
+        metavar="PATH",
+        help="索引缓存文件（SQLite）：再次转换时未变化的文件不需要读取即可构建索引",
+    )
+    parser.add_argument(
+        "--write-threads",
+        type=int,
+        default=4,
+        metavar="N",
+        help="后台写入线程数，格式化与写入重叠进行，也用于并行复制资源文件"
+        "（默认 4，0 表示格式化后直接写入）；"
+        "输出目录在网络存储上时可以适当增大",
+    )
+    parser.add_argument(
+        "--hardlink-assets",
+        action="store_true",
+        help="资源文件使用硬链接而不是复制（需要在同一文件系统上，" "在 Obsidian 中修改附件会同时修改 Logseq 中的文件）",
+    )
+    parser.add_argument(
+        "--assets",
+        choices=ASSET_MODES,
+        default=ASSET_MODE_ALL,
+        dest="asset_mode",
+        help="资源复制模式：all 复制整个 assets 目录（默认），" "referenced 只复制被转换页面引用的资源文件（包括 PDF 高亮截图）",
+    )
+    parser.add_argument(
+        "--dedupe-assets",
+        action="store_true",
+        help="资源去重：内容相同的资源文件只复制一份，页面中的引用改为指向保留的文件",
+    )
+    parser.add_argument(
+        "--archive",
+        choices=ARCHIVE_FORMATS,
+        metavar="FORMAT",
+        help="直接把转换结果写入归档文件（zip、tar、tar.gz、tar.zst），"
+        "此时 output_dir 是归档文件路径；tar.zst 需要安装 zstandard",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="只校验块引用：报告重复定义的块 UUID 和没有定义的块引用，不写入任何文件",
+    )
+    return parser
+
+
+def print_timings(result: ConversionResult) -> None:
+    """打印各阶段耗时"""
+    print("\n=== 阶段耗时 ===")
+    for stage, seconds in result.timings.items():
+        print(f"{stage:>10}: {seconds:.3f}s")
+    print(f"{'total':>10}: {sum(result.timings.values()):.3f}s")
+
 
-    args = parser.parse_args()
+def print_validation(report: Dict, limit: int = 20) -> None:
+    """打印块索引校验报告，每类最多列出 limit 个 UUID"""
+    print("\n=== 块引用校验 ===")
+    print(f"定义的块 UUID: {report['defined']}")
+    print(f"被引用的块 UUID: {report['referenced']}")
+    for key, title in (("duplicates", "重复定义"), ("dangling", "没有定义的块引用")):
+        issues = report[key]
+        print(f"{title}: {len(issues)}")
+        for uuid, locations in list(issues.items())[:limit]:
+            print(f"  ⚠️  {uuid}: {', '.join(locations)}")
+        if len(issues) > limit:
+            print(f"  ... 另有 {len(issues) - limit} 个")
+
+
+def main() -> None:
+    """主程序入口"""
+    args = build_arg_parser().parse_args()
 
     # 验证输入路径
     input_path = Path(args.input_dir)
@@ -29,26 +140,74 @@ def main() -> None:
         print(f"错误：输入目录不存在: {input_path}")
         sys.exit(1)
 
+    if bool(args.category_tag) != bool(args.category_folder):
+        print("错误：--category-tag 和 --category-folder 必须同时指定")
+        sys.exit(1)
+
     output_path = Path(args.output_dir)
 
-    print(f"开始转换 Logseq 笔记...")
+    print("开始转换 Logseq 笔记...")
     print(f"输入目录: {input_path}")
     print(f"输出目录: {output_path}")
     print(f"预览模式: {'是' if args.dry_run else '否'}")
 
-    try:
-        # 初始化组件
-        parser = LogseqParser()
-        formatter = ObsidianFormatter()
-        file_manager = FileManager(output_path, dry_run=args.dry_run)
+    options = ConversionOptions(
+        remove_top_level_bullets=args.remove_top_level_bullets,
+        category_tag=args.category_tag,
+        category_folder=args.category_folder,
+        # 校验模式不写入任何文件，也不创建输出目录
+        dry_run=args.dry_run or args.validate,
+        copy_assets=not args.no_assets,
+        write_report=not args.no_report,
+        jobs=args.jobs,
+        incremental=args.incremental,
+        block_id_mode=args.block_ids,
+        large_file_threshold=args.large_file_threshold * 1024 * 1024,
+        index_cache=Path(args.index_cache) if args.index_cache else None,
+        write_threads=args.write_threads,
+        hardlink_assets=args.hardlink_assets,
+        asset_mode=args.asset_mode,
+        dedupe_assets=args.dedupe_assets,
+        archive_format=args.archive,
+    )
 
-        # TODO: 实现完整的转换流程
-        print("转换功能正在开发中...")
+    if args.validate:
+        try:
+            report = Converter(input_path, output_path, options).validate()
+        except Exception as e:
+            print(f"校验过程中发生错误: {e}")
+            sys.exit(1)
+        print_validation(report)
+        if report["duplicates"] or report["dangling"]:
+            sys.exit(1)
+        return
 
+    try:
+        result = Converter(input_path, output_path, options).run()
     except Exception as e:
         print(f"转换过程中发生错误: {e}")
         sys.exit(1)
 
+    print("\n=== 转换汇总 ===")
+    print(f"成功: {result.successful}/{result.total}")
+    if result.skipped:
+        print(f"未变化（跳过）: {result.skipped}")
+    for conversion in result.conversions:
+        if not conversion.get("success", False):
+            print(f"❌ {conversion['source_file']}: {conversion.get('error', '未知错误')}")
+    if result.validation.get("duplicates"):
+        print(
+            f"⚠️  重复定义的块 UUID: {len(result.validation['duplicates'])}（使用 --validate 查看）"
+        )
+    if result.validation.get("dangling"):
+        print(f"⚠️  没有定义的块引用: {len(result.validation['dangling'])}（使用 --validate 查看）")
+
+    if args.profile:
+        print_timings(result)
+
+    if not result.success:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,85 @@
+"""
+转换清单
+记录每个源文件的内容哈希、输出路径、块 UUID 和资源引用，用于增量转换
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ManifestEntry:
+    """单个源文件的转换记录"""
+
+    # 相对于 Logseq 目录的源文件路径
+    source: str
+    content_hash: str
+    mtime_ns: int
+    size: int
+    output_filename: str
+    subfolder: str
+    # 相对于输出目录的实际输出路径
+    output_path: str
+    defined_uuids: List[str] = field(default_factory=list)
+    referenced_uuids: List[str] = field(default_factory=list)
+    hls_link_blocks: List[str] = field(default_factory=list)
+    # ../assets/ 资源引用的路径
+    asset_paths: List[str] = field(default_factory=list)
+    # 页面所依赖的全局索引条目的哈希
+    dependency_hash: str = ""
+
+    def matches_stat(self, mtime_ns: int, size: int) -> bool:
+        """文件的修改时间和大小是否与记录一致"""
+        return self.mtime_ns == mtime_ns and self.size == size
+
+
+class ConversionManifest:
+    """转换清单，保存在输出目录中
+
+    格式：
+    {
+        "version": 3,
+        "options": {...},  # 影响输出的转换选项，变化时需要全量转换
+        "files": {"pages/a.md": {...ManifestEntry...}}
+    }
+    """
+
+    VERSION = 3
+    FILENAME = "conversion_manifest.json"
+
+    def __init__(self, options: Optional[Dict] = None):
+        self.options = options or {}
+        self.entries: Dict[str, ManifestEntry] = {}
+
+    def get(self, source: str) -> Optional[ManifestEntry]:
+        return self.entries.get(source)
+
+    def set(self, entry: ManifestEntry):
+        self.entries[entry.source] = entry
+
+    def sources(self) -> List[str]:
+        return sorted(self.entries)
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.VERSION,
+            "options": self.options,
+            "files": {
+                source: asdict(self.entries[source]) for source in self.sources()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> Optional["ConversionManifest"]:
+        """从字典恢复清单，版本不匹配或格式错误时返回 None"""
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return None
+
+        manifest = cls(data.get("options", {}))
+        try:
+            for source, entry_data in data.get("files", {}).items():
+                manifest.set(ManifestEntry(**{**entry_data, "source": source}))
+        except TypeError:
+            return None
+
+        return manifest
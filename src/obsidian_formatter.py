@@ -3,10 +3,432 @@ Obsidian 格式化器
 负责将解析的 Logseq 数据转换为 Obsidian 兼容格式
 """
 
+import hashlib
+import os
 import re
 import urllib.parse
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    from .logseq_parser import indent_level, iter_lines, iter_top_level_blocks
+except ImportError:  # 作为独立模块导入时（src 目录在 sys.path 中）
+    from logseq_parser import indent_level, iter_lines, iter_top_level_blocks
+
+# 块 ID 模式：sequential 按遍历顺序编号（block1、block2...），
+# stable 由 UUID 哈希得到（block-1a2b3c4d），不随其他页面的增删而变化
+BLOCK_ID_SEQUENTIAL = "sequential"
+BLOCK_ID_STABLE = "stable"
+BLOCK_ID_MODES = (BLOCK_ID_SEQUENTIAL, BLOCK_ID_STABLE)
+# stable 模式下短块 ID 使用的哈希前缀长度（十六进制字符数）
+STABLE_BLOCK_ID_LENGTH = 8
+# 匹配两种模式生成的块 ID
+BLOCK_ID_PATTERN = r"\^block(?:\d+|-[0-9a-f]+)\b"
+# 块引用 ((uuid)) 中的 UUID
+BLOCK_REF_UUID_PATTERN = re.compile(r"\(\(([a-zA-Z0-9-]+)\)\)")
+# 资源引用 ![alt](../assets/...) 中的路径（与 _convert_asset_paths 转换的引用一致）
+ASSET_PATH_PATTERN = re.compile(r"!\[[^\]]*\]\((\.\./assets/[^)\n]+)\)")
+
+
+def stable_block_digest(uuid: str) -> str:
+    """UUID 的稳定哈希（十六进制）"""
+    return hashlib.sha1(uuid.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class FormatContext:
+    """单个页面的格式化上下文
+
+    格式化器本身只持有全局索引（构建完成后只读），
+    与当前页面相关的状态通过上下文逐层传递，因此同一个格式化器可以被多个线程同时使用
+    """
+
+    # 当前正在处理的文件名
+    filename: Optional[str] = None
+    # 当前目标文件夹（用于计算资源文件的相对路径）
+    target_folder: str = ""
+
+
+# 不包含这些标记（且不是引用块）的行不需要任何转换
+FAST_PATH_MARKERS = ("[[", "((", "{{", "![", "id::")
+# 行内语法的起始标记，出现在其他语法内部时说明语法相互嵌套
+SYNTAX_MARKERS = ("[[", "((", "{{", "![")
+# 替换结果中出现这些字符时，可能与后续转换步骤产生新的匹配
+UNSAFE_CHARS = frozenset("[](){}!")
+
+QUOTE_LINE_PATTERN = re.compile(r"^(\s*)-\s*>\s*(.*)$")
+BLOCK_ID_LINE_PATTERN = re.compile(r"^\s*id:: ([a-zA-Z0-9-]+)\s*$")
+# 各分支与逐步转换中使用的正则一致；外层命名分组用于分派（lastgroup）
+INLINE_SYNTAX_PATTERN = re.compile(
+    r"(?P<page_link>\[\[(?P<page_text>[^\]]+)\]\])"
+    r"|(?P<embed>\{\{embed\s*\(\((?P<embed_uuid>[^)]+)\)\)\}\})"
+    r"|(?P<video>\{\{(?:video|youtube|bilibili)\s+[^\}]+\}\})"
+    r"|(?P<block_ref>\(\((?P<ref_uuid>[^)]+)\)\))"
+    r"|(?P<asset>!\[(?P<asset_alt>[^\]]*)\]\((?P<asset_path>[^)]+)\))"
+)
+# 每个分支中需要检查嵌套的捕获分组
+INNER_GROUPS = {
+    "page_link": ("page_text",),
+    "embed": ("embed_uuid",),
+    "video": (),
+    "block_ref": ("ref_uuid",),
+    "asset": ("asset_alt", "asset_path"),
+}
+
+
+def has_marker(text: str) -> bool:
+    """文本中是否包含行内语法的起始标记"""
+    return any(marker in text for marker in SYNTAX_MARKERS)
+
+
+class LineRewriter:
+    """单次扫描的行重写引擎
+
+    结果与 ObsidianFormatter 逐步调用各个转换方法完全一致：
+    - 不含任何语法标记的行直接原样返回
+    - 其余行用一个合并的正则扫描一次，按匹配分支调用格式化器的替换方法
+    - 语法相互嵌套（如页面链接中包含块引用）、PDF 高亮和视频嵌入等
+      替换结果会被后续步骤再次处理的罕见情况，整行交给逐步转换处理
+    """
+
+    def __init__(
+        self,
+        formatter: "ObsidianFormatter",
+        fallback: Optional[Callable[[str, FormatContext], str]] = None,
+    ):
+        self.formatter = formatter
+        self.fallback = fallback or formatter._convert_line_stepwise
+        self._handlers = {
+            "page_link": self._replace_page_link,
+            "embed": self._replace_embed,
+            "video": self._replace_video,
+            "block_ref": self._replace_block_ref,
+            "asset": self._replace_asset,
+        }
+
+    def rewrite(self, line: str, context: FormatContext) -> str:
+        """转换单行内容"""
+        # 引用块转换始终是第一步
+        if ">" in line:
+            quote_match = QUOTE_LINE_PATTERN.match(line)
+            if quote_match:
+                line = f"{quote_match.group(1)}> {quote_match.group(2)}"
+
+        if not any(marker in line for marker in FAST_PATH_MARKERS):
+            return line
+
+        if "id::" in line:
+            block_id_match = BLOCK_ID_LINE_PATTERN.match(line)
+            if block_id_match:
+                # 只有被引用的块才有映射，其余块 ID 行删除
+                mapping = self.formatter.block_uuid_map.get(block_id_match.group(1))
+                return f"^{mapping[1]}" if mapping else ""
+
+        rewritten = self._rewrite_inline(line, context)
+        if rewritten is None:
+            return self.fallback(line, context)
+        return rewritten
+
+    def _rewrite_inline(self, line: str, context: FormatContext) -> Optional[str]:
+        """合并扫描行内语法，无法保证与逐步转换一致时返回 None"""
+        pieces: List[str] = []
+        position = 0
+
+        for match in INLINE_SYNTAX_PATTERN.finditer(line):
+            kind = match.lastgroup
+            for group in INNER_GROUPS[kind]:
+                start, end = match.span(group)
+                # 连同两侧的分隔符一起检查，避免标记跨越分组边界
+                if has_marker(line[max(start - 1, 0) : end + 1]):
+                    return None
+
+            replacement = self._handlers[kind](match, context)
+            if replacement is None:
+                return None
+
+            pieces.append(line[position : match.start()])
+            pieces.append(replacement)
+            position = match.end()
+
+        if not pieces:
+            return line
+
+        pieces.append(line[position:])
+        return "".join(pieces)
+
+    def _replace_page_link(self, match, context) -> Optional[str]:
+        link_text = match.group("page_text")
+        # hls__ 链接可能被替换为 Markdown 链接，之后还会经过资源路径转换
+        if link_text.startswith("hls__"):
+            return None
+
+        replacement = self.formatter._page_link_replacement(link_text, context)
+        # URL 解码可能引入新的语法字符
+        if replacement != match.group(0) and UNSAFE_CHARS.intersection(
+            replacement[2:-2]
+        ):
+            return None
+        return replacement
+
+    def _replace_embed(self, match, context) -> Optional[str]:
+        block_uuid = match.group("embed_uuid")
+        return self._block_replacement(block_uuid, context, "Block Embed")
+
+    def _replace_video(self, _match, _context) -> Optional[str]:
+        # 视频嵌入的结果是 Markdown 链接，还会经过资源路径转换，交给逐步转换
+        return None
+
+    def _replace_block_ref(self, match, context) -> Optional[str]:
+        block_uuid = match.group("ref_uuid")
+        # PDF 高亮引用的结果可能包含截图和换行，交给逐步转换
+        if block_uuid in self.formatter.pdf_highlight_map:
+            return None
+        return self._block_replacement(block_uuid, context, "Block Reference")
+
+    def _replace_asset(self, match, context) -> str:
+        return self.formatter._asset_replacement(
+            match.group("asset_alt"), match.group("asset_path"), context
+        )
+
+    def _block_replacement(
+        self, block_uuid: str, context: FormatContext, label: str
+    ) -> Optional[str]:
+        """块嵌入/块引用的转换结果"""
+        if UNSAFE_CHARS.intersection(block_uuid):
+            return None
+
+        block_link = self.formatter._block_link(block_uuid, context)
+        if block_link is None:
+            # 找不到对应的映射，保留为注释以便调试
+            return f"<!-- {label} (未找到): {block_uuid} -->"
+
+        # 目标文件名中的方括号或语法标记可能与后续步骤产生新的匹配
+        target = block_link[3:-2]
+        if "[" in target or "]" in target or has_marker(target):
+            return None
+        return block_link
+
+
+# 流式读取 .edn 文件时每次读取的字符数
+EDN_CHUNK_SIZE = 1 << 20
+# EDN 结构单元：字符串（单独的 " 表示字符串未结束）、注释、括号；其余内容不需要逐个处理
+# 前缀一次跳过所有无关字符，结构单元本身在分组 1 中
+EDN_STRUCTURE_PATTERN = re.compile(
+    r'[^";{}\[\]()]*("[^"\\]*(?:\\.[^"\\]*)*"|"|;[^\n]*|[{}\[\]()])'
+)
+EDN_CLOSING = {"{": "}", "[": "]", "(": ")"}
+# 记录内的字符串和注释
+EDN_HOLE_PATTERN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|;[^\n]*')
+# 单条记录允许快速匹配的最大嵌套层数
+EDN_RECORD_MAX_DEPTH = 8
+
+
+def edn_record_pattern(max_depth: int) -> "re.Pattern":
+    """匹配一条完整记录 {...} 的正则（最多 max_depth 层嵌套）
+
+    全部使用占有量词，匹配耗时与记录长度成线性关系，不会回溯
+    """
+    atom = r'[^"{}\[\]();]++|"[^"\\]*+(?:\\.[^"\\]*+)*+"|;[^\n]*+'
+    inner = f"(?:{atom})*+"
+    for _ in range(max_depth - 1):
+        inner = f"(?:{atom}|[{{\\[(]{inner}[}}\\])])*+"
+    return re.compile(f"\\{{{inner}\\}}")
+
+
+EDN_RECORD_PATTERN = edn_record_pattern(EDN_RECORD_MAX_DEPTH)
+# 以下正则作用于单条记录的骨架（字符串替换为 "序号"，注释替换为空格）
+EDN_RECORD_ID_PATTERN = re.compile(r':id[\s,]+(?:#uuid[\s,]+)?"(\d+)"')
+EDN_RECORD_PAGE_PATTERN = re.compile(r":page[\s,]+(-?\d+)")
+EDN_BOUNDING_PATTERN = re.compile(r":bounding[\s,]*\{([^{}]*)\}")
+EDN_COORDINATE_PATTERN = re.compile(
+    r":(x1|y1|x2|y2|width|height)[\s,]+([^\s,{}\[\]()\"]+)"
+)
+EDN_COORDINATE_KEYS = ("x1", "y1", "x2", "y2", "width", "height")
+# Logseq 写出的记录开头的固定布局 {:id #uuid "...", :page N, :position {:bounding {...}}，
+# 从记录起始处锚定匹配，不含 .*?，不会回溯；其他布局使用骨架解析
+EDN_LOGSEQ_RECORD_PATTERN = re.compile(
+    r'\{[\s,]*:id[\s,]+#uuid[\s,]+"([^"\\]*)"[\s,]+:page[\s,]+(-?\d+)'
+    r"[\s,]+:position[\s,]+\{[\s,]*:bounding[\s,]+\{"
+    + "".join(
+        rf"[\s,]*:{key}[\s,]+([^\s,{{}}\[\]()\"]+)" for key in EDN_COORDINATE_KEYS
+    )
+    + r"[\s,]*\}"
+)
+
+
+class EdnReader:
+    """流式读取 Logseq PDF 高亮 .edn 文件 {:highlights [{...} ...]}
+
+    按块读取文本，只扫描字符串、注释和括号来确定每条高亮记录的范围，
+    再在单条记录内提取 id、page 和 bounding 坐标。整体耗时与文件大小成线性关系，
+    内存中只保留当前记录；括号不匹配、字符串未结束等格式错误抛出 ValueError
+    """
+
+    def __init__(self, stream, chunk_size: int = EDN_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        # 逐个扫描中的记录在缓冲区中的起始位置
+        self._record_start: Optional[int] = None
+
+    def iter_highlights(self) -> Iterator[Dict]:
+        """遍历高亮记录，缺少 id、page 或坐标的记录会被跳过"""
+        # 尚未闭合的括号
+        stack: List[str] = []
+        in_highlights = False
+        # 逐个扫描中的记录内的字符串和注释位置（相对记录起始位置）
+        holes: List[tuple] = []
+
+        while True:
+            buffer = self._buffer
+            match = EDN_STRUCTURE_PATTERN.match(buffer, self._position)
+            if match is None:
+                if self._eof:
+                    raise ValueError("EDN 内容意外结束")
+                self._fill()
+                continue
+
+            token = match.group(1)
+            start = match.start(1)
+            first = token[0]
+
+            if first == '"' or first == ";":
+                if token == '"' or (first == ";" and match.end() == len(buffer)):
+                    # 字符串或注释被块边界截断，读取更多内容后重新扫描
+                    if not self._eof:
+                        self._fill()
+                        continue
+                    if token == '"':
+                        raise ValueError(f"EDN 字符串未结束（位置 {start} 附近）")
+                if self._record_start is not None:
+                    offset = self._record_start
+                    holes.append((start - offset, match.end() - offset, first == '"'))
+
+            elif token in EDN_CLOSING:
+                depth = len(stack)
+                if depth == 2 and in_highlights and token == "{":
+                    # 快速路径：用一个正则匹配整条记录；嵌套过深或被块边界截断时逐个扫描
+                    record_match = EDN_RECORD_PATTERN.match(buffer, start)
+                    if record_match:
+                        self._position = record_match.end()
+                        record = edn_highlight_record(record_match.group())
+                        if record:
+                            yield record
+                        continue
+                    self._record_start = start
+                    holes = []
+                elif depth == 1 and token == "[":
+                    key = buffer[self._position : start].strip(" \t\r\n,")
+                    in_highlights = key == ":highlights"
+                elif depth == 0 and token != "{":
+                    raise ValueError("EDN 顶层必须是映射")
+                stack.append(token)
+
+            else:
+                if not stack or EDN_CLOSING[stack.pop()] != token:
+                    raise ValueError(f"EDN 括号不匹配：位置 {start} 附近的 {token}")
+                depth = len(stack)
+                if depth == 2 and self._record_start is not None:
+                    text = buffer[self._record_start : match.end()]
+                    self._record_start = None
+                    self._position = match.end()
+                    record = edn_highlight_record(text, holes)
+                    if record:
+                        yield record
+                    continue
+                if depth == 1:
+                    in_highlights = False
+                elif depth == 0:
+                    return
+
+            self._position = match.end()
+
+    def _fill(self):
+        """读取下一块内容，丢弃已处理且不再需要的部分"""
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+
+        keep = self._position
+        if self._record_start is not None:
+            keep = self._record_start
+            self._record_start = 0
+        self._buffer = self._buffer[keep:] + chunk
+        self._position -= keep
+
+
+def edn_highlight_record(
+    text: str, holes: Optional[List[tuple]] = None
+) -> Optional[Dict]:
+    """从单条高亮记录的文本中提取 id、page 和 bounding 坐标
+
+    Args:
+        text: 记录文本 {...}
+        holes: 记录内字符串和注释的位置 (start, end, is_string)，未提供时重新扫描
+    """
+    logseq_match = EDN_LOGSEQ_RECORD_PATTERN.match(text)
+    if logseq_match:
+        try:
+            values = [float(value) for value in logseq_match.groups()[2:]]
+        except ValueError:
+            return None
+        return {
+            "id": logseq_match.group(1),
+            "page": str(int(logseq_match.group(2))),
+            "coordinates": dict(zip(EDN_COORDINATE_KEYS, values)),
+        }
+
+    if holes is None:
+        holes = [
+            (m.start(), m.end(), m.group()[0] == '"')
+            for m in EDN_HOLE_PATTERN.finditer(text)
+        ]
+
+    # 字符串替换为 "序号"、注释替换为空格，避免其中的内容被误认为键
+    strings = []
+    pieces = []
+    last = 0
+    for start, end, is_string in holes:
+        pieces.append(text[last:start])
+        if is_string:
+            pieces.append(f'"{len(strings)}"')
+            strings.append(text[start + 1 : end - 1])
+        else:
+            pieces.append(" ")
+        last = end
+    pieces.append(text[last:])
+    skeleton = "".join(pieces)
+
+    id_match = EDN_RECORD_ID_PATTERN.search(skeleton)
+    page_match = EDN_RECORD_PAGE_PATTERN.search(skeleton)
+    bounding_match = EDN_BOUNDING_PATTERN.search(skeleton)
+    if not (id_match and page_match and bounding_match):
+        return None
+
+    values = dict(EDN_COORDINATE_PATTERN.findall(bounding_match.group(1)))
+    try:
+        coordinates = {key: float(values[key]) for key in EDN_COORDINATE_KEYS}
+    except (KeyError, ValueError):
+        return None
+
+    uuid = re.sub(r"\\(.)", r"\1", strings[int(id_match.group(1))])
+    return {
+        "id": uuid,
+        "page": str(int(page_match.group(1))),
+        "coordinates": coordinates,
+    }
+
+
+# 读取高亮来源文件（hls__ 文件、.edn 文件）的函数：read(path, load) -> load(path) 的结果
+HighlightSourceReader = Callable[[Path, Callable[[Path], Dict]], Dict]
+
+
+def _read_source(path: Path, load: Callable[[Path], Dict]) -> Dict:
+    """不使用缓存，直接读取"""
+    return load(path)
 
 
 class ObsidianFormatter:
@@ -18,9 +440,16 @@ class ObsidianFormatter:
         category_tag=None,
         category_folder=None,
         input_assets_dir=None,
+        block_id_mode=BLOCK_ID_SEQUENTIAL,
     ):
+        if block_id_mode not in BLOCK_ID_MODES:
+            raise ValueError(f"未知的块 ID 模式: {block_id_mode}")
+        # 块 ID 生成方式：sequential（全局计数）或 stable（由 UUID 哈希得到）
+        self.block_id_mode = block_id_mode
         # Obsidian 块引用计数器（用于生成唯一的块引用）
         self.block_ref_counter = 0
+        # stable 模式下短块 ID -> 使用它的 UUID 集合（用于检测冲突）
+        self._stable_id_owners: Dict[str, Set[str]] = {}
         # 是否删除第一级列表符号
         self.remove_top_level_bullets = remove_top_level_bullets
         # 分类标签配置
@@ -34,27 +463,39 @@ class ObsidianFormatter:
         self.referenced_uuids = set()
         # PDF 高亮映射：UUID -> (PDF路径, 页码, 高亮文本)
         self.pdf_highlight_map = {}
-        # 当前正在处理的文件名
-        self.current_filename = None
-        # 当前目标文件夹
-        self.current_target_folder = ""
+        # 资源去重：相对于 assets 目录的重复文件路径 -> 保留的内容相同的文件路径
+        self.asset_aliases: Dict[str, str] = {}
+        # 单次扫描的行重写引擎
+        self._line_rewriter = LineRewriter(self)
 
-    def collect_pdf_highlights(self, logseq_dir: str):
-        """收集所有 PDF 高亮映射"""
+    def collect_pdf_highlights(
+        self, logseq_dir: str, read: Optional[HighlightSourceReader] = None
+    ):
+        """收集所有 PDF 高亮映射
+
+        Args:
+            logseq_dir: Logseq 目录
+            read: 读取高亮来源文件的函数 read(path, load)，默认直接调用 load(path)；
+                可以替换为带缓存的实现（如 IndexCache.cached），load 的返回值可序列化为 JSON
+        """
         logseq_path = Path(logseq_dir)
+        read = read or _read_source
 
         # 收集所有 hls__ 文件
         pages_dir = logseq_path / "pages"
         hls_files = pages_dir.glob("hls__*.md")
 
         for hls_file in hls_files:
-            self._parse_hls_file(hls_file)
+            source = read(hls_file, self.read_hls_file)
+            for highlight in source["highlights"]:
+                self._save_highlight(source["pdf_path"], highlight)
 
         # 收集 .edn 文件中的精确坐标信息
-        self._collect_edn_highlights(logseq_path)
+        self._collect_edn_highlights(logseq_path, read)
 
-    def _parse_hls_file(self, hls_file: Path):
-        """解析单个 hls__ 文件"""
+    @staticmethod
+    def read_hls_file(hls_file: Path) -> Dict:
+        """解析单个 hls__ 文件，返回 {"pdf_path": PDF 路径, "highlights": [高亮, ...]}"""
         with open(hls_file, "r", encoding="utf-8") as f:
             content = f.read()
 
@@ -67,8 +508,9 @@ class ObsidianFormatter:
                 pdf_path = line.split("::", 1)[1].strip()
                 break
 
+        highlights: List[Dict] = []
         if not pdf_path:
-            return
+            return {"pdf_path": pdf_path, "highlights": highlights}
 
         # 解析高亮注释
         current_highlight = {}
@@ -78,7 +520,7 @@ class ObsidianFormatter:
             if line.startswith("- ") and not line.startswith("  "):
                 # 新的高亮开始，保存之前的
                 if current_highlight.get("id"):
-                    self._save_highlight(pdf_path, current_highlight)
+                    highlights.append(current_highlight)
                     current_highlight = {}
 
                 # 提取高亮文本
@@ -95,7 +537,9 @@ class ObsidianFormatter:
 
         # 保存最后一个高亮
         if current_highlight.get("id"):
-            self._save_highlight(pdf_path, current_highlight)
+            highlights.append(current_highlight)
+
+        return {"pdf_path": pdf_path, "highlights": highlights}
 
     def _save_highlight(self, pdf_path: str, highlight: dict):
         """保存高亮到映射表"""
@@ -110,8 +554,11 @@ class ObsidianFormatter:
                 "screenshot_path": highlight.get("screenshot_path"),  # 新增：截图路径
             }
 
-    def _collect_edn_highlights(self, logseq_path: Path):
+    def _collect_edn_highlights(
+        self, logseq_path: Path, read: Optional[HighlightSourceReader] = None
+    ):
         """收集 .edn 文件中的精确坐标信息"""
+        read = read or _read_source
 
         # 查找 assets 目录下的 .edn 文件
         assets_dir = logseq_path / "assets"
@@ -119,180 +566,310 @@ class ObsidianFormatter:
             return
 
         for edn_file in assets_dir.glob("*.edn"):
-            try:
-                # 读取 .edn 文件内容
-                with open(edn_file, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                # 解析 PDF 名称
-                pdf_name = edn_file.stem  # 去掉 .edn 扩展名
-                pdf_path = f"../attachments/{pdf_name}.pdf"
-
-                # 查找对应的截图目录
-                screenshot_dir = assets_dir / pdf_name
-
-                # 使用正则表达式解析 UUID 和坐标信息
-                # 匹配格式：{:id #uuid "uuid-string", :page N, :position {...}}
-                highlight_pattern = r':id #uuid "([^"]+)".*?:page (\d+).*?:position \{:bounding \{:x1 ([^,]+),.*?:y1 ([^,]+),.*?:x2 ([^,]+),.*?:y2 ([^,]+),.*?:width ([^,]+),.*?:height ([^}]+)'
-
-                for match in re.finditer(highlight_pattern, content, re.DOTALL):
-                    uuid = match.group(1)
-                    page = match.group(2)
-                    x1, y1, x2, y2 = (
-                        match.group(3),
-                        match.group(4),
-                        match.group(5),
-                        match.group(6),
-                    )
-                    width, height = match.group(7), match.group(8)
-
-                    # 查找对应的截图文件
-                    screenshot_path = None
-                    if screenshot_dir.exists():
-                        screenshot_pattern = f"{page}_{uuid}_*.png"
-                        screenshot_files = list(screenshot_dir.glob(screenshot_pattern))
-                        if screenshot_files:
-                            # 使用相对路径
-                            screenshot_path = (
-                                f"attachments/{pdf_name}/{screenshot_files[0].name}"
-                            )
+            # 解析 PDF 名称
+            pdf_name = edn_file.stem  # 去掉 .edn 扩展名
+            pdf_path = f"../attachments/{pdf_name}.pdf"
 
-                    # 更新或创建高亮映射
-                    coordinates_data = {
-                        "x1": float(x1),
-                        "y1": float(y1),
-                        "x2": float(x2),
-                        "y2": float(y2),
-                        "width": float(width),
-                        "height": float(height),
-                    }
-
-                    if uuid in self.pdf_highlight_map:
-                        # 更新现有映射
-                        self.pdf_highlight_map[uuid]["coordinates"] = coordinates_data
-                        if screenshot_path:
-                            self.pdf_highlight_map[uuid][
-                                "screenshot_path"
-                            ] = screenshot_path
-                    else:
-                        # 创建新映射（可能 hls__ 文件不存在）
-                        self.pdf_highlight_map[uuid] = {
-                            "pdf_path": pdf_path,
-                            "page": page,
-                            "text": "",  # .edn 文件中没有文本内容
-                            "color": "",
-                            "coordinates": coordinates_data,
-                            "screenshot_path": screenshot_path,
-                        }
-
-            except (FileNotFoundError, PermissionError, UnicodeDecodeError) as e:
-                # 忽略文件处理错误，继续处理其他文件
+            try:
+                source = read(edn_file, self.read_edn_file)
+            except (FileNotFoundError, PermissionError) as e:
                 print(f"   ⚠️  解析 .edn 文件失败: {edn_file.name}: {e}")
                 continue
 
+            # 截图目录只扫描一次，所有高亮都在索引中查找
+            screenshots = self._index_screenshots(assets_dir / pdf_name)
+            for record in source["records"]:
+                self._save_edn_highlight(record, pdf_path, pdf_name, screenshots)
+
+            if source["error"]:
+                # 格式错误之前的记录仍然保留，继续处理其他文件
+                print(f"   ⚠️  解析 .edn 文件失败: {edn_file.name}: {source['error']}")
+
+    @staticmethod
+    def read_edn_file(edn_file: Path) -> Dict:
+        """流式解析 .edn 文件中的高亮记录
+
+        返回 {"records": [记录, ...], "error": 错误信息或 None}；
+        格式错误时保留错误之前的记录
+        """
+        records: List[Dict] = []
+        error = None
+        try:
+            # 流式解析 {:highlights [{:id #uuid "...", :page N, :position {...}} ...]}
+            with open(edn_file, "r", encoding="utf-8") as f:
+                for record in EdnReader(f).iter_highlights():
+                    records.append(record)
+        except (UnicodeDecodeError, ValueError) as e:
+            error = str(e)
+        return {"records": records, "error": error}
+
+    @staticmethod
+    def _index_screenshots(screenshot_dir: Path) -> Dict[Tuple[str, str], str]:
+        """扫描截图目录，建立 (page, uuid) -> 文件名 的索引
+
+        与 glob(f"{page}_{uuid}_*.png") 的匹配规则一致：文件名中任意两个下划线
+        都可能是 page 和 uuid 的分隔，同一个键保留目录遍历中的第一个文件。
+        """
+        index: Dict[Tuple[str, str], str] = {}
+        try:
+            entries = list(os.scandir(screenshot_dir))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return index
+
+        for entry in entries:
+            name = entry.name
+            if not name.endswith(".png") or name.startswith("."):
+                continue
+            stem = name[: -len(".png")]
+            separators = [i for i, char in enumerate(stem) if char == "_"]
+            for n, first in enumerate(separators):
+                for second in separators[n + 1 :]:
+                    index.setdefault((stem[:first], stem[first + 1 : second]), name)
+        return index
+
+    def _save_edn_highlight(
+        self,
+        record: Dict,
+        pdf_path: str,
+        pdf_name: str,
+        screenshots: Dict[Tuple[str, str], str],
+    ):
+        """保存 .edn 文件中的一条高亮（坐标和截图）到映射表"""
+        uuid = record["id"]
+        page = record["page"]
+        coordinates_data = record["coordinates"]
+
+        # 查找对应的截图文件
+        screenshot_path = None
+        screenshot_name = screenshots.get((page, uuid))
+        if screenshot_name:
+            # 使用相对路径
+            screenshot_path = f"attachments/{pdf_name}/{screenshot_name}"
+
+        if uuid in self.pdf_highlight_map:
+            # 更新现有映射
+            self.pdf_highlight_map[uuid]["coordinates"] = coordinates_data
+            if screenshot_path:
+                self.pdf_highlight_map[uuid]["screenshot_path"] = screenshot_path
+        else:
+            # 创建新映射（可能 hls__ 文件不存在）
+            self.pdf_highlight_map[uuid] = {
+                "pdf_path": pdf_path,
+                "page": page,
+                "text": "",  # .edn 文件中没有文本内容
+                "color": "",
+                "coordinates": coordinates_data,
+                "screenshot_path": screenshot_path,
+            }
+
     def collect_referenced_uuids(self, parsed_data: Dict):
         """第一阶段：收集所有被引用的 UUID"""
-        content = parsed_data["content"]
+        self.referenced_uuids.update(self.iter_referenced_uuids(parsed_data))
+
+    def collect_block_mappings(self, filename: str, parsed_data: Dict):
+        """第二阶段：只为被引用的块分配 ID"""
+        self.assign_block_ids(filename, self.extract_defined_uuids(parsed_data))
+
+    def extract_referenced_uuids(self, parsed_data: Dict) -> List[str]:
+        """提取页面中所有块引用 ((uuid)) 的 UUID（按出现顺序）"""
+        return list(self.iter_referenced_uuids(parsed_data))
+
+    def iter_referenced_uuids(self, parsed_data: Dict) -> Iterator[str]:
+        """逐个产出页面中块引用 ((uuid)) 的 UUID，不构建列表
 
+        与 LogseqParser.iter_references 不同，这里也包含 meta 属性中的引用，
+        并且只接受由字母、数字和 '-' 组成的 UUID
+        """
         # 查找所有的块引用 ((uuid))
-        block_ref_pattern = r"\(\(([a-zA-Z0-9-]+)\)\)"
-        matches = re.findall(block_ref_pattern, content)
+        for match in BLOCK_REF_UUID_PATTERN.finditer(parsed_data["content"]):
+            yield match.group(1)
+
+    def extract_hls_link_blocks(self, parsed_data: Dict) -> List[str]:
+        """提取页面中所有 hls__ 高亮链接 [[hls__xxx#block_id]] 的块标识（按出现顺序）"""
+        return re.findall(r"\[\[hls__[^\]#]*#([^\]]+)\]\]", parsed_data["content"])
+
+    def extract_asset_paths(self, parsed_data: Dict) -> List[str]:
+        """提取页面中所有 ../assets/ 资源引用的路径（按出现顺序，包括 meta 属性中的引用）"""
+        return ASSET_PATH_PATTERN.findall(parsed_data["content"])
+
+    def extract_defined_uuids(self, parsed_data: Dict) -> List[str]:
+        """提取页面中所有 id:: uuid 块ID定义的 UUID（按出现顺序）"""
+        # 查找 id:: uuid 格式的块ID定义（允许缩进）
+        id_pattern = re.compile(r"^\s*id:: ([a-zA-Z0-9-]+)")
+        uuids = []
+        for line in parsed_data["content"].split("\n"):
+            id_match = id_pattern.search(line)
+            if id_match:
+                uuids.append(id_match.group(1))
+        return uuids
 
-        for uuid in matches:
-            self.referenced_uuids.add(uuid)
+    def scan_page_lines(self, lines: Iterable[str]) -> Dict:
+        """逐行提取块引用、块ID定义、hls__ 链接、资源路径和原始语法统计（大文件模式）
 
-    def collect_block_mappings(self, filename: str, parsed_data: Dict):
-        """第二阶段：只为被引用的块分配 ID"""
-        lines = parsed_data["content"].split("\n")
-        self.current_filename = filename
+        结果与 extract_* 和 count_original_syntax 对整个内容的结果一致
+        （跨行的语法除外），lines 只需包含带有语法标记的行
+        """
+        referenced_uuids: List[str] = []
+        defined_uuids: List[str] = []
+        hls_link_blocks: List[str] = []
+        asset_paths: List[str] = []
+        original_stats = dict.fromkeys(
+            ("page_links", "block_refs", "block_ids", "assets"), 0
+        )
 
         for line in lines:
-            # 查找 id:: uuid 格式的块ID定义（允许缩进）
-            id_match = re.search(r"^\s*id:: ([a-zA-Z0-9-]+)", line)
-            if id_match:
-                uuid = id_match.group(1)
-                # 只为被引用的块分配 ID
-                if uuid in self.referenced_uuids:
-                    # 生成对应的块ID
-                    self.block_ref_counter += 1
-                    block_id = f"block{self.block_ref_counter}"
-                    # 存储映射：UUID -> (文件名, 块ID)
-                    self.block_uuid_map[uuid] = (filename, block_id)
+            data = {"content": line}
+            referenced_uuids.extend(self.extract_referenced_uuids(data))
+            defined_uuids.extend(self.extract_defined_uuids(data))
+            hls_link_blocks.extend(self.extract_hls_link_blocks(data))
+            asset_paths.extend(self.extract_asset_paths(data))
+            for key, count in self.count_original_syntax(line).items():
+                original_stats[key] += count
+
+        return {
+            "referenced_uuids": referenced_uuids,
+            "defined_uuids": defined_uuids,
+            "hls_link_blocks": hls_link_blocks,
+            "asset_paths": asset_paths,
+            "original_stats": original_stats,
+        }
+
+    def assign_block_ids(self, filename: str, defined_uuids: Iterable[str]):
+        """按定义顺序为被引用的块分配 ID"""
+        for uuid in defined_uuids:
+            # 只为被引用的块分配 ID
+            if uuid in self.referenced_uuids:
+                if self.block_id_mode == BLOCK_ID_STABLE:
+                    self._assign_stable_block_id(filename, uuid)
+                    continue
+                # 生成对应的块ID
+                self.block_ref_counter += 1
+                block_id = f"block{self.block_ref_counter}"
+                # 存储映射：UUID -> (文件名, 块ID)
+                self.block_uuid_map[uuid] = (filename, block_id)
+
+    def _assign_stable_block_id(self, filename: str, uuid: str):
+        """stable 模式：块 ID 只由 UUID 决定，与文件遍历顺序无关
+
+        默认使用 UUID 哈希的短前缀；多个 UUID 的短前缀冲突时，
+        冲突的 UUID 都改用完整哈希，因此结果与分配顺序无关
+        """
+        digest = stable_block_digest(uuid)
+        short_id = f"block-{digest[:STABLE_BLOCK_ID_LENGTH]}"
+
+        owners = self._stable_id_owners.setdefault(short_id, set())
+        owners.add(uuid)
+        if len(owners) == 1:
+            self.block_uuid_map[uuid] = (filename, short_id)
+            return
+
+        for owner in owners:
+            if owner in self.block_uuid_map:
+                owner_filename, _ = self.block_uuid_map[owner]
+            else:
+                owner_filename = filename
+            self.block_uuid_map[owner] = (
+                owner_filename,
+                f"block-{stable_block_digest(owner)}",
+            )
 
     def format_content(
         self, parsed_data: Dict, filename: str = "", target_folder: str = ""
     ) -> str:
         """将解析的 Logseq 数据转换为 Obsidian 格式"""
-        if filename:
-            self.current_filename = filename
-
-        # 保存目标文件夹信息，用于正确处理资源路径
-        self.current_target_folder = target_folder
-
         lines = parsed_data["content"].split("\n")
+        return "\n".join(
+            self.iter_output_lines(parsed_data, lines, filename, target_folder)
+        )
+
+    def iter_output_lines(
+        self,
+        parsed_data: Dict,
+        lines: Iterable[str],
+        filename: str = "",
+        target_folder: str = "",
+    ) -> Iterator[str]:
+        """逐行产出转换结果，用 "\n" 连接即为完整输出
+
+        各处理阶段都是逐行的生成器，最多只缓存前后一行，
+        因此 lines 可以是大文件的流式行迭代器
+        """
+        # 当前页面的上下文（文件名、目标文件夹），不保存在格式化器上
+        context = FormatContext(filename=filename or None, target_folder=target_folder)
+        meta_properties = parsed_data.get("meta_properties", [])
 
         # 生成 YAML frontmatter（如果有 meta 属性）
         # 传递原始文件名用于自动生成title
-        frontmatter = self._generate_frontmatter(
-            parsed_data.get("meta_properties", []), filename
-        )
+        frontmatter = self._generate_frontmatter(meta_properties, filename)
 
         # 移除原始内容中的 meta 属性行
-        filtered_lines = self._filter_meta_lines(
-            lines, parsed_data.get("meta_properties", [])
-        )
+        filtered_lines = self._iter_filter_meta_lines(lines, meta_properties)
 
         # 如果文件被归类到特定文件夹，移除分类标签行
         category_folder = self.detect_category_folder(parsed_data)
         if category_folder:
-            filtered_lines = self._remove_category_tag_lines(filtered_lines)
+            filtered_lines = self._iter_remove_category_tag_lines(filtered_lines)
 
         # 处理每一行
-        formatted_lines = []
-        for line in filtered_lines:
-            formatted_line = self._process_line(line, parsed_data)
-            formatted_lines.append(formatted_line)
+        formatted_lines = (
+            self._process_line(line, parsed_data, context) for line in filtered_lines
+        )
 
         # 合并块ID到前一行
-        formatted_lines = self._merge_block_ids_to_previous_line(formatted_lines)
+        formatted_lines = self._iter_merge_block_ids(formatted_lines)
 
         # 如果启用了删除第一级列表符号，进行后处理
         if self.remove_top_level_bullets:
-            formatted_lines = self._remove_top_level_bullets(formatted_lines)
+            formatted_lines = self._iter_remove_top_level_bullets(formatted_lines)
 
         # 格式优化：处理空行和标题间距
-        formatted_lines = self._optimize_formatting(
-            formatted_lines
-        )  # 组合 frontmatter 和内容
+        formatted_lines = self._iter_optimize_formatting(formatted_lines)
+
+        # 组合 frontmatter 和内容（没有内容时 frontmatter 后保留一个换行）
         if frontmatter:
-            return frontmatter + "\n" + "\n".join(formatted_lines)
+            yield frontmatter
+            has_content = False
+            for line in formatted_lines:
+                has_content = True
+                yield line
+            if not has_content:
+                yield ""
         else:
-            return "\n".join(formatted_lines)
+            yield from formatted_lines
 
-    def _process_line(self, line: str, _parsed_data: Dict) -> str:
-        """处理单行内容"""
+    def _process_line(
+        self, line: str, _parsed_data: Dict, context: Optional[FormatContext] = None
+    ) -> str:
+        """处理单行内容（单次扫描，结果与 _convert_line_stepwise 一致）"""
+        return self._line_rewriter.rewrite(line, context or FormatContext())
+
+    def _convert_line_stepwise(
+        self, line: str, context: Optional[FormatContext] = None
+    ) -> str:
+        """依次调用各个转换方法处理单行内容"""
+        context = context or FormatContext()
         processed_line = line
 
         # 1. 处理 Logseq 引用块格式 "- >" -> ">"
         processed_line = self._convert_quote_blocks(processed_line)
 
         # 2. 处理页面链接 [[]]
-        processed_line = self._convert_page_links(processed_line)
+        processed_line = self._convert_page_links(processed_line, context)
 
         # 3. 处理块嵌入语法 {{embed ((xxx))}} - 转换为 Obsidian 嵌入格式
-        processed_line = self._convert_embed_syntax(processed_line)
+        processed_line = self._convert_embed_syntax(processed_line, context)
 
         # 3.5. 处理视频嵌入语法 {{youtube}}, {{bilibili}}, {{youtube-timestamp}} - 转换为 HTML iframe 或链接
         processed_line = self._convert_video_embeds(processed_line)
 
         # 4. 处理块引用 (()) - 转换为注释或删除
-        processed_line = self._convert_block_refs(processed_line)
+        processed_line = self._convert_block_refs(processed_line, context)
 
         # 5. 处理块 ID - 转换为 Obsidian 块引用格式
         processed_line = self._convert_block_ids(processed_line)
 
         # 6. 处理资源文件路径
-        processed_line = self._convert_asset_paths(processed_line)
+        processed_line = self._convert_asset_paths(processed_line, context)
 
         return processed_line
 
@@ -309,66 +886,65 @@ class ObsidianFormatter:
 
         return line
 
-    def _convert_page_links(self, line: str) -> str:
+    def _convert_page_links(
+        self, line: str, context: Optional[FormatContext] = None
+    ) -> str:
         """转换页面链接格式"""
+        context = context or FormatContext()
 
         def replace_link(match):
-            link_text = match.group(1)
-
-            # 检查是否为 hls__ 高亮文件的引用
-            if link_text.startswith("hls__"):
-                # 如果包含块ID，尝试转换为 PDF 引用
-                if "#" in link_text:
-                    _, block_id = link_text.split("#", 1)
-
-                    # 查找对应的 PDF 高亮
-                    for _, highlight in self.pdf_highlight_map.items():
-                        if highlight.get("block_id") == block_id:
-                            pdf_path = highlight["pdf_path"]
-                            page = highlight["page"]
-                            text = highlight["text"]
-                            if text and page:
-                                return f"[{text}]({pdf_path}#page={page})"
-                            elif page:
-                                return f"[PDF页{page}]({pdf_path}#page={page})"
-
-                    # 如果找不到，返回注释
-                    return f"<!-- PDF高亮引用 (未找到): {link_text} -->"
-                else:
-                    # 直接引用 hls__ 文件，返回注释
-                    return f"<!-- PDF高亮文件引用: {link_text} -->"
-
-            # 对于普通页面链接，只进行 URL 解码，但保持页面名称不变
-            # 页面链接在 Obsidian 中可以包含斜杠等特殊字符
-            processed_link = urllib.parse.unquote(link_text)
-            # Obsidian 双链基本兼容，保持原有的页面链接格式
-            return f"[[{processed_link}]]"
+            return self._page_link_replacement(match.group(1), context)
 
         return re.sub(r"\[\[([^\]]+)\]\]", replace_link, line)
 
-    def _convert_embed_syntax(self, line: str) -> str:
+    def _page_link_replacement(
+        self, link_text: str, context: Optional[FormatContext] = None
+    ) -> str:
+        """页面链接 [[link_text]] 的转换结果"""
+        # 检查是否为 hls__ 高亮文件的引用
+        if link_text.startswith("hls__"):
+            # 如果包含块ID，尝试转换为 PDF 引用
+            if "#" in link_text:
+                _, block_id = link_text.split("#", 1)
+
+                # hls__ 链接中的块标识就是高亮的 UUID
+                highlight = self.pdf_highlight_map.get(block_id)
+                if highlight:
+                    pdf_path = self._attachment_path(
+                        highlight["pdf_path"], context or FormatContext()
+                    )
+                    page = highlight["page"]
+                    text = highlight["text"]
+                    if text and page:
+                        return f"[{text}]({pdf_path}#page={page})"
+                    elif page:
+                        return f"[PDF页{page}]({pdf_path}#page={page})"
+
+                # 如果找不到，返回注释
+                return f"<!-- PDF高亮引用 (未找到): {link_text} -->"
+            else:
+                # 直接引用 hls__ 文件，返回注释
+                return f"<!-- PDF高亮文件引用: {link_text} -->"
+
+        # 对于普通页面链接，只进行 URL 解码，但保持页面名称不变
+        # 页面链接在 Obsidian 中可以包含斜杠等特殊字符
+        processed_link = urllib.parse.unquote(link_text)
+        # Obsidian 双链基本兼容，保持原有的页面链接格式
+        return f"[[{processed_link}]]"
+
+    def _convert_embed_syntax(
+        self, line: str, context: Optional[FormatContext] = None
+    ) -> str:
         """处理 LogSeq 块嵌入语法 {{embed ((xxx))}} 转换为 Obsidian 嵌入格式"""
+        context = context or FormatContext()
 
         def replace_embed(match):
             block_uuid = match.group(1)
 
-            # 查找块UUID映射
-            if block_uuid in self.block_uuid_map:
-                target_filename, block_id = self.block_uuid_map[block_uuid]
-
-                # 使用嵌入格式 ![[]] 来实现块嵌入
-                if target_filename == self.current_filename:
-                    # 同文件内的块嵌入
-                    return f"![[#^{block_id}]]"
-                else:
-                    # 跨文件的块嵌入
-                    # 处理文件名：移除.md扩展名
-                    clean_filename = (
-                        target_filename.replace(".md", "")
-                        if target_filename.endswith(".md")
-                        else target_filename
-                    )
-                    return f"![[{clean_filename}#^{block_id}]]"
+            # 查找块UUID映射，使用嵌入格式 ![[]] 来实现块嵌入
+            block_link = self._block_link(block_uuid, context)
+            if block_link is not None:
+                return block_link
             else:
                 # 找不到对应的映射，保留为注释以便调试
                 return f"<!-- Block Embed (未找到): {block_uuid} -->"
@@ -443,8 +1019,11 @@ class ObsidianFormatter:
 
         return processed_line
 
-    def _convert_block_refs(self, line: str) -> str:
+    def _convert_block_refs(
+        self, line: str, context: Optional[FormatContext] = None
+    ) -> str:
         """处理块引用 - 转换为 Obsidian 块链接或 PDF 注释引用格式"""
+        context = context or FormatContext()
 
         def replace_block_ref(match):
             block_uuid = match.group(1)
@@ -469,20 +1048,7 @@ class ObsidianFormatter:
                 # 转换为 Obsidian 的 PDF 注释格式
                 if page:
                     # 首先转换路径格式：../assets/ → ../attachments/ 或 attachments/
-                    target_folder = getattr(self, "current_target_folder", "")
-                    if pdf_path.startswith("../assets/"):
-                        if target_folder:
-                            # 文件在子文件夹中，需要 ../attachments/
-                            converted_pdf_path = pdf_path.replace(
-                                "../assets/", "../attachments/"
-                            )
-                        else:
-                            # 文件在根目录，直接使用 attachments/
-                            converted_pdf_path = pdf_path.replace(
-                                "../assets/", "attachments/"
-                            )
-                    else:
-                        converted_pdf_path = pdf_path
+                    converted_pdf_path = self._attachment_path(pdf_path, context)
 
                     # 构建基础 PDF 路径（移除相对路径前缀以适配 Obsidian 链接格式）
                     if converted_pdf_path.startswith("../attachments/"):
@@ -549,43 +1115,52 @@ class ObsidianFormatter:
                     return result
                 else:
                     # 对于没有页面信息的情况，也需要转换路径
-                    target_folder = getattr(self, "current_target_folder", "")
-                    if pdf_path.startswith("../assets/"):
-                        if target_folder:
-                            converted_pdf_path = pdf_path.replace(
-                                "../assets/", "../attachments/"
-                            )
-                        else:
-                            converted_pdf_path = pdf_path.replace(
-                                "../assets/", "attachments/"
-                            )
-                    else:
-                        converted_pdf_path = pdf_path
+                    converted_pdf_path = self._attachment_path(pdf_path, context)
                     return f"[{link_text}]({converted_pdf_path})"
 
-            # 查找对应的块映射
-            elif block_uuid in self.block_uuid_map:
-                target_filename, block_id = self.block_uuid_map[block_uuid]
-
-                # 使用嵌入格式 ![[]] 来实现类似 Notion 同步块的效果
-                if target_filename == self.current_filename:
-                    # 同文件内的块嵌入
-                    return f"![[#^{block_id}]]"
-                else:
-                    # 跨文件的块嵌入
-                    # 处理文件名：移除.md扩展名
-                    clean_filename = (
-                        target_filename.replace(".md", "")
-                        if target_filename.endswith(".md")
-                        else target_filename
-                    )
-                    return f"![[{clean_filename}#^{block_id}]]"
+            # 查找对应的块映射，使用嵌入格式 ![[]] 来实现类似 Notion 同步块的效果
+            block_link = self._block_link(block_uuid, context)
+            if block_link is not None:
+                return block_link
             else:
                 # 找不到对应的映射，保留为注释以便调试
                 return f"<!-- Block Reference (未找到): {block_uuid} -->"
 
         return re.sub(r"\(\(([^)]+)\)\)", replace_block_ref, line)
 
+    @staticmethod
+    def _attachment_path(pdf_path: str, context: FormatContext) -> str:
+        """PDF 路径转换：../assets/ → ../attachments/（子文件夹中）或 attachments/"""
+        if not pdf_path.startswith("../assets/"):
+            return pdf_path
+        if context.target_folder:
+            # 文件在子文件夹中，需要 ../attachments/
+            return pdf_path.replace("../assets/", "../attachments/")
+        # 文件在根目录，直接使用 attachments/
+        return pdf_path.replace("../assets/", "attachments/")
+
+    def _block_link(
+        self, block_uuid: str, context: Optional[FormatContext] = None
+    ) -> Optional[str]:
+        """块 UUID 对应的 Obsidian 块嵌入，未分配块 ID 时返回 None"""
+        if block_uuid not in self.block_uuid_map:
+            return None
+
+        context = context or FormatContext()
+        target_filename, block_id = self.block_uuid_map[block_uuid]
+        if target_filename == context.filename:
+            # 同文件内的块嵌入
+            return f"![[#^{block_id}]]"
+        else:
+            # 跨文件的块嵌入
+            # 处理文件名：移除.md扩展名
+            clean_filename = (
+                target_filename.replace(".md", "")
+                if target_filename.endswith(".md")
+                else target_filename
+            )
+            return f"![[{clean_filename}#^{block_id}]]"
+
     def _convert_block_ids(self, line: str) -> str:
         """转换块 ID 为 Obsidian 块引用格式，删除无引用的块 ID"""
         # 检查这一行是否只包含块 ID（支持所有UUID格式，允许缩进）
@@ -604,39 +1179,63 @@ class ObsidianFormatter:
 
         return line
 
-    def _convert_asset_paths(self, line: str) -> str:
+    def _convert_asset_paths(
+        self, line: str, context: Optional[FormatContext] = None
+    ) -> str:
         """转换资源文件路径"""
+        context = context or FormatContext()
 
         def replace_asset(match):
-            alt_text = match.group(1)
-            file_path = match.group(2)
+            return self._asset_replacement(match.group(1), match.group(2), context)
 
-            # 处理相对路径 - 扁平化结构
-            if file_path.startswith("../assets/"):
-                # 根据目标文件夹决定正确的相对路径
-                target_folder = getattr(self, "current_target_folder", "")
+        return re.sub(r"!\[([^\]]*)\]\(([^)]+)\)", replace_asset, line)
 
-                if target_folder:
-                    # 文件在子文件夹中，需要 ../attachments/
-                    new_path = file_path.replace("../assets/", "../attachments/")
-                else:
-                    # 文件在根目录，直接使用 attachments/
-                    new_path = file_path.replace("../assets/", "attachments/")
-
-                # 暂时禁用文件存在性检查，因为它会破坏Markdown格式
-                # # 检查文件是否存在（如果有输入路径信息）
-                # if hasattr(self, 'input_assets_dir'):
-                #     # 构建实际文件路径进行检查
-                #     actual_file_path = self.input_assets_dir / file_path.replace('../assets/', '')
-                #     if not actual_file_path.exists():
-                #         # 文件不存在，添加注释
-                #         return f"![{alt_text}]({new_path}) <!-- ⚠️ 文件不存在: {file_path} -->"
+    def _asset_replacement(
+        self, alt_text: str, file_path: str, context: Optional[FormatContext] = None
+    ) -> str:
+        """资源引用 ![alt_text](file_path) 的转换结果"""
+        context = context or FormatContext()
+
+        # 处理相对路径 - 扁平化结构
+        if file_path.startswith("../assets/"):
+            file_path = self.canonical_asset_path(file_path)
+            # 根据目标文件夹决定正确的相对路径
+            target_folder = context.target_folder
+
+            if target_folder:
+                # 文件在子文件夹中，需要 ../attachments/
+                new_path = file_path.replace("../assets/", "../attachments/")
             else:
-                new_path = file_path
+                # 文件在根目录，直接使用 attachments/
+                new_path = file_path.replace("../assets/", "attachments/")
+
+            # 暂时禁用文件存在性检查，因为它会破坏Markdown格式
+            # # 检查文件是否存在（如果有输入路径信息）
+            # if hasattr(self, 'input_assets_dir'):
+            #     # 构建实际文件路径进行检查
+            #     actual_file_path = self.input_assets_dir / file_path.replace('../assets/', '')
+            #     if not actual_file_path.exists():
+            #         # 文件不存在，添加注释
+            #         return f"![{alt_text}]({new_path}) <!-- ⚠️ 文件不存在: {file_path} -->"
+        else:
+            new_path = file_path
 
-            return f"![{alt_text}]({new_path})"
+        return f"![{alt_text}]({new_path})"
 
-        return re.sub(r"!\[([^\]]*)\]\(([^)]+)\)", replace_asset, line)
+    def canonical_asset_path(self, file_path: str) -> str:
+        """资源去重后的路径：重复的资源文件改为引用内容相同的保留文件"""
+        if not self.asset_aliases:
+            return file_path
+
+        relative_path = file_path[len("../assets/") :]
+        canonical = self.asset_aliases.get(relative_path)
+        if canonical is None:
+            # 引用可能经过 URL 编码，别名以实际文件名为键
+            canonical = self.asset_aliases.get(urllib.parse.unquote(relative_path))
+            if canonical is None:
+                return file_path
+            canonical = urllib.parse.quote(canonical)
+        return f"../assets/{canonical}"
 
     def generate_filename(self, original_name: str) -> str:
         """生成 Obsidian 兼容的文件名"""
@@ -669,28 +1268,38 @@ class ObsidianFormatter:
         self, original_data: Dict, converted_content: str
     ) -> Dict:
         """生成转换摘要"""
-        original_stats = {
-            "page_links": len(
-                re.findall(r"\[\[([^\]]+)\]\]", original_data["content"])
-            ),
-            "block_refs": len(re.findall(r"\(\(([^)]+)\)\)", original_data["content"])),
+        return self.build_summary(
+            self.count_original_syntax(original_data["content"]),
+            self.count_converted_syntax(converted_content),
+        )
+
+    @staticmethod
+    def count_original_syntax(text: str) -> Dict[str, int]:
+        """统计原始内容中的 Logseq 语法数量"""
+        return {
+            "page_links": len(re.findall(r"\[\[([^\]]+)\]\]", text)),
+            "block_refs": len(re.findall(r"\(\(([^)]+)\)\)", text)),
             "block_ids": len(
-                re.findall(
-                    r"^\s*id:: ([a-zA-Z0-9-]+)", original_data["content"], re.MULTILINE
-                )
-            ),
-            "assets": len(
-                re.findall(r"!\[([^\]]*)\]\(([^)]+)\)", original_data["content"])
+                re.findall(r"^\s*id:: ([a-zA-Z0-9-]+)", text, re.MULTILINE)
             ),
+            "assets": len(re.findall(r"!\[([^\]]*)\]\(([^)]+)\)", text)),
         }
 
-        converted_stats = {
-            "page_links": len(re.findall(r"\[\[([^\]]+)\]\]", converted_content)),
-            "block_refs": len(re.findall(r"<!-- Block Reference:", converted_content)),
-            "block_ids": len(re.findall(r"\^block\d+", converted_content)),
-            "assets": len(re.findall(r"!\[([^\]]*)\]\(([^)]+)\)", converted_content)),
+    @staticmethod
+    def count_converted_syntax(text: str) -> Dict[str, int]:
+        """统计转换结果中的 Obsidian 语法数量"""
+        return {
+            "page_links": len(re.findall(r"\[\[([^\]]+)\]\]", text)),
+            "block_refs": len(re.findall(r"<!-- Block Reference:", text)),
+            "block_ids": len(re.findall(BLOCK_ID_PATTERN, text)),
+            "assets": len(re.findall(r"!\[([^\]]*)\]\(([^)]+)\)", text)),
         }
 
+    @staticmethod
+    def build_summary(
+        original_stats: Dict[str, int], converted_stats: Dict[str, int]
+    ) -> Dict:
+        """根据语法统计生成转换摘要"""
         return {
             "original": original_stats,
             "converted": converted_stats,
@@ -702,124 +1311,66 @@ class ObsidianFormatter:
 
     def _remove_top_level_bullets(self, lines: list) -> list:
         """删除第一级列表符号，转换为段落格式，并规范化列表缩进"""
-        result = []
-        i = 0
-
-        while i < len(lines):
-            line = lines[i]
-
-            # 跳过只有 '-' 的空行
-            if line.strip() == "-":
-                i += 1
-                continue
-
-            # 检查是否是第一级列表项（没有前导空格的 "- "）
-            if line.startswith("- ") and not line.startswith("  "):
-                # 删除 "- " 前缀
-                content = line[2:]
-
-                # 如果内容不为空，添加到结果
-                if content.strip():
-                    result.append(content)
-                else:
-                    # 如果是空的列表项，跳过
-                    i += 1
-                    continue
+        return list(self._iter_remove_top_level_bullets(lines))
 
-                # 处理后续的子项，规范化缩进
-                j = i + 1
-                has_sub_items = False
+    def _iter_remove_top_level_bullets(self, lines: Iterable[str]) -> Iterator[str]:
+        """_remove_top_level_bullets 的逐行版本
 
-                while j < len(lines):
-                    next_line = lines[j]
-
-                    # 空行保持原样
-                    if next_line.strip() == "":
-                        result.append(next_line)
-                        j += 1
-                        continue
-
-                    # 检查是否是子项（以制表符或多个空格开头）
-                    if next_line.startswith("\t") or next_line.startswith("  "):
-                        has_sub_items = True
-                        # 规范化缩进并提升一个层级（减少缩进）
-                        normalized_line = self._normalize_list_indent(next_line)
-
-                        # 处理空的子列表项
-                        if normalized_line.strip() in ["-", "- "]:
-                            # 跳过空的子列表项
-                            j += 1
-                            continue
+        按大纲的顶层块逐块处理，同一时间只保留一个顶层块的行
+        """
+        add_gap = False
 
-                        # 提升一个层级：移除一级缩进（2个空格）
-                        if normalized_line.startswith("  "):
-                            promoted_line = normalized_line[2:]  # 移除前面的2个空格
-                        else:
-                            promoted_line = normalized_line  # 如果没有足够的缩进，保持原样
+        for _, block in iter_top_level_blocks(lines):
+            head = block[0]
 
-                        result.append(promoted_line)
-                        j += 1
-                    else:
-                        # 不是子项，停止处理
-                        break
+            # 没有子项的第一级列表项后，下一行不是空行或另一个第一级列表项时补一个空行
+            if add_gap and head.strip() and not head.startswith("- "):
+                yield ""
+            add_gap = False
 
-                i = j - 1
+            # 其余的块（空的列表项、普通文本）只规范化缩进
+            if not (head.startswith("- ") and head[2:].strip()):
+                yield from self._iter_normalize_lines(block)
+                continue
 
-                # 只有在没有子项且下一行不是空行或另一个第一级列表项时才添加空行
-                if not has_sub_items and i + 1 < len(lines):
-                    next_line = lines[i + 1] if i + 1 < len(lines) else ""
-                    if next_line.strip() != "" and not next_line.startswith("- "):
-                        result.append("")
+            # 第一级列表项（没有前导空格的 "- "）：删除 "- " 前缀，子项提升一个层级
+            yield head[2:]
 
-            else:
-                # 不是第一级列表项
-                if line.startswith("\t") or line.startswith("  "):
-                    # 规范化子项缩进
-                    normalized_line = self._normalize_list_indent(line)
-
-                    # 处理空的子列表项
-                    if normalized_line.strip() in ["-", "- "]:
-                        # 跳过空的子列表项
-                        i += 1
-                        continue
+            has_sub_items = False
+            for line in block[1:]:
+                # 空行保持原样
+                if not line.strip():
+                    yield line
+                    continue
 
-                    result.append(normalized_line)
+                has_sub_items = True
+                normalized_line = self._normalize_list_indent(line)
+                # 跳过空的子列表项
+                if normalized_line.strip() == "-":
+                    continue
+                # 提升一个层级：移除一级缩进（2个空格）
+                if normalized_line.startswith("  "):
+                    yield normalized_line[2:]
                 else:
-                    # 普通行保持原样
-                    result.append(line)
+                    yield normalized_line
 
-            i += 1
+            add_gap = not has_sub_items
 
-        return result
+    def _iter_normalize_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """不在第一级列表项下的行：规范化子项缩进，跳过空的列表项"""
+        for line in lines:
+            if line.strip() == "-":
+                continue
+            if line.startswith(("\t", "  ")):
+                line = self._normalize_list_indent(line)
+                if line.strip() == "-":
+                    continue
+            yield line
 
     def _normalize_list_indent(self, line: str) -> str:
-        """规范化列表项的缩进"""
-        # 计算前导空白的数量
+        """规范化列表项的缩进：制表符按1级计算，每2个空格按1级计算，每级2个空格"""
         stripped = line.lstrip()
-        leading_whitespace = line[: len(line) - len(stripped)]
-
-        # 计算缩进级别：制表符按1级计算，每2个空格按1级计算
-        indent_level = 0
-        i = 0
-        while i < len(leading_whitespace):
-            char = leading_whitespace[i]
-            if char == "\t":
-                indent_level += 1
-                i += 1
-            elif char == " ":
-                # 连续的空格按2个为一级缩进
-                space_count = 0
-                while i < len(leading_whitespace) and leading_whitespace[i] == " ":
-                    space_count += 1
-                    i += 1
-                indent_level += space_count // 2  # 每2个空格算1级
-            else:
-                i += 1
-
-        # 生成规范化的缩进（每级2个空格）
-        normalized_indent = "  " * indent_level
-
-        return normalized_indent + stripped
+        return "  " * indent_level(line[: len(line) - len(stripped)]) + stripped
 
     def _generate_frontmatter(
         self, meta_properties, original_filename: str = ""
@@ -930,12 +1481,20 @@ class ObsidianFormatter:
         """过滤掉原始内容中的 meta 属性行"""
         if not meta_properties:
             return lines
+        return list(self._iter_filter_meta_lines(lines, meta_properties))
+
+    def _iter_filter_meta_lines(
+        self, lines: Iterable[str], meta_properties
+    ) -> Iterator[str]:
+        """_filter_meta_lines 的逐行版本"""
+        if not meta_properties:
+            yield from lines
+            return
 
         # 获取所有 meta 属性的行号
         meta_line_numbers = {prop.line_number for prop in meta_properties}
 
         # 过滤掉这些行，同时跳过文件开头的空行
-        filtered_lines = []
         content_started = False
 
         for i, line in enumerate(lines, 1):
@@ -947,9 +1506,7 @@ class ObsidianFormatter:
                 continue
 
             content_started = True
-            filtered_lines.append(line)
-
-        return filtered_lines
+            yield line
 
     def detect_category_folder(self, parsed_data: Dict) -> str:
         """检测文件应该归类到哪个文件夹
@@ -967,17 +1524,13 @@ class ObsidianFormatter:
         if not self.category_tag or not self.category_folder:
             return ""
 
-        lines = parsed_data["content"].split("\n")
-        meta_properties = parsed_data.get("meta_properties", [])
-
-        # 获取实际内容行（跳过 meta 属性和空行）
-        content_lines = self._get_actual_content_lines(lines, meta_properties)
-
-        if not content_lines:
+        # 获取第一行实际内容（跳过 meta 属性和空行）
+        first_content_line = self._first_content_line(parsed_data)
+        if first_content_line is None:
             return ""
 
         # 检查第一行实际内容是否包含分类标签
-        first_content_line = content_lines[0].strip()
+        first_content_line = first_content_line.strip()
 
         # 检查是否是引用块（在移除列表标记之前）
         stripped_line = first_content_line.strip()
@@ -1040,8 +1593,31 @@ class ObsidianFormatter:
 
         return stripped
 
+    def _first_content_line(self, parsed_data: Dict) -> Optional[str]:
+        """第一行实际内容，只读取到该行为止
+
+        优先使用 scan_header 的结果；大文件模式只有文件头部的行，第一行实际内容一定在其中
+        """
+        if "first_content_line" in parsed_data:
+            return parsed_data["first_content_line"]
+
+        if "content" in parsed_data:
+            lines = iter_lines(parsed_data["content"])
+        else:
+            lines = parsed_data.get("header_lines", [])
+        content_lines = self._iter_actual_content_lines(
+            lines, parsed_data.get("meta_properties", [])
+        )
+        return next(content_lines, None)
+
     def _get_actual_content_lines(self, lines, meta_properties):
         """获取实际内容行（排除 meta 属性和开头的空行）"""
+        return list(self._iter_actual_content_lines(lines, meta_properties))
+
+    def _iter_actual_content_lines(
+        self, lines: Iterable[str], meta_properties
+    ) -> Iterator[str]:
+        """_get_actual_content_lines 的逐行版本"""
         # 获取所有 meta 属性的行号
         meta_line_numbers = set()
         meta_content_patterns = set()  # 存储meta属性的内容模式，用于匹配没有行号的情况
@@ -1057,8 +1633,6 @@ class ObsidianFormatter:
                         pattern = f"{prop['key']}:: {prop['value']}"
                         meta_content_patterns.add(pattern)
 
-        actual_content_lines = []
-
         for i, line in enumerate(lines, 1):
             # 跳过 meta 属性行（通过行号）
             if i in meta_line_numbers:
@@ -1076,9 +1650,7 @@ class ObsidianFormatter:
                 continue
 
             # 这是实际内容行
-            actual_content_lines.append(line)
-
-        return actual_content_lines
+            yield line
 
     def _remove_category_tag_lines(self, lines):
         """移除包含分类标签的行
@@ -1094,9 +1666,15 @@ class ObsidianFormatter:
         """
         if not self.category_tag:
             return lines
+        return list(self._iter_remove_category_tag_lines(lines))
+
+    def _iter_remove_category_tag_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """_remove_category_tag_lines 的逐行版本"""
+        if not self.category_tag:
+            yield from lines
+            return
 
         category_tag_pattern = f"#{self.category_tag}"
-        result_lines = []
 
         for line in lines:
             # 移除 Logseq 列表标记，获取实际内容
@@ -1137,7 +1715,7 @@ class ObsidianFormatter:
                             # 删除标签后没有内容了，删除整行
                             continue
 
-                        result_lines.append(new_line)
+                        yield new_line
                 else:
                     # 标签不在开头，替换标签部分
                     new_content = content_without_bullets.replace(
@@ -1155,15 +1733,13 @@ class ObsidianFormatter:
                             list_marker = "* "
 
                         new_line = original_prefix + list_marker + new_content
-                        result_lines.append(new_line)
+                        yield new_line
                     else:
                         # 删除标签后没有内容了，删除整行
                         continue
             else:
                 # 不包含分类标签，保留原行
-                result_lines.append(line)
-
-        return result_lines
+                yield line
 
     def _merge_block_ids_to_previous_line(self, lines: list) -> list:
         """将独立的块ID行合并到前一行的末尾
@@ -1171,27 +1747,28 @@ class ObsidianFormatter:
         Logseq中的 'id:: uuid' 独占一行，但Obsidian中的 '^blockXXX'
         应该紧跟在内容后面，用空格分隔
         """
-        result = []
-        i = 0
+        return list(self._iter_merge_block_ids(lines))
 
-        while i < len(lines):
-            line = lines[i].strip()
+    def _iter_merge_block_ids(self, lines: Iterable[str]) -> Iterator[str]:
+        """_merge_block_ids_to_previous_line 的逐行版本，只缓存前一行"""
+        previous = None
 
-            # 检查是否是块ID行
+        for original in lines:
+            line = original.strip()
+
+            # 检查是否是块ID行，前面有非空行时将块ID合并到前一行
             if line.startswith("^") and len(line) > 1:
-                # 这是一个块ID行
-                if result and result[-1].strip():  # 前面有非空行
-                    # 将块ID合并到前一行
-                    result[-1] = result[-1].rstrip() + " " + line
-                else:
-                    # 前面没有内容或前一行是空行，独立保留，保持原始格式
-                    result.append(lines[i])
-            else:
-                result.append(lines[i])  # 保留原始格式
+                if previous is not None and previous.strip():
+                    previous = previous.rstrip() + " " + line
+                    continue
 
-            i += 1
+            # 前面没有内容或前一行是空行的块ID行独立保留，保持原始格式
+            if previous is not None:
+                yield previous
+            previous = original
 
-        return result
+        if previous is not None:
+            yield previous
 
     def _optimize_formatting(self, lines: list) -> list:
         """格式优化：处理空行和标题间距
@@ -1200,10 +1777,10 @@ class ObsidianFormatter:
         2. 确保标题前有空行（除非是文档开头）
         3. 清理空行中的空格和缩进
         """
-        if not lines:
-            return []
+        return list(self._iter_optimize_formatting(lines))
 
-        result = []
+    def _iter_optimize_formatting(self, lines: Iterable[str]) -> Iterator[str]:
+        """_optimize_formatting 的逐行版本"""
         prev_line_was_empty = False
 
         for i, line in enumerate(lines):
@@ -1219,16 +1796,14 @@ class ObsidianFormatter:
             if is_empty_line:
                 # 如果前一行不是空行，添加一个干净的空行
                 if not prev_line_was_empty:
-                    result.append("")
+                    yield ""
                     prev_line_was_empty = True
                 # 如果前一行已经是空行，跳过当前空行（合并连续空行）
             else:
                 # 非空行处理
                 if is_heading and i > 0 and not prev_line_was_empty:
                     # 标题前需要空行，但前一行不是空行，添加空行
-                    result.append("")
+                    yield ""
 
-                result.append(line)
+                yield line
                 prev_line_was_empty = False
-
-        return result
@@ -0,0 +1,104 @@
+"""
+后台写入
+格式化和写入重叠进行：格式化好的页面放入有界队列，由写入线程按批取出写入，
+队列满时格式化阻塞等待（背压），待写入的页面数不超过 max_pending + threads × batch_size
+"""
+
+import queue
+import threading
+from typing import Callable, Dict, List
+
+from .conversion_pipeline import PageTask
+from .file_manager import FileManager
+
+# 队列结束标记
+_STOP = object()
+
+
+class PageWriter:
+    """后台写入线程池
+
+    用法：
+        with PageWriter(file_manager, write_page) as writer:
+            for index, task in pending:
+                writer.submit(index, task)
+        records = writer.records
+    """
+
+    def __init__(
+        self,
+        file_manager: FileManager,
+        write: Callable[[FileManager, PageTask], Dict],
+        threads: int = 4,
+        max_pending: int = 64,
+        batch_size: int = 16,
+    ):
+        if threads < 1:
+            raise ValueError("threads 必须大于等于 1")
+        self.file_manager = file_manager
+        self.write = write
+        self.batch_size = batch_size
+        # 任务序号 -> 转换记录
+        self.records: Dict[int, Dict] = {}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(max_pending, 1))
+        # 多个线程的输出按批打印，避免交错
+        self._print_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"page-writer-{n}", daemon=True)
+            for n in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, index: int, task: PageTask):
+        """放入写入队列；队列已满时阻塞，直到写入线程取走页面"""
+        self._queue.put((index, task))
+
+    def close(self) -> Dict[int, Dict]:
+        """等待所有页面写入完成，返回转换记录"""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        return self.records
+
+    def __enter__(self) -> "PageWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        messages: List[str] = []
+        file_manager = self.file_manager.with_log(messages.append)
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            for index, task in batch[:-1] if stop else batch:
+                try:
+                    self.records[index] = self.write(file_manager, task)
+                except Exception as e:
+                    self.records[index] = {
+                        "source_file": str(task.relative_path),
+                        "success": False,
+                        "error": str(e),
+                    }
+                # 写入后释放页面内容，内存中只保留队列里的页面
+                task.content = None
+
+            if messages:
+                with self._print_lock:
+                    self.file_manager.log("\n".join(messages))
+                messages.clear()
+            if stop:
+                return
+
+    def _next_batch(self) -> List:
+        """阻塞取出一个页面，再取出队列中已有的页面，最多 batch_size 个"""
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
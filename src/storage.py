@@ -0,0 +1,268 @@
+"""
+输出存储后端
+FileManager 通过存储后端写入页面、资源文件和转换清单：本地目录、内存、归档文件，
+以及不保存任何内容的空后端（预览模式和基准测试）
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .archive_writer import ArchiveWriter
+from .asset_copier import AssetCopier, AssetCopyStats
+
+# (源文件, 目标名称)
+AssetPairs = List[Tuple[Path, str]]
+
+
+class StorageBackend(ABC):
+    """存储后端接口
+
+    名称都是相对于输出位置、用 / 分隔的路径（如 "Daily Notes/2024-01-01.md"）
+    """
+
+    # 预览模式：不写入任何内容，消息以 [DRY RUN] 开头
+    preview = False
+
+    def open(self):
+        """开始写入之前调用（如创建归档文件）"""
+
+    def close(self):
+        """写入结束后调用"""
+
+    def location(self, name: str) -> str:
+        """名称在消息中的显示形式"""
+        return name
+
+    @abstractmethod
+    def write_lines(self, name: str, lines: Iterable[str]):
+        """写入文本文件，行之间用换行连接（UTF-8 编码）"""
+
+    @abstractmethod
+    def write_bytes(self, name: str, data: bytes):
+        """写入二进制内容"""
+
+    @abstractmethod
+    def copy_files(self, pairs: AssetPairs, copier: AssetCopier) -> AssetCopyStats:
+        """复制资源文件"""
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        """读取之前写入的文件，不存在或不支持读取时返回 None"""
+        return None
+
+    def exists(self, name: str) -> bool:
+        return False
+
+    def remove(self, name: str) -> bool:
+        """删除之前写入的文件，返回是否删除"""
+        return False
+
+    def for_worker(self) -> Optional["StorageBackend"]:
+        """可以发送到工作进程中直接写入的后端；返回 None 时由主进程写入"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """写入本地目录"""
+
+    def __init__(self, root: Path, log: Callable[[str], None] = print):
+        self.root = Path(root)
+        # 输出警告的函数（删除文件失败等）
+        self.log = log
+        # 已经创建过的目录，写入时不再重复调用 mkdir
+        self._created_dirs = set()
+        # 确保输出目录存在
+        self.ensure_dir(self.root)
+
+    def ensure_dir(self, directory: Path):
+        """创建目录（包括上级目录），已创建过的目录直接跳过"""
+        if directory not in self._created_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(directory)
+
+    def location(self, name: str) -> str:
+        return str(self.root / name)
+
+    def _path(self, name: str) -> Path:
+        path = self.root / name
+        if "/" in name:
+            self.ensure_dir(path.parent)
+        return path
+
+    def write_lines(self, name: str, lines: Iterable[str]):
+        with open(self._path(name), "w", encoding="utf-8") as f:
+            for index, line in enumerate(lines):
+                if index:
+                    f.write("\n")
+                f.write(line)
+
+    def write_bytes(self, name: str, data: bytes):
+        with open(self._path(name), "wb") as f:
+            f.write(data)
+
+    def copy_files(self, pairs: AssetPairs, copier: AssetCopier) -> AssetCopyStats:
+        copier.ensure_dir = self.ensure_dir
+        return copier.copy_files([(source, self.root / name) for source, name in pairs])
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self.root / name, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def exists(self, name: str) -> bool:
+        return (self.root / name).exists()
+
+    def remove(self, name: str) -> bool:
+        path = self.root / name
+        # 只删除输出目录之内的文件（清单可能被修改，包含 ../ 或绝对路径）；
+        # 只解析上级目录，输出文件本身是符号链接时删除链接
+        if not path.parent.resolve().is_relative_to(self.root.resolve()):
+            self.log(f"警告：拒绝删除输出目录之外的文件: {path}")
+            return False
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            self.log(f"删除文件失败 {path}: {e}")
+            return False
+
+    def for_worker(self) -> Optional[StorageBackend]:
+        # 各进程写入不同的文件，可以直接写入同一个目录
+        return self
+
+
+class MemoryStorage(StorageBackend):
+    """保存在内存中（名称 -> 内容），用于测试或把转换结果交给其他程序"""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def read_text(self, name: str) -> str:
+        return self.files[name].decode("utf-8")
+
+    def write_lines(self, name: str, lines: Iterable[str]):
+        data = "\n".join(lines).encode("utf-8")
+        with self._lock:
+            self.files[name] = data
+
+    def write_bytes(self, name: str, data: bytes):
+        with self._lock:
+            self.files[name] = bytes(data)
+
+    def copy_files(self, pairs: AssetPairs, copier: AssetCopier) -> AssetCopyStats:
+        stats = AssetCopyStats()
+        for source, name in pairs:
+            try:
+                data = Path(source).read_bytes()
+            except OSError as e:
+                stats.failed.append((source, str(e)))
+                continue
+            self.write_bytes(name, data)
+            stats.methods["memory"] = stats.methods.get("memory", 0) + 1
+            stats.bytes_copied += len(data)
+        return stats
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        return self.files.get(name)
+
+    def exists(self, name: str) -> bool:
+        return name in self.files
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            return self.files.pop(name, None) is not None
+
+
+class ArchiveStorage(StorageBackend):
+    """写入 zip 或 tar 归档，open 时创建归档文件"""
+
+    def __init__(self, path: Path, archive_format: str):
+        self.path = Path(path)
+        self.archive_format = archive_format
+        self.writer: Optional[ArchiveWriter] = None
+
+    def open(self):
+        if self.writer is None:
+            self.writer = ArchiveWriter(self.path, self.archive_format)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def location(self, name: str) -> str:
+        return f"{self.path}:{name}"
+
+    def write_lines(self, name: str, lines: Iterable[str]):
+        self._writer().write_lines(name, lines)
+
+    def write_bytes(self, name: str, data: bytes):
+        self._writer().write_bytes(name, data)
+
+    def copy_files(self, pairs: AssetPairs, copier: AssetCopier) -> AssetCopyStats:
+        # 归档只能顺序写入
+        stats = AssetCopyStats()
+        writer = self._writer()
+        for source, name in pairs:
+            try:
+                writer.add_file(name, source)
+            except OSError as e:
+                stats.failed.append((source, str(e)))
+                continue
+            stats.methods["archive"] = stats.methods.get("archive", 0) + 1
+            stats.bytes_copied += os.stat(source).st_size
+        return stats
+
+    def _writer(self) -> ArchiveWriter:
+        if self.writer is None:
+            raise ValueError(f"归档尚未打开: {self.path}")
+        return self.writer
+
+
+class NullStorage(StorageBackend):
+    """不保存任何内容，只统计写入量（预览模式，或不包含磁盘 I/O 的基准测试）"""
+
+    def __init__(self, preview: bool = False):
+        self.preview = preview
+        self.files_written = 0
+        self.bytes_written = 0
+
+    def write_lines(self, name: str, lines: Iterable[str]):
+        # 逐行消费（大文件的输出在写入时才格式化），只统计大小
+        size = -1
+        for line in lines:
+            size += len(line.encode("utf-8")) + 1
+        self.write_bytes(name, b"")
+        self.bytes_written += max(size, 0)
+
+    def write_bytes(self, name: str, data: bytes):
+        self.files_written += 1
+        self.bytes_written += len(data)
+
+    def copy_files(self, pairs: AssetPairs, copier: AssetCopier) -> AssetCopyStats:
+        return AssetCopyStats(methods={"null": len(pairs)} if pairs else {})
+
+    def for_worker(self) -> Optional[StorageBackend]:
+        # 预览模式的消息在工作进程中输出；基准测试的统计需要留在主进程中
+        return self if self.preview else None
+
+
+def create_storage(
+    output_dir: Path,
+    dry_run: bool = False,
+    archive_format: Optional[str] = None,
+    log: Callable[[str], None] = print,
+) -> StorageBackend:
+    """根据选项创建存储后端：预览模式、归档文件或本地目录"""
+    if dry_run:
+        return NullStorage(preview=True)
+    if archive_format:
+        return ArchiveStorage(output_dir, archive_format)
+    return LocalStorage(output_dir, log)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+归档输出测试
+验证页面和资源文件直接写入 zip / tar 归档，内容与写入目录时一致
+"""
+
+import io
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import archive_writer
+from src.archive_writer import ArchiveWriter
+from src.converter import ConversionOptions, Converter
+
+
+def read_archive(path: Path) -> dict:
+    """读取归档中所有文件：条目名称 -> 内容"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return {
+                info.filename: archive.read(info)
+                for info in archive.infolist()
+                if not info.is_dir()
+            }
+    with tarfile.open(path) as archive:
+        return {
+            member.name: archive.extractfile(member).read()
+            for member in archive.getmembers()
+            if member.isfile()
+        }
+
+
+class TestArchiveWriter(unittest.TestCase):
+    """ArchiveWriter 测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.asset = self.root / "image.png"
+        self.asset.write_bytes(b"\x89PNG" * 1000)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, archive_format: str) -> Path:
+        path = self.root / "out" / f"vault.{archive_format}"
+        with ArchiveWriter(path, archive_format) as archive:
+            archive.write_lines("a.md", iter(["- 第一行", "- 第二行"]))
+            archive.write_bytes("data.json", b"{}")
+            archive.add_file("attachments/image.png", self.asset)
+        return path
+
+    def test_round_trip(self):
+        """测试各种格式写入后可以读回相同内容"""
+        formats = ["zip", "tar", "tar.gz"]
+        if archive_writer.zstandard is not None:
+            formats.append("tar.zst")
+        for archive_format in formats:
+            with self.subTest(archive_format=archive_format):
+                path = self.write(archive_format)
+                if archive_format == "tar.zst":
+                    continue
+                self.assertEqual(
+                    read_archive(path),
+                    {
+                        "a.md": "- 第一行\n- 第二行".encode("utf-8"),
+                        "data.json": b"{}",
+                        "attachments/image.png": self.asset.read_bytes(),
+                    },
+                )
+
+    def test_compressed_assets_stored(self):
+        """测试已经压缩过的资源文件在 zip 中直接存储"""
+        with zipfile.ZipFile(self.write("zip")) as archive:
+            self.assertEqual(
+                archive.getinfo("attachments/image.png").compress_type,
+                zipfile.ZIP_STORED,
+            )
+            self.assertEqual(
+                archive.getinfo("a.md").compress_type, zipfile.ZIP_DEFLATED
+            )
+
+    @unittest.skipIf(archive_writer.zstandard is not None, "已安装 zstandard")
+    def test_zstd_requires_zstandard(self):
+        """测试没有安装 zstandard 时 tar.zst 给出明确的错误"""
+        with self.assertRaisesRegex(ValueError, "zstandard"):
+            ArchiveWriter(self.root / "vault.tar.zst", "tar.zst")
+
+
+class TestConverterArchive(unittest.TestCase):
+    """转换器归档输出测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.logseq_dir = self.root / "logseq"
+        (self.logseq_dir / "pages").mkdir(parents=True)
+        (self.logseq_dir / "journals").mkdir()
+        (self.logseq_dir / "assets").mkdir()
+        for index in range(12):
+            (self.logseq_dir / "pages" / f"p{index}.md").write_text(
+                f"- 第 {index} 页 [[p{index + 1}]] ![图](../assets/a.png)",
+                encoding="utf-8",
+            )
+        (self.logseq_dir / "journals" / "2024_01_01.md").write_text(
+            "- 日记", encoding="utf-8"
+        )
+        (self.logseq_dir / "assets" / "a.png").write_bytes(b"png")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def convert(self, output: Path, **options) -> Converter:
+        options = ConversionOptions(write_report=False, **options)
+        converter = Converter(self.logseq_dir, output, options)
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(converter.run().success)
+        return converter
+
+    def test_same_content_as_directory(self):
+        """测试归档中的文件与写入目录时一致（串行、并行、大文件模式）"""
+        output_dir = self.root / "vault"
+        self.convert(output_dir)
+        expected = {
+            path.relative_to(output_dir).as_posix(): path.read_bytes()
+            for path in output_dir.rglob("*")
+            if path.is_file()
+        }
+        self.assertIn("attachments/a.png", expected)
+        self.assertIn("Daily Notes/2024-01-01.md", expected)
+
+        cases = {
+            "zip": {},
+            "tar.gz": {"jobs": 2},
+            "tar": {"large_file_threshold": 1},
+        }
+        for archive_format, options in cases.items():
+            with self.subTest(archive_format=archive_format):
+                path = self.root / f"vault.{archive_format}"
+                self.convert(path, archive_format=archive_format, **options)
+                self.assertEqual(read_archive(path), expected)
+
+    def test_dry_run_and_incremental(self):
+        """测试预览模式不创建归档，归档输出不支持增量转换"""
+        path = self.root / "vault.zip"
+        self.convert(path, archive_format="zip", dry_run=True)
+        self.assertFalse(path.exists())
+
+        with self.assertRaises(ValueError):
+            Converter(
+                self.logseq_dir,
+                path,
+                ConversionOptions(archive_format="zip", incremental=True),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+资源复制测试
+验证并行复制、跳过未变化的文件、硬链接，以及克隆和 copy_file_range 不可用时的回退
+"""
+
+import errno
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import asset_copier
+from src.asset_copier import COPY_FILE, COPY_HARDLINK, COPY_SKIPPED, AssetCopier
+from src.converter import ConversionOptions, Converter
+from src.file_manager import FileManager
+
+
+def unsupported(*args, **kwargs):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+class TestAssetCopier(unittest.TestCase):
+    """AssetCopier 测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.source_dir = root / "assets"
+        self.target_dir = root / "attachments"
+        (self.source_dir / "book").mkdir(parents=True)
+        for name, size in (("a.png", 10), ("b.pdf", 300_000), ("book/1_x_1.png", 0)):
+            (self.source_dir / name).write_bytes(os.urandom(size))
+        self.pairs = [
+            (path, self.target_dir / path.relative_to(self.source_dir))
+            for path in sorted(self.source_dir.rglob("*"))
+            if path.is_file()
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_copied(self):
+        for source, target in self.pairs:
+            self.assertEqual(target.read_bytes(), source.read_bytes())
+            self.assertEqual(target.stat().st_mtime_ns, source.stat().st_mtime_ns)
+
+    def test_copy_then_skip(self):
+        """测试复制内容和修改时间，再次复制时全部跳过"""
+        stats = AssetCopier(threads=3).copy_files(self.pairs)
+        self.assertEqual(stats.transferred, 3)
+        self.assertFalse(stats.failed)
+        self.assert_copied()
+
+        stats = AssetCopier(threads=3).copy_files(self.pairs)
+        self.assertEqual(stats.methods, {COPY_SKIPPED: 3})
+        self.assertEqual(stats.bytes_copied, 0)
+
+    def test_changed_source_recopied(self):
+        """测试源文件大小或修改时间变化后重新复制"""
+        AssetCopier().copy_files(self.pairs)
+        source, target = self.pairs[0]
+        source.write_bytes(b"changed")
+        stats = AssetCopier().copy_files(self.pairs)
+        self.assertEqual(stats.skipped, 2)
+        self.assertEqual(target.read_bytes(), b"changed")
+
+    def test_hardlink(self):
+        """测试硬链接模式下目标与源文件是同一个文件"""
+        stats = AssetCopier(hardlink=True).copy_files(self.pairs)
+        self.assertEqual(stats.methods, {COPY_HARDLINK: 3})
+        for source, target in self.pairs:
+            self.assertTrue(os.path.samefile(source, target))
+
+    def test_copy_replaces_hardlink(self):
+        """测试复制模式会把之前的硬链接替换为副本，不修改源文件"""
+        AssetCopier(hardlink=True).copy_files(self.pairs)
+        source, target = self.pairs[0]
+        original = source.read_bytes()
+
+        stats = AssetCopier().copy_files(self.pairs[:1])
+        self.assertEqual(stats.transferred, 1)
+        self.assertFalse(os.path.samefile(source, target))
+        self.assertEqual(source.read_bytes(), original)
+
+    def test_hardlink_fallback(self):
+        """测试不能创建硬链接时回退到复制，同一目录只尝试一次"""
+        copier = AssetCopier(threads=1, hardlink=True)
+        with mock.patch.object(os, "link", side_effect=unsupported) as link:
+            stats = copier.copy_files(self.pairs)
+
+        self.assertNotIn(COPY_HARDLINK, stats.methods)
+        self.assertEqual(link.call_count, 2)
+        self.assert_copied()
+
+    def test_fallback_to_copyfile(self):
+        """测试克隆和 copy_file_range 都不可用时使用 shutil.copyfile"""
+        fcntl = mock.Mock(ioctl=mock.Mock(side_effect=unsupported))
+        with mock.patch.object(asset_copier, "fcntl", fcntl), mock.patch.object(
+            os, "copy_file_range", side_effect=unsupported, create=True
+        ):
+            stats = AssetCopier(threads=1).copy_files(self.pairs)
+
+        self.assertEqual(stats.methods, {COPY_FILE: 3})
+        self.assertEqual(fcntl.ioctl.call_count, 2)
+        self.assert_copied()
+
+    def test_real_errors_not_treated_as_unsupported(self):
+        """测试权限不足等错误记录为失败，不回退也不禁用克隆"""
+
+        def denied(*args, **kwargs):
+            raise OSError(errno.EPERM, "Operation not permitted")
+
+        fcntl = mock.Mock(ioctl=mock.Mock(side_effect=denied))
+        with mock.patch.object(asset_copier, "fcntl", fcntl):
+            stats = AssetCopier(threads=1).copy_files(self.pairs)
+
+        self.assertEqual(len(stats.failed), 3)
+        self.assertEqual(stats.transferred, 0)
+        self.assertEqual(fcntl.ioctl.call_count, 3)
+
+    def test_failures_reported(self):
+        """测试源文件不存在时记录失败，不影响其他文件"""
+        missing = self.source_dir / "missing.png"
+        stats = AssetCopier().copy_files(
+            self.pairs + [(missing, self.target_dir / "missing.png")]
+        )
+        self.assertEqual([source for source, _ in stats.failed], [missing])
+        self.assertEqual(stats.transferred, 3)
+
+
+class TestConverterAssets(unittest.TestCase):
+    """转换器资源复制测试"""
+
+    def test_rerun_skips_assets(self):
+        """测试再次转换时跳过未变化的资源文件"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "logseq" / "pages").mkdir(parents=True)
+            (root / "logseq" / "assets").mkdir()
+            (root / "logseq" / "assets" / "a.png").write_bytes(b"png")
+            options = ConversionOptions(write_report=False)
+
+            for _ in range(2):
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    Converter(root / "logseq", root / "out", options).run()
+
+            self.assertIn("1 个未变化已跳过", output.getvalue())
+            self.assertEqual(
+                (root / "out" / "attachments" / "a.png").read_bytes(), b"png"
+            )
+
+    def test_dry_run_copies_nothing(self):
+        """测试预览模式不复制文件"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "assets").mkdir()
+            (root / "assets" / "a.png").write_bytes(b"png")
+            file_manager = FileManager(root / "out", dry_run=True, log=lambda m: None)
+            targets = file_manager.copy_asset_tree(root / "assets")
+
+            self.assertEqual(targets, [root / "out" / "attachments" / "a.png"])
+            self.assertFalse((root / "out").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+资源去重测试
+验证按内容哈希查找重复的资源文件，重复文件只复制一份，页面引用改为指向保留的文件
+"""
+
+import hashlib
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.asset_copier import file_digest, find_duplicates
+from src.converter import ASSET_MODE_REFERENCED, ConversionOptions, Converter
+
+HIGHLIGHT_UUID = "6470a1b2-0000-4000-8000-000000000001"
+SCREENSHOT = f"book/3_{HIGHLIGHT_UUID}_1690000000000.png"
+
+PAGE_A = f"""- 第一次粘贴 ![image.png](../assets/image_1680000000000_0.png)
+- 第二次粘贴 ![image.png](../assets/image_1680000000001_0.png)
+- 编码的文件名 ![copy](../assets/pasted%20image.png)
+- 大小相同内容不同 ![other](../assets/other.png)
+- 截图的副本 ![shot](../assets/shot.png)
+- 高亮 (({HIGHLIGHT_UUID}))"""
+
+JOURNAL = """- 子文件夹中的页面 ![image.png](../assets/image_1680000000001_0.png)"""
+
+BOOK_EDN = f"""{{:highlights [{{:id #uuid "{HIGHLIGHT_UUID}", :page 3,
+  :position {{:bounding {{:x1 1, :y1 2, :x2 3, :y2 4, :width 5, :height 6}}, :page 3}}}}]}}"""
+
+
+class TestFindDuplicates(unittest.TestCase):
+    """find_duplicates 测试"""
+
+    def test_groups(self):
+        """测试只把内容相同的文件分为一组，组内保持输入顺序"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            contents = {"c.png": b"same", "a.png": b"same", "b.png": b"diff"}
+            contents.update({"d.png": b"same", "e.png": b"longer", "f.png": b""})
+            for name, data in contents.items():
+                (root / name).write_bytes(data)
+            paths = [root / name for name in contents] + [root / "missing.png"]
+
+            for threads in (1, 4):
+                with self.subTest(threads=threads):
+                    groups = find_duplicates(paths, threads=threads)
+                    self.assertEqual(
+                        [[path.name for path in group] for group in groups],
+                        [["c.png", "a.png", "d.png"]],
+                    )
+
+    def test_chunked_digest(self):
+        """测试分块计算的哈希与一次计算一致"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "a.bin"
+            data = bytes(range(256)) * 1000
+            path.write_bytes(data)
+            for chunk_size in (1, 7, 4096, 1 << 20):
+                self.assertEqual(
+                    file_digest(path, chunk_size), hashlib.sha256(data).hexdigest()
+                )
+
+
+class TestConverterDedupe(unittest.TestCase):
+    """转换器资源去重测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.logseq_dir = self.root / "logseq"
+        pages = self.logseq_dir / "pages"
+        pages.mkdir(parents=True)
+        (pages / "a.md").write_text(PAGE_A, encoding="utf-8")
+        (self.logseq_dir / "journals").mkdir()
+        (self.logseq_dir / "journals" / "2024_01_01.md").write_text(
+            JOURNAL, encoding="utf-8"
+        )
+
+        assets = self.logseq_dir / "assets"
+        (assets / "book").mkdir(parents=True)
+        (assets / "book.edn").write_text(BOOK_EDN, encoding="utf-8")
+        (assets / "book.pdf").write_bytes(b"pdf")
+        for name in (
+            "image_1680000000000_0.png",
+            "image_1680000000001_0.png",
+            "pasted image.png",
+        ):
+            (assets / name).write_bytes(b"image")
+        (assets / "other.png").write_bytes(b"IMAGE")
+        (assets / SCREENSHOT).write_bytes(b"screenshot")
+        (assets / "shot.png").write_bytes(b"screenshot")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def convert(self, name="out", **options):
+        output_dir = self.root / name
+        options = ConversionOptions(write_report=False, **options)
+        with redirect_stdout(io.StringIO()):
+            result = Converter(self.logseq_dir, output_dir, options).run()
+        self.assertTrue(result.success)
+        attachments = output_dir / "attachments"
+        copied = sorted(
+            path.relative_to(attachments).as_posix()
+            for path in attachments.rglob("*")
+            if path.is_file()
+        )
+        return result, copied, (output_dir / "a.md").read_text(encoding="utf-8")
+
+    def test_duplicates_copied_once(self):
+        """测试重复文件只复制一份，引用改为指向保留的文件"""
+        for asset_mode in ("all", ASSET_MODE_REFERENCED):
+            with self.subTest(asset_mode=asset_mode):
+                _, copied, page = self.convert(
+                    asset_mode, asset_mode=asset_mode, dedupe_assets=True
+                )
+                self.assertNotIn("image_1680000000001_0.png", copied)
+                self.assertNotIn("pasted image.png", copied)
+                self.assertNotIn("shot.png", copied)
+                self.assertIn("other.png", copied)
+                self.assertIn(SCREENSHOT, copied)
+
+                self.assertEqual(
+                    page.count("![image.png](attachments/image_1680000000000_0.png)"),
+                    2,
+                )
+                self.assertIn("![copy](attachments/image_1680000000000_0.png)", page)
+                self.assertIn("![other](attachments/other.png)", page)
+                # PDF 高亮截图总是保留，其他副本指向截图
+                self.assertIn(f"![shot](attachments/{SCREENSHOT})", page)
+
+                journal = self.root / asset_mode / "Daily Notes" / "2024-01-01.md"
+                self.assertIn(
+                    "(../attachments/image_1680000000000_0.png)",
+                    journal.read_text("utf-8"),
+                )
+
+    def test_incremental_reconverts_changed_aliases(self):
+        """测试增量转换中启用去重后，引用了重复文件的页面重新转换"""
+        result, _, _ = self.convert(incremental=True)
+        self.assertEqual(result.skipped, 0)
+        result, _, page = self.convert(incremental=True, dedupe_assets=True)
+        self.assertEqual(result.skipped, 0)
+        self.assertNotIn("image_1680000000001_0.png", page)
+        result, _, _ = self.convert(incremental=True, dedupe_assets=True)
+        self.assertEqual(result.skipped, 2)
+
+    def test_without_dedupe_unchanged(self):
+        """测试未启用去重时复制所有文件，引用保持不变"""
+        _, copied, page = self.convert()
+        self.assertIn("image_1680000000001_0.png", copied)
+        self.assertIn("![image.png](attachments/image_1680000000001_0.png)", page)
+
+
+if __name__ == "__main__":
+    unittest.main()
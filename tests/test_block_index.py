@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+块索引测试
+验证全局块 UUID 索引：定义位置、重复定义、没有定义的块引用，以及校验模式不写入文件
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main
+from src.block_index import BlockIndex, scan_block_uuids
+from src.conversion_pipeline import LARGE_FILE_SYNTAX_PATTERN
+from src.converter import ConversionOptions, Converter
+from src.logseq_parser import MappedFile
+from src.obsidian_formatter import ObsidianFormatter
+
+PAGE_A = """title:: A
+
+- 第一块
+  id:: 6470a1b2-0000-4000-8000-000000000001
+- 引用 ((6470a1b2-0000-4000-8000-000000000002))
+\t- 重复定义
+\t  id:: 6470a1b2-0000-4000-8000-000000000003"""
+
+PAGE_B = """- 第二块 ((6470a1b2-0000-4000-8000-000000000001))
+  id:: 6470a1b2-0000-4000-8000-000000000002
+- 同一 UUID 再次定义
+  id:: 6470a1b2-0000-4000-8000-000000000003
+- 悬空引用 ((6470a1b2-0000-4000-8000-00000000dead)) ((6470a1b2-0000-4000-8000-00000000dead))"""
+
+UUID = "6470a1b2-0000-4000-8000-00000000000{}".format
+DEAD = "6470a1b2-0000-4000-8000-00000000dead"
+
+
+class TestScanBlockUuids(unittest.TestCase):
+    """scan_block_uuids 测试"""
+
+    def test_locations(self):
+        """测试定义和引用的行号"""
+        definitions, references = scan_block_uuids(PAGE_A)
+        self.assertEqual(definitions, [(UUID(1), 4), (UUID(3), 7)])
+        self.assertEqual(references, [(UUID(2), 5)])
+
+        definitions, _ = scan_block_uuids("id:: x\n", first_line_number=10)
+        self.assertEqual(definitions, [("x", 10)])
+
+    def test_matches_formatter_extraction(self):
+        """测试与格式化器逐行提取的 UUID 一致"""
+        formatter = ObsidianFormatter()
+        samples = [PAGE_A, PAGE_B, "id::  x\n  \n id:: y", "a id:: z\n((a))((b))"]
+        for text in samples:
+            with self.subTest(text=text):
+                definitions, references = scan_block_uuids(text)
+                parsed_data = {"content": text}
+                self.assertEqual(
+                    [uuid for uuid, _ in definitions],
+                    formatter.extract_defined_uuids(parsed_data),
+                )
+                self.assertEqual(
+                    [uuid for uuid, _ in references],
+                    formatter.extract_referenced_uuids(parsed_data),
+                )
+
+
+class TestBlockIndex(unittest.TestCase):
+    """BlockIndex 测试"""
+
+    def setUp(self):
+        self.index = BlockIndex()
+        for page, text in (("pages/a.md", PAGE_A), ("pages/b.md", PAGE_B)):
+            self.index.add_page(page, *scan_block_uuids(text))
+
+    def test_duplicates_last_wins(self):
+        """测试重复定义记录所有位置，且与格式化器一致以最后一次定义为准"""
+        self.assertEqual(
+            [str(location) for location in self.index.duplicates[UUID(3)]],
+            ["pages/a.md:7", "pages/b.md:4"],
+        )
+        self.assertEqual(self.index.lookup(UUID(3)).page, "pages/b.md")
+        self.assertEqual(len(self.index), 3)
+
+    def test_dangling_references(self):
+        """测试没有定义的块引用，以及可以解析的 UUID 不算悬空"""
+        dangling = self.index.dangling_references()
+        self.assertEqual(list(dangling), [DEAD])
+        self.assertEqual(len(dangling[DEAD]), 2)
+        self.assertEqual(self.index.dangling_references([DEAD]), {})
+
+    def test_lookup_with_block_ids(self):
+        """测试查询结果带有格式化器分配的输出块 ID"""
+        self.index.attach_block_ids({UUID(1): ("a.md", "block1")})
+        entry = self.index.lookup(UUID(1))
+        self.assertEqual((entry.page, entry.line), ("pages/a.md", 4))
+        self.assertEqual((entry.output_filename, entry.block_id), ("a.md", "block1"))
+        self.assertIsNone(self.index.lookup(UUID(2)).block_id)
+        self.assertIsNone(self.index.lookup(DEAD))
+        self.assertNotIn(DEAD, self.index)
+
+    def test_report(self):
+        """测试校验报告"""
+        report = self.index.report()
+        self.assertEqual(report["defined"], 3)
+        self.assertEqual(report["referenced"], 3)
+        self.assertEqual(list(report["duplicates"]), [UUID(3)])
+        self.assertEqual(report["dangling"], {DEAD: ["pages/b.md:5", "pages/b.md:5"]})
+
+
+class TestNumberedMatchingLines(unittest.TestCase):
+    """MappedFile.iter_numbered_matching_lines 测试"""
+
+    def test_line_numbers(self):
+        """测试跨分块的行号与逐行编号一致"""
+        text = (PAGE_A + "\n" + "- 普通行\n" * 50 + PAGE_B + "\n") * 5
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "page.md"
+            path.write_text(text, encoding="utf-8")
+            with MappedFile(path, chunk_size=64) as mapped:
+                numbered = list(
+                    mapped.iter_numbered_matching_lines(LARGE_FILE_SYNTAX_PATTERN)
+                )
+
+        expected = [
+            (number, line)
+            for number, line in enumerate(text.split("\n"), start=1)
+            if LARGE_FILE_SYNTAX_PATTERN.search(line.encode("utf-8"))
+        ]
+        self.assertEqual(numbered, expected)
+
+
+class TestValidate(unittest.TestCase):
+    """校验模式测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.logseq_dir = root / "logseq"
+        self.output_dir = root / "obsidian"
+        (self.logseq_dir / "pages").mkdir(parents=True)
+        (self.logseq_dir / "pages" / "a.md").write_text(PAGE_A, encoding="utf-8")
+        (self.logseq_dir / "pages" / "b.md").write_text(PAGE_B, encoding="utf-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_validate_writes_nothing(self):
+        """测试只构建索引，不写入任何文件"""
+        converter = Converter(self.logseq_dir, self.output_dir)
+        report = converter.validate()
+
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+        self.assertEqual(list(report["duplicates"]), [UUID(3)])
+        self.assertEqual(list(report["dangling"]), [DEAD])
+        self.assertEqual(converter.block_index.lookup(UUID(1)).block_id, "block1")
+
+    def test_large_file_mode_same_report(self):
+        """测试大文件模式的报告（包括行号）与普通模式一致"""
+        normal = Converter(self.logseq_dir, self.output_dir).validate()
+        large = Converter(
+            self.logseq_dir, self.output_dir, ConversionOptions(large_file_threshold=1)
+        ).validate()
+        self.assertEqual(large, normal)
+
+    def test_run_reports_validation(self):
+        """测试完整转换的结果中带有校验报告"""
+        result = Converter(
+            self.logseq_dir,
+            self.output_dir,
+            ConversionOptions(copy_assets=False, write_report=False),
+        ).run()
+        self.assertTrue(result.success)
+        self.assertEqual(list(result.validation["dangling"]), [DEAD])
+
+    def test_cli_exit_code(self):
+        """测试 --validate 发现问题时以退出码 1 结束"""
+        argv = ["logseq2obsidian", str(self.logseq_dir), str(self.output_dir)]
+        output = io.StringIO()
+        with mock.patch.object(sys, "argv", argv + ["--validate"]), redirect_stdout(
+            output
+        ), self.assertRaises(SystemExit) as context:
+            main.main()
+
+        self.assertEqual(context.exception.code, 1)
+        self.assertIn(DEAD, output.getvalue())
+        self.assertFalse(self.output_dir.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+块表测试
+验证按列存储的 BlockTable 与逐个构建的 LogseqBlock 列表一致
+"""
+
+import pickle
+import sys
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.logseq_parser import (
+    BlockTable,
+    LogseqBlock,
+    LogseqMetaProperty,
+    LogseqParser,
+    LogseqReference,
+)
+
+CONTENT = """title:: 示例
+
+- 第一块 [[页面A]]
+  id:: 6470a1b2-0000-4000-8000-000000000001
+\t- 制表符缩进 ((uuid-1))
+- 中文块 id:: 6470a1b2-0000-4000-8000-000000000002
+普通行
+    - 深层块"""
+
+
+class TestBlockTable(unittest.TestCase):
+    """BlockTable 测试"""
+
+    def setUp(self):
+        self.parser = LogseqParser()
+        self.blocks = self.parser.parse_content(CONTENT)["blocks"]
+        self.expected = list(self.parser.iter_blocks(CONTENT))
+
+    def test_matches_iter_blocks(self):
+        """测试与 iter_blocks 的结果一致"""
+        self.assertIsInstance(self.blocks, BlockTable)
+        self.assertEqual(len(self.blocks), len(self.expected))
+        self.assertEqual(list(self.blocks), self.expected)
+        self.assertEqual(self.blocks, self.expected)
+        self.assertEqual(
+            self.blocks[3].block_id, "6470a1b2-0000-4000-8000-000000000002"
+        )
+        self.assertEqual(self.blocks[2].level, 1)
+
+    def test_indexing(self):
+        """测试负数下标、切片和越界"""
+        self.assertEqual(self.blocks[-1], self.expected[-1])
+        self.assertEqual(self.blocks[1:3], self.expected[1:3])
+        self.assertEqual(self.blocks[::-1], self.expected[::-1])
+        with self.assertRaises(IndexError):
+            self.blocks[len(self.expected)]
+
+    def test_empty_table(self):
+        """测试没有块的内容"""
+        blocks = self.parser.parse_content("title:: 只有属性")["blocks"]
+        self.assertEqual(len(blocks), 0)
+        self.assertEqual(blocks, [])
+
+    def test_pickle(self):
+        """测试可以序列化，供多进程转换传递"""
+        self.assertEqual(pickle.loads(pickle.dumps(self.blocks)), self.expected)
+
+
+class TestSlottedRecords(unittest.TestCase):
+    """slots 数据类测试"""
+
+    def test_no_instance_dict(self):
+        """测试记录没有 __dict__"""
+        records = [
+            LogseqBlock(content="- a"),
+            LogseqReference(type="page_link", target="a"),
+            LogseqMetaProperty(key="title", value="a", raw_value="a", line_number=0),
+        ]
+        for record in records:
+            with self.subTest(record=type(record).__name__):
+                self.assertFalse(hasattr(record, "__dict__"))
+
+
+if __name__ == "__main__":
+    unittest.main()
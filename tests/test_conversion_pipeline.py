@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+转换流水线测试
+验证每个文件只解析一次，且输出与逐阶段重新解析的结果一致
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.conversion_pipeline import ConversionPipeline
+from src.file_manager import FileManager
+from src.logseq_parser import LogseqParser
+from src.obsidian_formatter import ObsidianFormatter
+
+
+class CountingParser(LogseqParser):
+    """记录 parse_file 调用次数的解析器"""
+
+    def __init__(self):
+        super().__init__()
+        self.parse_counts = {}
+
+    def parse_file(self, file_path):
+        self.parse_counts[file_path] = self.parse_counts.get(file_path, 0) + 1
+        return super().parse_file(file_path)
+
+
+class TestConversionPipeline(unittest.TestCase):
+    """转换流水线测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.logseq_dir = Path(self.temp_dir.name) / "logseq"
+        pages_dir = self.logseq_dir / "pages"
+        journals_dir = self.logseq_dir / "journals"
+        pages_dir.mkdir(parents=True)
+        journals_dir.mkdir(parents=True)
+
+        (pages_dir / "source.md").write_text(
+            "- 被引用的块\n  id:: 11111111-aaaa\n- 没有被引用的块\n  id:: 22222222-bbbb\n",
+            encoding="utf-8",
+        )
+        (pages_dir / "wiki page.md").write_text(
+            "- #wiki\n- 引用 ((11111111-aaaa))\n- {{embed ((11111111-aaaa))}}\n",
+            encoding="utf-8",
+        )
+        (journals_dir / "2024_01_02.md").write_text(
+            "- 日记 [[source]] ![img](../assets/a.png)\n", encoding="utf-8"
+        )
+
+        self.md_files = FileManager(
+            Path(self.temp_dir.name) / "out", dry_run=True
+        ).list_logseq_files(self.logseq_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _make_formatter(self):
+        return ObsidianFormatter(category_tag="wiki", category_folder="wiki")
+
+    def test_each_file_parsed_once(self):
+        """测试每个文件只被解析一次"""
+        parser = CountingParser()
+        pipeline = ConversionPipeline(self.logseq_dir, self._make_formatter(), parser)
+
+        pipeline.load(self.md_files)
+        pipeline.build_indexes()
+        tasks = list(pipeline.iter_formatted())
+
+        self.assertEqual(len(tasks), 3)
+        self.assertTrue(all(task.success for task in tasks))
+        self.assertEqual(set(parser.parse_counts), set(self.md_files))
+        self.assertTrue(all(count == 1 for count in parser.parse_counts.values()))
+
+    def test_output_matches_three_pass_conversion(self):
+        """测试输出与三次解析的旧流程一致"""
+        parser = LogseqParser()
+        legacy = self._make_formatter()
+        for md_file in self.md_files:
+            legacy.collect_referenced_uuids(parser.parse_file(md_file))
+        legacy.collect_pdf_highlights(str(self.logseq_dir))
+        for md_file in self.md_files:
+            legacy.collect_block_mappings(
+                legacy.generate_filename(md_file.stem), parser.parse_file(md_file)
+            )
+
+        pipeline = ConversionPipeline(self.logseq_dir, self._make_formatter())
+        pipeline.load(self.md_files)
+        pipeline.build_indexes()
+
+        for task in pipeline.iter_formatted():
+            parsed_data = parser.parse_file(task.source_path)
+            expected = legacy.format_content(
+                parsed_data, task.output_filename, task.subfolder
+            )
+            self.assertEqual(task.content, expected)
+
+    def test_subfolder_resolution(self):
+        """测试日记和分类页面的子文件夹"""
+        pipeline = ConversionPipeline(self.logseq_dir, self._make_formatter())
+        pipeline.load(self.md_files)
+        pipeline.build_indexes()
+
+        subfolders = {
+            task.source_path.name: task.subfolder for task in pipeline.iter_formatted()
+        }
+        self.assertEqual(subfolders["2024_01_02.md"], "Daily Notes")
+        self.assertEqual(subfolders["wiki page.md"], "Wiki")
+        self.assertEqual(subfolders["source.md"], "")
+
+    def test_parsed_data_released_after_formatting(self):
+        """测试格式化后释放解析数据"""
+        pipeline = ConversionPipeline(self.logseq_dir, self._make_formatter())
+        pipeline.load(self.md_files)
+        pipeline.build_indexes()
+
+        for task in pipeline.iter_formatted():
+            self.assertIsNone(task.parsed_data)
+            self.assertIsNotNone(task.summary)
+
+    def test_unreadable_file_reported(self):
+        """测试解析失败的文件会被记录为失败任务"""
+        missing = self.logseq_dir / "pages" / "missing.md"
+        pipeline = ConversionPipeline(self.logseq_dir, self._make_formatter())
+        pipeline.load(self.md_files + [missing])
+        pipeline.build_indexes()
+
+        tasks = list(pipeline.iter_formatted())
+        failed = [task for task in tasks if not task.success]
+        self.assertEqual(len(tasks), 4)
+        self.assertEqual([task.source_path for task in failed], [missing])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+转换引擎测试
+测试 Converter API 和命令行入口的完整转换流程
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import main as main_module
+from src.converter import ConversionOptions, Converter
+
+
+class TestConverter(unittest.TestCase):
+    """Converter 测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.logseq_dir = root / "logseq"
+        self.output_dir = root / "obsidian"
+
+        pages_dir = self.logseq_dir / "pages"
+        journals_dir = self.logseq_dir / "journals"
+        assets_dir = self.logseq_dir / "assets"
+        pages_dir.mkdir(parents=True)
+        journals_dir.mkdir(parents=True)
+        (assets_dir / "book").mkdir(parents=True)
+
+        (pages_dir / "note%3A one.md").write_text(
+            "- 被引用的块\n  id:: 11111111-aaaa\n- ![img](../assets/a.png)\n",
+            encoding="utf-8",
+        )
+        (pages_dir / "wiki.md").write_text(
+            "- #wiki\n- 引用 ((11111111-aaaa))\n", encoding="utf-8"
+        )
+        (journals_dir / "2024_01_02.md").write_text(
+            "- 日记 [[note: one]]\n", encoding="utf-8"
+        )
+        (assets_dir / "a.png").write_bytes(b"png")
+        (assets_dir / "book" / "1_uuid_0.png").write_bytes(b"shot")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_full_conversion(self):
+        """测试完整转换：页面、日记、分类、资源和报告"""
+        options = ConversionOptions(category_tag="wiki", category_folder="wiki")
+        result = Converter(self.logseq_dir, self.output_dir, options).run()
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.total, 3)
+
+        self.assertTrue((self.output_dir / "note_ one.md").exists())
+        self.assertTrue((self.output_dir / "Daily Notes" / "2024-01-02.md").exists())
+        wiki_content = (self.output_dir / "Wiki" / "wiki.md").read_text(
+            encoding="utf-8"
+        )
+        self.assertIn("![[note_ one#^block1]]", wiki_content)
+
+        self.assertEqual(
+            (self.output_dir / "attachments" / "a.png").read_bytes(), b"png"
+        )
+        self.assertTrue(
+            (self.output_dir / "attachments" / "book" / "1_uuid_0.png").exists()
+        )
+        self.assertTrue((self.output_dir / "conversion_report.md").exists())
+
+    def test_stage_timings_recorded(self):
+        """测试记录各阶段耗时"""
+        result = Converter(self.logseq_dir, self.output_dir).run()
+
+        for stage in ["discover", "parse", "index", "format", "write", "assets"]:
+            self.assertIn(stage, result.timings)
+            self.assertGreaterEqual(result.timings[stage], 0.0)
+
+        report = (self.output_dir / "conversion_report.md").read_text(encoding="utf-8")
+        self.assertIn("## 阶段耗时", report)
+
+    def test_dry_run_writes_nothing(self):
+        """测试预览模式不写入任何文件"""
+        options = ConversionOptions(dry_run=True)
+        result = Converter(self.logseq_dir, self.output_dir, options).run()
+
+        self.assertTrue(result.success)
+        self.assertFalse(self.output_dir.exists())
+
+    def test_parallel_output_identical_to_serial(self):
+        """测试并行模式的输出与串行模式逐字节一致"""
+        root = Path(self.temp_dir.name)
+        options = dict(category_tag="wiki", category_folder="wiki", write_report=False)
+
+        serial_dir = root / "serial"
+        Converter(self.logseq_dir, serial_dir, ConversionOptions(**options)).run()
+
+        parallel_dir = root / "parallel"
+        result = Converter(
+            self.logseq_dir, parallel_dir, ConversionOptions(jobs=2, **options)
+        ).run()
+
+        self.assertTrue(result.success)
+        self.assertIn("format+write", result.timings)
+        self.assertEqual(
+            [c["source_file"] for c in result.conversions],
+            sorted(c["source_file"] for c in result.conversions),
+        )
+
+        serial_files = sorted(
+            p.relative_to(serial_dir) for p in serial_dir.rglob("*") if p.is_file()
+        )
+        parallel_files = sorted(
+            p.relative_to(parallel_dir) for p in parallel_dir.rglob("*") if p.is_file()
+        )
+        self.assertEqual(serial_files, parallel_files)
+        for relative in serial_files:
+            self.assertEqual(
+                (serial_dir / relative).read_bytes(),
+                (parallel_dir / relative).read_bytes(),
+                f"{relative} 并行输出与串行输出不一致",
+            )
+
+    def test_invalid_jobs(self):
+        """测试非法的进程数"""
+        with self.assertRaises(ValueError):
+            Converter(self.logseq_dir, self.output_dir, ConversionOptions(jobs=0))
+
+    def test_category_options_must_be_paired(self):
+        """测试分类选项必须成对出现"""
+        with self.assertRaises(ValueError):
+            Converter(
+                self.logseq_dir, self.output_dir, ConversionOptions(category_tag="wiki")
+            )
+
+    def test_cli_entry_point(self):
+        """测试命令行入口执行真实转换"""
+        argv = [
+            "logseq2obsidian",
+            str(self.logseq_dir),
+            str(self.output_dir),
+            "--no-assets",
+            "--profile",
+        ]
+        with mock.patch.object(sys, "argv", argv):
+            main_module.main()
+
+        self.assertTrue((self.output_dir / "wiki.md").exists())
+        self.assertFalse((self.output_dir / "attachments").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+EDN 高亮解析测试
+验证流式 EdnReader 对 Logseq PDF 高亮 .edn 文件的解析
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.obsidian_formatter import EdnReader, ObsidianFormatter
+
+SAMPLE_EDN = """{:highlights
+ [{:id #uuid "6470a1b2-0000-4000-8000-000000000001",
+   :page 3,
+   :position {:bounding {:x1 100.5, :y1 200, :x2 300, :y2 220.25, :width 612, :height 792},
+              :rects ({:x1 100.5, :y1 200, :x2 300, :y2 220.25, :width 612, :height 792}),
+              :page 3},
+   :content {:text "引号 \\" 和 } 括号 ; 不是注释"},
+   :properties {:color "yellow"}}
+  ; 行注释
+  #_ {:id #uuid "discarded"}
+  {:id #uuid "6470a1b2-0000-4000-8000-000000000002",
+   :page 12,
+   :position {:bounding {:x1 1, :y1 2, :x2 3, :y2 4, :width 5, :height 6}, :rects (), :page 12},
+   :content {:image 1690000000000},
+   :properties {:color "red", :hl-type :area}}
+  {:id #uuid "6470a1b2-0000-4000-8000-000000000003", :page 1, :content {:text "没有坐标"}}],
+ :extra {:page 12}}
+"""
+
+
+def read_all(text, chunk_size):
+    return list(EdnReader(io.StringIO(text), chunk_size).iter_highlights())
+
+
+class TestEdnReader(unittest.TestCase):
+    """EdnReader 测试"""
+
+    def test_records(self):
+        """测试提取 id、page 和坐标，跳过缺少坐标的记录"""
+        records = read_all(SAMPLE_EDN, 1 << 20)
+
+        self.assertEqual(
+            [r["id"] for r in records],
+            [
+                "6470a1b2-0000-4000-8000-000000000001",
+                "6470a1b2-0000-4000-8000-000000000002",
+            ],
+        )
+        self.assertEqual(records[0]["page"], "3")
+        self.assertEqual(
+            records[0]["coordinates"],
+            {
+                "x1": 100.5,
+                "y1": 200.0,
+                "x2": 300.0,
+                "y2": 220.25,
+                "width": 612.0,
+                "height": 792.0,
+            },
+        )
+
+    def test_chunk_boundaries(self):
+        """测试词法单元跨越读取块边界时结果不变"""
+        expected = read_all(SAMPLE_EDN, 1 << 20)
+        for chunk_size in (1, 2, 3, 7, 64):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(read_all(SAMPLE_EDN, chunk_size), expected)
+
+    def test_other_layouts(self):
+        """测试键顺序不同、字符串中含有键名、嵌套较深的记录"""
+        text = (
+            '{:highlights [{:content {:text ":page 99 :bounding {:x1 0}"}, '
+            ":position {:page 4, :bounding {:height 6 :width 5 :y2 4 :x2 3 :y1 2 :x1 1}, "
+            ':rects ([[[[[[[[{:x1 0}]]]]]]]])}, :page 4, :id #uuid "deep"}'
+            ' {:id #uuid "no-page", :position {:bounding {:x1 1}}}]}'
+        )
+        for chunk_size in (5, 1 << 20):
+            with self.subTest(chunk_size=chunk_size):
+                records = read_all(text, chunk_size)
+                self.assertEqual([r["id"] for r in records], ["deep"])
+                self.assertEqual(records[0]["page"], "4")
+                self.assertEqual(records[0]["coordinates"]["x1"], 1.0)
+                self.assertEqual(records[0]["coordinates"]["height"], 6.0)
+
+    def test_malformed_input(self):
+        """测试格式错误时抛出 ValueError，且不会读到文件末尾之后"""
+        malformed = [
+            '{:highlights [{:id #uuid "a", :page 1',
+            '{:highlights [{:id "unterminated}]}',
+            "{:highlights [)]}",
+        ]
+        for text in malformed:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    read_all(text, 4)
+
+    def test_records_before_error_are_kept(self):
+        """测试格式错误之前的记录仍然会被产出"""
+        text = SAMPLE_EDN.replace(":extra {:page 12}}", ":extra {:page")
+        reader = EdnReader(io.StringIO(text), 16).iter_highlights()
+        self.assertEqual(len([next(reader), next(reader)]), 2)
+        with self.assertRaises(ValueError):
+            next(reader)
+
+
+class TestCollectEdnHighlights(unittest.TestCase):
+    """ObsidianFormatter 收集 .edn 高亮测试"""
+
+    def test_collect_with_screenshot(self):
+        """测试收集坐标和截图路径，格式错误的文件被跳过"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            assets_dir = Path(temp_dir) / "assets"
+            screenshot_dir = assets_dir / "book"
+            screenshot_dir.mkdir(parents=True)
+            (assets_dir / "book.edn").write_text(SAMPLE_EDN, encoding="utf-8")
+            (assets_dir / "broken.edn").write_text("{:highlights [", encoding="utf-8")
+            (
+                screenshot_dir / "12_6470a1b2-0000-4000-8000-000000000002_1.png"
+            ).write_bytes(b"")
+
+            formatter = ObsidianFormatter()
+            formatter.collect_pdf_highlights(temp_dir)
+
+        self.assertEqual(len(formatter.pdf_highlight_map), 2)
+        highlight = formatter.pdf_highlight_map["6470a1b2-0000-4000-8000-000000000002"]
+        self.assertEqual(highlight["pdf_path"], "../attachments/book.pdf")
+        self.assertEqual(highlight["page"], "12")
+        self.assertEqual(
+            highlight["screenshot_path"],
+            "attachments/book/12_6470a1b2-0000-4000-8000-000000000002_1.png",
+        )
+
+
+class TestIndexScreenshots(unittest.TestCase):
+    """截图目录索引测试"""
+
+    def test_matches_glob(self):
+        """测试索引查找与逐条 glob 的结果一致"""
+        names = [
+            "3_aaaa_1.png",
+            "3_aaaa_2_extra.png",
+            "3_aaaa_.png",
+            "12_bbbb_1690000000000.png",
+            "12_bb_bb_1.png",
+            "3_cccc_1.jpg",
+            "3_cccc.png",
+            "4_aaaa_1.png",
+        ]
+        queries = [
+            ("3", "aaaa"),
+            ("12", "bbbb"),
+            ("12", "bb"),
+            ("12", "bb_bb"),
+            ("3", "cccc"),
+            ("4", "aaaa"),
+            ("5", "aaaa"),
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            screenshot_dir = Path(temp_dir)
+            for name in names:
+                (screenshot_dir / name).write_bytes(b"")
+            (screenshot_dir / "7_dddd_dir.png").mkdir()
+
+            index = ObsidianFormatter._index_screenshots(screenshot_dir)
+            for page, uuid in queries + [("7", "dddd")]:
+                with self.subTest(page=page, uuid=uuid):
+                    matches = [
+                        p.name for p in screenshot_dir.glob(f"{page}_{uuid}_*.png")
+                    ]
+                    self.assertEqual(index.get((page, uuid)), next(iter(matches), None))
+
+    def test_missing_directory(self):
+        """测试截图目录不存在时返回空索引"""
+        self.assertEqual(ObsidianFormatter._index_screenshots(Path("/nonexistent")), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
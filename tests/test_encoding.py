@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+文件编码处理测试
+验证含有无效 UTF-8 字节的文件只读取一次，并在解析结果中报告错误位置
+"""
+
+import builtins
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.logseq_parser import LogseqParser, decode_utf8
+
+
+class TestDecodeUtf8(unittest.TestCase):
+    """decode_utf8 测试"""
+
+    def test_valid_utf8(self):
+        """测试合法的 UTF-8 没有错误"""
+        self.assertEqual(
+            decode_utf8("- 中文 [[页面]]".encode("utf-8")), ("- 中文 [[页面]]", [])
+        )
+
+    def test_matches_replace(self):
+        """测试解码结果与 errors="replace" 一致，并记录字节区间"""
+        samples = [
+            b"- a\xffb\n",
+            b"\xe4\xb8- \xe4\xb8\xad\xff\xfe",
+            b"\xf0\x9f\x98",
+            b"\xc3\xa9\xed\xa0\x80x",
+        ]
+        for raw in samples:
+            with self.subTest(raw=raw):
+                content, spans = decode_utf8(raw)
+                self.assertEqual(content, raw.decode("utf-8", errors="replace"))
+                self.assertEqual(len(spans), content.count("�"))
+
+        self.assertEqual(decode_utf8(b"- a\xffb\xfe")[1], [(3, 4), (5, 6)])
+
+
+class TestParseFileEncoding(unittest.TestCase):
+    """parse_file 编码错误报告测试"""
+
+    def test_single_read_and_offsets(self):
+        """测试含无效字节的文件只打开一次，错误数量和位置写入解析结果"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "bad.md"
+            path.write_bytes(b"- ok\n- bad\xff [[link]]\xfe\n")
+
+            with mock.patch("builtins.open", wraps=builtins.open) as opened:
+                result = LogseqParser().parse_file(path)
+
+        self.assertEqual(opened.call_count, 1)
+        self.assertTrue(result["has_encoding_errors"])
+        self.assertEqual(result["encoding_error_count"], 2)
+        self.assertEqual(result["encoding_error_offsets"], [(10, 11), (20, 21)])
+        self.assertEqual(result["page_links"][0].target, "link")
+
+    def test_clean_file(self):
+        """测试正常文件没有编码错误"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "good.md"
+            path.write_text("- 正常\n", encoding="utf-8")
+            result = LogseqParser().parse_file(path)
+
+        self.assertFalse(result["has_encoding_errors"])
+        self.assertEqual(result["encoding_error_count"], 0)
+        self.assertEqual(result["encoding_error_offsets"], [])
+
+    def test_unreadable_file(self):
+        """测试无法读取的文件抛出 ValueError"""
+        with self.assertRaises(ValueError):
+            LogseqParser().parse_file(Path("/nonexistent/missing.md"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+格式化上下文测试
+验证页面相关状态通过 FormatContext 传递，同一个格式化器可以被多个线程同时使用
+"""
+
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.obsidian_formatter import FormatContext, ObsidianFormatter
+
+
+class TestFormatContext(unittest.TestCase):
+    """FormatContext 测试"""
+
+    def setUp(self):
+        self.formatter = ObsidianFormatter()
+        self.formatter.block_uuid_map = {"uuid-a": ("page_a.md", "block1")}
+        self.formatter.pdf_highlight_map = {
+            "uuid-pdf": {
+                "pdf_path": "../assets/book.pdf",
+                "page": "",
+                "text": "",
+                "color": "",
+                "coordinates": None,
+                "screenshot_path": None,
+            }
+        }
+
+    def test_formatter_has_no_per_page_state(self):
+        """测试格式化后格式化器上不保留当前页面状态"""
+        self.formatter.format_content(
+            {"content": "((uuid-a))", "meta_properties": []}, "page_a.md", "Wiki"
+        )
+        self.assertFalse(hasattr(self.formatter, "current_filename"))
+        self.assertFalse(hasattr(self.formatter, "current_target_folder"))
+
+    def test_block_ref_uses_context_filename(self):
+        """测试块引用根据上下文中的文件名区分同文件和跨文件"""
+        line = "见 ((uuid-a))"
+        same_file = self.formatter._convert_block_refs(
+            line, FormatContext(filename="page_a.md")
+        )
+        other_file = self.formatter._convert_block_refs(
+            line, FormatContext(filename="page_b.md")
+        )
+        self.assertEqual(same_file, "见 ![[#^block1]]")
+        self.assertEqual(other_file, "见 ![[page_a#^block1]]")
+
+    def test_asset_path_uses_context_folder(self):
+        """测试资源路径根据上下文中的目标文件夹计算"""
+        line = "![img](../assets/a.png)"
+        self.assertEqual(
+            self.formatter._convert_asset_paths(line, FormatContext()),
+            "![img](attachments/a.png)",
+        )
+        self.assertEqual(
+            self.formatter._convert_asset_paths(
+                line, FormatContext(target_folder="Wiki")
+            ),
+            "![img](../attachments/a.png)",
+        )
+        self.assertEqual(
+            self.formatter._convert_block_refs(
+                "((uuid-pdf))", FormatContext(target_folder="Wiki")
+            ),
+            "[PDF注释](../attachments/book.pdf)",
+        )
+
+    def test_concurrent_formatting_matches_serial(self):
+        """测试多线程并发格式化与串行结果一致"""
+        pages = []
+        for i in range(200):
+            filename = "page_a.md" if i % 2 == 0 else f"page_{i}.md"
+            folder = "Wiki" if i % 3 == 0 else ""
+            content = (
+                f"- 第 {i} 页 ((uuid-a)) {{{{embed ((uuid-a))}}}}\n"
+                f"- ![img](../assets/{i}.png) ((uuid-pdf))\n"
+            )
+            pages.append(
+                ({"content": content, "meta_properties": []}, filename, folder)
+            )
+
+        expected = [self.formatter.format_content(*page) for page in pages]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda page: self.formatter.format_content(*page), pages)
+            )
+
+        self.assertEqual(results, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+文件头部扫描测试
+验证 scan_header 只读取到第一行实际内容为止，分类检测结果与整体解析一致
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import logseq_parser
+from src.logseq_parser import LogseqParser
+from src.obsidian_formatter import ObsidianFormatter
+
+HEADER = """title:: 示例
+tags:: [[a]], [[b]]
+
+- #wiki 第一行
+- 正文 [[页面]]"""
+
+
+class TestScanHeader(unittest.TestCase):
+    """scan_header 测试"""
+
+    def setUp(self):
+        self.parser = LogseqParser()
+
+    def test_header_fields(self):
+        """测试 meta 属性、第一行实际内容和读取过的行"""
+        header = self.parser.scan_header(HEADER)
+
+        self.assertEqual([p.key for p in header["meta_properties"]], ["title", "tags"])
+        self.assertEqual(header["first_content_line"], "- #wiki 第一行")
+        self.assertEqual(header["header_lines"], HEADER.split("\n")[:4])
+
+    def test_tag_line_is_content(self):
+        """测试头部中的标签行是第一行实际内容"""
+        header = self.parser.scan_header("title:: a\n- #wiki\n- 正文")
+        self.assertEqual(header["first_content_line"], "- #wiki")
+
+    def test_no_content(self):
+        """测试只有 meta 属性的文件"""
+        header = self.parser.scan_header("title:: a\n\n")
+        self.assertIsNone(header["first_content_line"])
+
+    def test_stops_at_first_content(self):
+        """测试找到第一行实际内容后不再读取"""
+        consumed = []
+
+        def lines():
+            for line in HEADER.split("\n") + ["- 更多"] * 1000:
+                consumed.append(line)
+                yield line
+
+        self.parser.scan_header(lines())
+        self.assertEqual(len(consumed), 4)
+
+
+class TestScanHeaderFile(unittest.TestCase):
+    """scan_header_file 测试"""
+
+    def setUp(self):
+        self.parser = LogseqParser()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "page.md"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_decodes_only_header_lines(self):
+        """测试只解码文件开头的行"""
+        self.path.write_bytes(
+            (HEADER + "\n" + "- 正文\n" * 10000).encode("utf-8") + b"- \xff\n"
+        )
+        with mock.patch.object(
+            logseq_parser, "decode_utf8", wraps=logseq_parser.decode_utf8
+        ) as decode:
+            header = self.parser.scan_header_file(self.path)
+
+        self.assertEqual(decode.call_count, 4)
+        self.assertEqual(header["filename"], "page.md")
+        self.assertEqual(header["first_content_line"], "- #wiki 第一行")
+
+    def test_matches_full_parse(self):
+        """测试分类检测结果与整体解析一致"""
+        formatter = ObsidianFormatter(category_tag="wiki", category_folder="wiki")
+        samples = [
+            HEADER,
+            "- 正文 #wiki",
+            "title:: a\r\n\r\n- #wiki\r\n",
+            "\n\n- > #wiki 引用",
+            "alias:: x",
+        ]
+        for text in samples:
+            with self.subTest(text=text):
+                self.path.write_text(text, encoding="utf-8", newline="")
+                self.assertEqual(
+                    formatter.detect_category_folder(
+                        self.parser.scan_header_file(self.path)
+                    ),
+                    formatter.detect_category_folder(self.parser.parse_file(self.path)),
+                )
+
+    def test_missing_file(self):
+        """测试无法读取的文件抛出 ValueError"""
+        with self.assertRaises(ValueError):
+            self.parser.scan_header_file(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
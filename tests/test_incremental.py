@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+增量转换测试
+验证转换清单的记录，以及增量转换的结果与全量转换一致
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.converter import ConversionOptions, Converter
+from src.logseq_parser import LogseqParser
+from src.manifest import ConversionManifest
+
+
+class TestIncrementalConversion(unittest.TestCase):
+    """增量转换测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.logseq_dir = root / "logseq"
+        self.output_dir = root / "obsidian"
+        self.pages_dir = self.logseq_dir / "pages"
+        self.pages_dir.mkdir(parents=True)
+
+        self._write("a.md", "- 块 A\n  id:: aaaa-1111\n")
+        self._write("b.md", "- 引用 ((aaaa-1111))\n")
+        self._write("c.md", "- 独立页面 [[a]]\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, name, content):
+        path = self.pages_dir / name
+        path.write_text(content, encoding="utf-8")
+        # 确保修改时间变化，不受文件系统时间精度影响
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def _convert(self, output_dir=None, **options):
+        options.setdefault("copy_assets", False)
+        options.setdefault("write_report", False)
+        return Converter(
+            self.logseq_dir, output_dir or self.output_dir, ConversionOptions(**options)
+        ).run()
+
+    def _outputs(self, output_dir):
+        return {
+            p.relative_to(output_dir).as_posix(): p.read_text(encoding="utf-8")
+            for p in output_dir.rglob("*.md")
+        }
+
+    def _assert_matches_full_conversion(self):
+        full_dir = Path(self.temp_dir.name) / "full"
+        self._convert(output_dir=full_dir)
+        self.assertEqual(self._outputs(self.output_dir), self._outputs(full_dir))
+
+    def test_manifest_written(self):
+        """测试转换后在输出目录写入清单"""
+        self._convert()
+
+        data = json.loads(
+            (self.output_dir / ConversionManifest.FILENAME).read_text(encoding="utf-8")
+        )
+        entry = data["files"]["pages/a.md"]
+        self.assertEqual(entry["output_path"], "a.md")
+        self.assertEqual(entry["defined_uuids"], ["aaaa-1111"])
+        self.assertEqual(data["files"]["pages/b.md"]["referenced_uuids"], ["aaaa-1111"])
+        self.assertTrue(entry["content_hash"])
+
+    def test_unchanged_graph_is_skipped(self):
+        """测试未变化的图谱全部跳过"""
+        self._convert()
+        result = self._convert(incremental=True)
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.skipped, 3)
+        self._assert_matches_full_conversion()
+
+    def test_only_changed_file_reformatted(self):
+        """测试只重新转换变化的文件"""
+        self._convert()
+        self._write("c.md", "- 独立页面（已修改） [[a]]\n")
+
+        result = self._convert(incremental=True)
+        converted = {
+            c["source_file"] for c in result.conversions if not c.get("skipped")
+        }
+        self.assertEqual(converted, {"pages/c.md"})
+        self._assert_matches_full_conversion()
+
+    def test_dependents_reformatted_when_targets_move(self):
+        """测试被引用块的目标变化时，引用它的文件也会重新转换"""
+        self._convert()
+        # a.md 之前新增一个被引用的块，a.md 中块的编号随之变化
+        self._write("0.md", "- 新块\n  id:: zzzz-0000\n- ((zzzz-0000))\n")
+
+        result = self._convert(incremental=True)
+        converted = {
+            c["source_file"] for c in result.conversions if not c.get("skipped")
+        }
+        self.assertEqual(converted, {"pages/0.md", "pages/a.md", "pages/b.md"})
+        self._assert_matches_full_conversion()
+
+    def test_hls_link_dependents_reformatted(self):
+        """测试 PDF 高亮变化时，链接到它的页面也会重新转换"""
+        self._write(
+            "hls__book.md",
+            "file-path:: ../assets/book.pdf\n\n- 旧高亮\n  hl-page:: 1\n  id:: hl-1\n",
+        )
+        self._write("d.md", "- 见 [[hls__book#hl-1]]\n")
+        self._convert()
+
+        self._write(
+            "hls__book.md",
+            "file-path:: ../assets/book.pdf\n\n- 新高亮\n  hl-page:: 2\n  id:: hl-1\n",
+        )
+        result = self._convert(incremental=True)
+        converted = {
+            c["source_file"] for c in result.conversions if not c.get("skipped")
+        }
+        self.assertEqual(converted, {"pages/d.md"})
+        self.assertIn("新高亮", (self.output_dir / "d.md").read_text(encoding="utf-8"))
+        self._assert_matches_full_conversion()
+
+    def test_deleted_source_removes_output(self):
+        """测试删除源文件后清理对应的输出文件"""
+        self._convert()
+        (self.pages_dir / "c.md").unlink()
+
+        self._convert(incremental=True)
+        self.assertFalse((self.output_dir / "c.md").exists())
+        self._assert_matches_full_conversion()
+
+    def test_failed_page_keeps_previous_output(self):
+        """测试转换失败的页面保留上一次的输出文件，下次重新转换"""
+        self._convert()
+        self._write("c.md", "- 修改后的页面 [[a]]\n")
+        original = (self.output_dir / "c.md").read_text(encoding="utf-8")
+        parse_file = LogseqParser.parse_file
+
+        def fail_on_c(parser, path, *args, **kwargs):
+            if Path(path).name == "c.md":
+                raise ValueError("解析失败")
+            return parse_file(parser, path, *args, **kwargs)
+
+        with mock.patch.object(LogseqParser, "parse_file", fail_on_c):
+            result = self._convert(incremental=True)
+        self.assertFalse(result.success)
+        self.assertEqual(
+            (self.output_dir / "c.md").read_text(encoding="utf-8"), original
+        )
+
+        result = self._convert(incremental=True)
+        self.assertEqual(result.skipped, 2)
+        self._assert_matches_full_conversion()
+
+    def test_missing_output_is_rewritten(self):
+        """测试输出文件被删除时重新生成"""
+        self._convert()
+        (self.output_dir / "b.md").unlink()
+
+        result = self._convert(incremental=True)
+        self.assertEqual(result.skipped, 2)
+        self.assertTrue((self.output_dir / "b.md").exists())
+
+    def test_option_change_forces_full_conversion(self):
+        """测试转换选项变化时全量转换"""
+        self._convert()
+        result = self._convert(incremental=True, remove_top_level_bullets=True)
+        self.assertEqual(result.skipped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
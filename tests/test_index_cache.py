@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+索引缓存测试
+验证按修改时间和大小失效的 SQLite 索引缓存，以及使用缓存时转换结果不变
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.converter import ConversionOptions, Converter
+from src.index_cache import CachedPage, IndexCache
+from src.logseq_parser import LogseqParser
+from src.obsidian_formatter import ObsidianFormatter
+
+PAGE_A = """title:: A
+
+- 第一块
+  id:: 6470a1b2-0000-4000-8000-000000000001
+- 高亮 [[hls__book_1#6470a1b2-0000-4000-8000-0000000000aa]]"""
+
+PAGE_B = "- 引用 ((6470a1b2-0000-4000-8000-000000000001))"
+
+HLS_PAGE = """file-path:: ../assets/book_1.pdf
+
+- 高亮文本
+  id:: 6470a1b2-0000-4000-8000-0000000000aa
+  hl-page:: 3"""
+
+
+class TestIndexCache(unittest.TestCase):
+    """IndexCache 测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.cache_path = self.root / "cache" / "index.sqlite"
+        self.page = self.root / "page.md"
+        self.page.write_text(PAGE_A, encoding="utf-8")
+        self.entry = CachedPage(
+            content_hash="abc",
+            definitions=[("uuid-1", 4)],
+            references=[("uuid-2", 5), ("uuid-2", 9)],
+            hls_link_blocks=["block-a", "block-b"],
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_page_round_trip(self):
+        """测试页面记录在重新打开后仍然有效，文件变化后失效"""
+        with IndexCache(self.cache_path) as cache:
+            cache.put_page(self.page, cache.file_key(self.page), self.entry)
+
+        with IndexCache(self.cache_path) as cache:
+            self.assertEqual(
+                cache.get_page(self.page, cache.file_key(self.page)), self.entry
+            )
+
+        self.page.write_text(PAGE_A + "\n- 新块", encoding="utf-8")
+        with IndexCache(self.cache_path) as cache:
+            self.assertIsNone(cache.get_page(self.page, cache.file_key(self.page)))
+
+    def test_cached_source(self):
+        """测试未变化的文件不再调用 load，修改时间变化后重新读取"""
+        load = mock.Mock(return_value={"records": [{"id": "a"}], "error": None})
+        with IndexCache(self.cache_path) as cache:
+            cache.cached(self.page, load)
+        with IndexCache(self.cache_path) as cache:
+            self.assertEqual(cache.cached(self.page, load)["records"], [{"id": "a"}])
+        self.assertEqual(load.call_count, 1)
+
+        stat = self.page.stat()
+        os.utime(self.page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with IndexCache(self.cache_path) as cache:
+            cache.cached(self.page, load)
+        self.assertEqual(load.call_count, 2)
+
+    def test_prune_deleted_files(self):
+        """测试清理目录下本次没有用到的记录"""
+        other = self.root / "other.md"
+        other.write_text(PAGE_B, encoding="utf-8")
+        with IndexCache(self.cache_path) as cache:
+            for path in (self.page, other):
+                cache.put_page(path, cache.file_key(path), self.entry)
+
+        other.unlink()
+        with IndexCache(self.cache_path) as cache:
+            cache.get_page(self.page, cache.file_key(self.page))
+            cache.prune(self.root)
+
+        connection = sqlite3.connect(str(self.cache_path))
+        paths = [row[0] for row in connection.execute("SELECT path FROM pages")]
+        connection.close()
+        self.assertEqual(paths, [os.path.abspath(self.page)])
+
+    def test_version_mismatch_and_corrupt_file(self):
+        """测试版本不一致或文件损坏时丢弃旧缓存"""
+        with IndexCache(self.cache_path) as cache:
+            cache.put_page(self.page, cache.file_key(self.page), self.entry)
+        with mock.patch.object(IndexCache, "VERSION", IndexCache.VERSION + 1):
+            with IndexCache(self.cache_path) as cache:
+                self.assertIsNone(cache.get_page(self.page, cache.file_key(self.page)))
+
+        self.cache_path.write_bytes(b"not a database" * 100)
+        with IndexCache(self.cache_path) as cache:
+            self.assertIsNone(cache.get_page(self.page, cache.file_key(self.page)))
+
+
+class TestCachedHighlights(unittest.TestCase):
+    """使用缓存收集 PDF 高亮测试"""
+
+    def test_same_highlight_map(self):
+        """测试缓存的高亮映射与直接读取一致"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "pages").mkdir()
+            (root / "pages" / "hls__book_1.md").write_text(HLS_PAGE, encoding="utf-8")
+
+            expected = ObsidianFormatter()
+            expected.collect_pdf_highlights(temp_dir)
+            for _ in range(2):
+                with IndexCache(root / "index.sqlite") as cache:
+                    formatter = ObsidianFormatter()
+                    formatter.collect_pdf_highlights(temp_dir, cache.cached)
+                    self.assertEqual(
+                        formatter.pdf_highlight_map, expected.pdf_highlight_map
+                    )
+            self.assertEqual(cache.hits, 1)
+
+
+class TestConverterIndexCache(unittest.TestCase):
+    """转换器使用索引缓存测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.logseq_dir = root / "logseq"
+        self.cache_path = root / "index.sqlite"
+        (self.logseq_dir / "pages").mkdir(parents=True)
+        (self.logseq_dir / "pages" / "a.md").write_text(PAGE_A, encoding="utf-8")
+        (self.logseq_dir / "pages" / "b.md").write_text(PAGE_B, encoding="utf-8")
+        (self.logseq_dir / "pages" / "hls__book_1.md").write_text(
+            HLS_PAGE, encoding="utf-8"
+        )
+        self.root = root
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def convert(self, name, index_cache=None):
+        output_dir = self.root / name
+        options = ConversionOptions(
+            copy_assets=False, write_report=False, index_cache=index_cache
+        )
+        result = Converter(self.logseq_dir, output_dir, options).run()
+        self.assertTrue(result.success)
+        return {
+            path.relative_to(output_dir): path.read_bytes()
+            for path in output_dir.rglob("*.md")
+        }
+
+    def test_output_unchanged(self):
+        """测试冷缓存、热缓存的输出与不使用缓存一致"""
+        expected = self.convert("plain")
+        self.assertEqual(self.convert("cold", self.cache_path), expected)
+        self.assertEqual(self.convert("warm", self.cache_path), expected)
+
+    def test_unchanged_pages_not_read_when_indexing(self):
+        """测试再次构建索引时只读取变化的页面"""
+        options = ConversionOptions(index_cache=self.cache_path)
+        Converter(self.logseq_dir, self.root / "out", options).validate()
+
+        changed = self.logseq_dir / "pages" / "b.md"
+        changed.write_text(PAGE_B + "\n- 新块", encoding="utf-8")
+        with mock.patch.object(
+            LogseqParser,
+            "parse_file",
+            autospec=True,
+            side_effect=LogseqParser.parse_file,
+        ) as parse_file, mock.patch.object(
+            ObsidianFormatter, "read_hls_file", wraps=ObsidianFormatter.read_hls_file
+        ) as read_hls_file:
+            converter = Converter(self.logseq_dir, self.root / "out", options)
+            report = converter.validate()
+
+        self.assertEqual(
+            [call.args[1] for call in parse_file.call_args_list], [changed]
+        )
+        self.assertEqual(read_hls_file.call_count, 0)
+        self.assertEqual(
+            report, Converter(self.logseq_dir, self.root / "out").validate()
+        )
+        self.assertEqual(
+            converter.block_index.lookup("6470a1b2-0000-4000-8000-000000000001").line, 4
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
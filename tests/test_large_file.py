@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+大文件模式测试
+验证 mmap 逐行读取、只解析头部，以及流式转换的结果与整体读入一致
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.conversion_pipeline import LARGE_FILE_SYNTAX_PATTERN, content_hash
+from src.converter import ConversionOptions, Converter
+from src.logseq_parser import LogseqParser, MappedFile
+
+PAGE = """title:: 大页面
+tags:: [[inbox]], [[log]]
+
+- #wiki
+- 第一块 [[页面]] ((aaaa-1111))
+  id:: bbbb-2222
+  - 子块 ![图](../assets/a.png)
+    - {{embed ((bbbb-2222))}}
+-
+# 标题
+- > 引用 [[hls__book#hl-1]]
+"""
+
+
+class TestMappedFile(unittest.TestCase):
+    """MappedFile 测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "page.md"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lines_match_split(self):
+        """测试逐行结果与 str.split("\\n") 一致"""
+        for text in ["", "a", "a\n", "\n\n", "a\r\nb\n\nc", PAGE]:
+            with self.subTest(text=text):
+                self.path.write_text(text, encoding="utf-8", newline="")
+                with MappedFile(self.path) as mapped:
+                    self.assertEqual(list(mapped.iter_text_lines()), text.split("\n"))
+
+    def test_matching_lines_only(self):
+        """测试只产出带有语法标记的行"""
+        self.path.write_text(PAGE, encoding="utf-8")
+        with MappedFile(self.path) as mapped:
+            lines = [
+                line
+                for _, line in mapped.iter_numbered_matching_lines(
+                    LARGE_FILE_SYNTAX_PATTERN
+                )
+            ]
+
+        expected = [
+            line
+            for line in PAGE.split("\n")
+            if any(marker in line for marker in ("[[", "((", "id::", "!["))
+        ]
+        self.assertEqual(lines, expected)
+
+    def test_chunks_cover_file_on_line_boundaries(self):
+        """测试分块覆盖整个文件，且每块都在换行处结束"""
+        self.path.write_text(PAGE * 20, encoding="utf-8")
+        with MappedFile(self.path, chunk_size=64) as mapped:
+            chunks = list(mapped.iter_chunks())
+
+        self.assertEqual(b"".join(chunk for _, chunk in chunks), self.path.read_bytes())
+        self.assertTrue(all(chunk.endswith(b"\n") for _, chunk in chunks))
+        self.assertEqual(chunks[1][0], len(chunks[0][1]))
+
+
+class TestParseMappedFile(unittest.TestCase):
+    """parse_mapped_file 测试"""
+
+    def test_header_and_hash(self):
+        """测试 meta 属性、头部行、内容哈希和编码错误与整体解析一致"""
+        raw = PAGE.encode("utf-8") + b"- \xff\xfe\n"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "page.md"
+            path.write_bytes(raw)
+            parser = LogseqParser()
+            full = parser.parse_file(path)
+            with MappedFile(path, chunk_size=16) as mapped:
+                header = parser.parse_mapped_file(mapped)
+
+        self.assertEqual(header["meta_properties"], full["meta_properties"])
+        self.assertEqual(header["header_lines"], full["content"].split("\n")[:5])
+        self.assertEqual(header["content_hash"], content_hash(full["content"]))
+        self.assertEqual(
+            header["encoding_error_offsets"], full["encoding_error_offsets"]
+        )
+        self.assertNotIn("content", header)
+
+
+class TestLargeFileConversion(unittest.TestCase):
+    """大文件模式转换测试"""
+
+    def _convert(self, logseq_dir, output_dir, **options):
+        options.setdefault("copy_assets", False)
+        options.setdefault("write_report", False)
+        result = Converter(logseq_dir, output_dir, ConversionOptions(**options)).run()
+        outputs = {
+            p.relative_to(output_dir).as_posix(): p.read_text(encoding="utf-8")
+            for p in output_dir.rglob("*.md")
+        }
+        return result, outputs
+
+    def test_matches_normal_conversion(self):
+        """测试所有文件都使用大文件模式时，输出和摘要与整体读入一致"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            pages_dir = root / "logseq" / "pages"
+            pages_dir.mkdir(parents=True)
+            (pages_dir / "big.md").write_text(PAGE, encoding="utf-8")
+            (pages_dir / "a.md").write_text("- 块 A\n  id:: aaaa-1111\n", "utf-8")
+            (pages_dir / "meta.md").write_text("title:: 只有属性", "utf-8")
+            (pages_dir / "empty.md").write_text("", "utf-8")
+
+            variants = [
+                {},
+                {"remove_top_level_bullets": True},
+                {"category_tag": "wiki", "category_folder": "wiki", "jobs": 2},
+            ]
+            for index, options in enumerate(variants):
+                with self.subTest(options=options):
+                    normal, normal_outputs = self._convert(
+                        root / "logseq",
+                        root / f"normal{index}",
+                        large_file_threshold=0,
+                        **options,
+                    )
+                    large, large_outputs = self._convert(
+                        root / "logseq",
+                        root / f"large{index}",
+                        large_file_threshold=1,
+                        **options,
+                    )
+
+                    self.assertTrue(large.success)
+                    self.assertEqual(large_outputs, normal_outputs)
+                    self.assertEqual(
+                        [c.get("summary") for c in large.conversions],
+                        [c.get("summary") for c in normal.conversions],
+                    )
+
+    def test_negative_threshold_rejected(self):
+        """测试负数阈值"""
+        with self.assertRaises(ValueError):
+            Converter(Path("."), Path("."), ConversionOptions(large_file_threshold=-1))
+
+
+if __name__ == "__main__":
+    unittest.main()
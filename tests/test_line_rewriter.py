@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+行重写引擎测试
+验证单次扫描的 LineRewriter 与逐步调用各个转换方法的结果完全一致
+"""
+
+import random
+import sys
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.obsidian_formatter import FormatContext, ObsidianFormatter
+
+# 组成随机行的片段，覆盖各种语法以及相互嵌套、残缺的情况
+TOKENS = [
+    "普通文本",
+    " ",
+    "- ",
+    "  - ",
+    "- > ",
+    ">",
+    "!",
+    "(",
+    ")",
+    "[",
+    "]",
+    "{",
+    "}",
+    "[[页面]]",
+    "[[a%20b]]",
+    "[[a%5Db]]",
+    "[[a%28%28b]]",
+    "[[hls__book_1#pdf-1]]",
+    "[[hls__book_1]]",
+    "((uuid-a))",
+    "((uuid-b))",
+    "((uuid-missing))",
+    "((pdf-1))",
+    "((odd-file))",
+    "{{embed ((uuid-a))}}",
+    "{{embed ((uuid-missing))}}",
+    "{{video ../assets/v.mp4}}",
+    "{{youtube abc123}}",
+    "{{bilibili ../assets/BV1}}",
+    "{{youtube-timestamp 10}}",
+    "![img](../assets/a.png)",
+    "![](../assets/b.pdf)",
+    "![a](x)",
+    "id:: uuid-a",
+    "id:: uuid-unused",
+    "](",
+    "))",
+    "]]",
+    "}}",
+]
+
+
+class TestLineRewriter(unittest.TestCase):
+    """LineRewriter 与逐步转换一致性测试"""
+
+    def setUp(self):
+        self.formatter = ObsidianFormatter()
+        self.formatter.block_uuid_map = {
+            "uuid-a": ("page_a.md", "block1"),
+            "uuid-b": ("Wiki Page.md", "block2"),
+            "odd-file": ("a]](b((c.md", "block3"),
+        }
+        self.formatter.pdf_highlight_map = {
+            "pdf-1": {
+                "pdf_path": "../assets/book_1.pdf",
+                "page": "3",
+                "text": "高亮 ![x](y)",
+                "color": "",
+                "coordinates": None,
+                "screenshot_path": "../assets/shot.png",
+            }
+        }
+        self.contexts = [
+            FormatContext(),
+            FormatContext(filename="page_a.md", target_folder="Wiki"),
+        ]
+
+    def assert_same(self, line):
+        for context in self.contexts:
+            self.assertEqual(
+                self.formatter._process_line(line, {}, context),
+                self.formatter._convert_line_stepwise(line, context),
+                f"line={line!r} context={context}",
+            )
+
+    def test_plain_lines_use_fast_path(self):
+        """测试不含语法标记的行原样返回"""
+        line = "- 只有普通文本 (括号) [方括号] {花括号}"
+        self.assertIs(self.formatter._process_line(line, {}), line)
+
+    def test_common_syntax(self):
+        """测试常见语法"""
+        lines = [
+            "- 见 [[页面]] 和 ((uuid-a)) ![img](../assets/a.png)",
+            "  id:: uuid-a",
+            "  id:: uuid-unused",
+            "- > 引用 [[页面]]",
+            "- {{embed ((uuid-b))}} ((uuid-missing))",
+            "- [[a%20b]] [[a%5Db]]",
+        ]
+        for line in lines:
+            self.assert_same(line)
+
+    def test_nested_and_rare_syntax(self):
+        """测试嵌套语法和需要回退到逐步转换的语法"""
+        lines = [
+            "[[页面 ((uuid-a))]]",
+            "![a]((uuid-a))",
+            "![x ((uuid-a))](../assets/a.png)",
+            "!((pdf-1)) 和 ((pdf-1))",
+            "![[hls__book_1#pdf-1]]",
+            "![foo {{bilibili ../assets/BV1}}",
+            "{{video ((uuid-a))}}",
+            "((odd-file))](x)",
+            "[[a%28%28b]]))",
+        ]
+        for line in lines:
+            self.assert_same(line)
+
+    def test_random_lines(self):
+        """测试随机组合的行"""
+        rng = random.Random(7)
+        for _ in range(5000):
+            line = "".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 8)))
+            self.assert_same(line)
+
+
+if __name__ == "__main__":
+    unittest.main()
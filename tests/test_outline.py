@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+大纲树测试
+验证单遍构建的块树：父子关系、属性行归属，以及按原文顺序还原
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.logseq_parser import (
+    LogseqParser,
+    indent_level,
+    iter_outline,
+    iter_top_level_blocks,
+)
+
+CONTENT = """title:: 示例
+
+- 第一块 [[页面A]]
+  id:: 6470a1b2-0000-4000-8000-000000000001
+  collapsed:: true
+  第一块的第二行
+\t- 子块
+\t  - 孙块
+  - 第二个子块
+
+- 第二块
+# 标题
+段落
+  - 段落下的列表"""
+
+
+class TestIndentLevel(unittest.TestCase):
+    """indent_level 测试"""
+
+    def test_levels(self):
+        """测试制表符算 1 级，连续空格每 2 个算 1 级"""
+        cases = {"": 0, " ": 0, "  ": 1, "   ": 1, "\t": 1, "\t  ": 2, " \t ": 1}
+        for whitespace, level in cases.items():
+            with self.subTest(whitespace=whitespace):
+                self.assertEqual(indent_level(whitespace), level)
+
+
+class TestOutline(unittest.TestCase):
+    """大纲树测试"""
+
+    def setUp(self):
+        self.roots = LogseqParser().parse_outline(CONTENT)
+
+    def test_tree_structure(self):
+        """测试顶层块、子块和父节点"""
+        self.assertEqual(
+            [node.content for node in self.roots], ["第一块 [[页面A]]", "第二块", "# 标题"]
+        )
+        first = self.roots[0]
+        self.assertEqual([child.content for child in first.children], ["子块", "第二个子块"])
+        grandchild = first.children[0].children[0]
+        self.assertEqual(grandchild.content, "孙块")
+        self.assertIs(grandchild.parent.parent, first)
+        self.assertEqual(first.line_number, 3)
+
+        heading = self.roots[2]
+        self.assertFalse(heading.is_bullet)
+        self.assertEqual(heading.lines, ["# 标题", "段落"])
+        self.assertEqual(heading.children[0].content, "段落下的列表")
+
+    def test_properties_attached_to_owner(self):
+        """测试 id:: 和属性行、续行属于所在的块"""
+        first = self.roots[0]
+        self.assertEqual(first.block_id, "6470a1b2-0000-4000-8000-000000000001")
+        self.assertEqual(first.properties, {"collapsed": "true"})
+        self.assertEqual(first.lines[-1], "  第一块的第二行")
+        self.assertEqual(first.children[0].properties, {})
+
+    def test_lines_in_original_order(self):
+        """测试按先序遍历还原出原文"""
+        lines = CONTENT.split("\n")
+        roots = list(iter_outline(lines))
+        self.assertEqual([line for root in roots for line in root.iter_lines()], lines)
+
+    def test_top_level_blocks(self):
+        """测试按顶层块分组：缩进开头的块在层级回退时结束，列表项后的顶层文本另起一组"""
+        lines = ["  - 缩进开头", "    - 子块", "- 顶层", "", "  续行", "文本", "  - 子块"]
+        self.assertEqual(
+            list(iter_top_level_blocks(lines, first_line_number=10)),
+            [
+                (10, ["  - 缩进开头", "    - 子块"]),
+                (12, ["- 顶层", "", "  续行"]),
+                (15, ["文本", "  - 子块"]),
+            ],
+        )
+
+    def test_deep_nesting(self):
+        """测试很深的嵌套不会超出递归深度"""
+        lines = ["  " * depth + "- 块" for depth in range(5000)]
+        (root,) = iter_outline(lines)
+        self.assertEqual(len(list(root.walk())), 5000)
+        self.assertEqual(list(root.iter_lines()), lines)
+
+    def test_streams_top_level_blocks(self):
+        """测试每个顶层块结束时即产出，不需要读完所有行"""
+        consumed = []
+
+        def lines():
+            for line in CONTENT.split("\n"):
+                consumed.append(line)
+                yield line
+
+        roots = iter_outline(lines())
+        self.assertEqual(next(roots).lines, ["title:: 示例", ""])
+        self.assertEqual(consumed[-1], "- 第一块 [[页面A]]")
+        self.assertEqual(next(roots).content, "第一块 [[页面A]]")
+        self.assertEqual(consumed[-1], "- 第二块")
+
+
+if __name__ == "__main__":
+    unittest.main()
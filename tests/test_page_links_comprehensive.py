@@ -5,13 +5,14 @@
 """
 
 import sys
+import tempfile
 import unittest
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.obsidian_formatter import ObsidianFormatter
+from src.obsidian_formatter import FormatContext, ObsidianFormatter
 
 
 class TestPageLinksProcessing(unittest.TestCase):
@@ -163,5 +164,57 @@ class TestPageLinksProcessing(unittest.TestCase):
         )
 
 
+class TestHlsPageLinks(unittest.TestCase):
+    """测试 hls__ 高亮链接解析"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        pages_dir = Path(self.temp_dir.name) / "pages"
+        pages_dir.mkdir()
+        (pages_dir / "hls__book_1.md").write_text(
+            "file-path:: ../assets/book_1.pdf\n\n"
+            "- 第一条高亮\n  ls-type:: annotation\n  hl-page:: 3\n  id:: hl-1\n"
+            "- [:span]\n  hl-page:: 7\n  id:: hl-2\n",
+            encoding="utf-8",
+        )
+        self.formatter = ObsidianFormatter()
+        self.formatter.collect_pdf_highlights(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_highlights_collected_from_hls_files(self):
+        """测试从 hls__ 文件收集高亮，以 UUID 为键"""
+        self.assertEqual(set(self.formatter.pdf_highlight_map), {"hl-1", "hl-2"})
+
+    def test_hls_links_resolve(self):
+        """测试 hls__ 链接解析为 PDF 页面链接"""
+        test_cases = [
+            ("[[hls__book_1#hl-1]]", "[第一条高亮](attachments/book_1.pdf#page=3)"),
+            ("[[hls__book_1#hl-2]]", "[PDF页7](attachments/book_1.pdf#page=7)"),
+            ("[[hls__book_1#missing]]", "<!-- PDF高亮引用 (未找到): hls__book_1#missing -->"),
+            ("[[hls__book_1]]", "<!-- PDF高亮文件引用: hls__book_1 -->"),
+        ]
+        for input_text, expected_output in test_cases:
+            with self.subTest(input_text=input_text):
+                self.assertEqual(
+                    self.formatter._convert_page_links(input_text), expected_output
+                )
+
+    def test_hls_link_paths_point_to_attachments(self):
+        """测试 hls__ 链接中的 PDF 路径指向输出的附件目录（子文件夹中的页面使用 ../attachments/）"""
+        content = "- 见 [[hls__book_1#hl-1]]"
+        self.assertEqual(
+            self.formatter.format_content({"content": content}),
+            "- 见 [第一条高亮](attachments/book_1.pdf#page=3)",
+        )
+        self.assertEqual(
+            self.formatter._convert_page_links(
+                "[[hls__book_1#hl-2]]", FormatContext(target_folder="wiki")
+            ),
+            "[PDF页7](../attachments/book_1.pdf#page=7)",
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
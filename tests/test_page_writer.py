@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+后台写入测试
+验证有界队列的背压、按批输出消息、目录缓存，以及与直接写入的结果一致
+"""
+
+import io
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.conversion_pipeline import PageTask
+from src.converter import ConversionOptions, Converter, write_page
+from src.file_manager import FileManager
+from src.page_writer import PageWriter
+
+
+def make_task(name: str, content: str = "- 内容", subfolder: str = "") -> PageTask:
+    return PageTask(
+        source_path=Path(name),
+        relative_path=Path("pages") / name,
+        output_filename=name,
+        subfolder=subfolder,
+        content=content,
+    )
+
+
+class TestPageWriter(unittest.TestCase):
+    """PageWriter 测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+        self.file_manager = FileManager(self.output_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_writes_all_pages(self):
+        """测试所有页面都被写入，记录按序号返回，写入后释放内容"""
+        tasks = [
+            make_task(f"p{i}.md", f"- {i}", "wiki" if i % 2 else "") for i in range(50)
+        ]
+        with redirect_stdout(io.StringIO()):
+            with PageWriter(self.file_manager, write_page, threads=3) as writer:
+                for index, task in enumerate(tasks):
+                    writer.submit(index, task)
+
+        self.assertEqual(sorted(writer.records), list(range(50)))
+        self.assertTrue(all(record["success"] for record in writer.records.values()))
+        self.assertEqual((self.output_dir / "wiki" / "p1.md").read_text("utf-8"), "- 1")
+        self.assertTrue(all(task.content is None for task in tasks))
+
+    def test_backpressure(self):
+        """测试队列已满时 submit 阻塞"""
+        release = threading.Event()
+        submitted = []
+
+        def blocked_write(file_manager, task):
+            release.wait()
+            return {"success": True}
+
+        writer = PageWriter(
+            self.file_manager, blocked_write, threads=1, max_pending=2, batch_size=1
+        )
+
+        def produce():
+            for index in range(6):
+                writer.submit(index, make_task(f"p{index}.md"))
+                submitted.append(index)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        time.sleep(0.2)
+        # 写入线程取走 1 个，队列中 2 个，第 4 个阻塞
+        self.assertEqual(len(submitted), 3)
+
+        release.set()
+        producer.join()
+        self.assertEqual(len(writer.close()), 6)
+
+    def test_errors_become_records(self):
+        """测试写入函数抛出的异常记录为失败"""
+
+        def failing_write(file_manager, task):
+            raise OSError("磁盘已满")
+
+        with PageWriter(self.file_manager, failing_write, threads=1) as writer:
+            writer.submit(0, make_task("a.md"))
+
+        self.assertEqual(
+            writer.records[0],
+            {"source_file": "pages/a.md", "success": False, "error": "磁盘已满"},
+        )
+
+    def test_messages_logged_in_batches(self):
+        """测试写入消息按批通过 FileManager 的输出函数输出"""
+        logged = []
+        file_manager = FileManager(self.output_dir, log=logged.append)
+        with redirect_stdout(io.StringIO()) as output:
+            with PageWriter(
+                file_manager, write_page, threads=1, batch_size=100
+            ) as writer:
+                for index in range(20):
+                    writer.submit(index, make_task(f"p{index}.md"))
+
+        self.assertEqual("\n".join(logged).count("已写入文件"), 20)
+        self.assertLess(len(logged), 20)
+        self.assertEqual(output.getvalue(), "")
+
+
+class TestDirectoryCache(unittest.TestCase):
+    """FileManager 目录缓存测试"""
+
+    def test_mkdir_once_per_directory(self):
+        """测试同一子目录只创建一次"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_manager = FileManager(Path(temp_dir), log=lambda message: None)
+            with mock.patch.object(
+                Path, "mkdir", autospec=True, side_effect=Path.mkdir
+            ) as mkdir:
+                for index in range(10):
+                    file_manager.write_file(f"p{index}.md", "x", "wiki")
+                    file_manager.write_file(f"q{index}.md", "x", "")
+
+        self.assertEqual(mkdir.call_count, 1)
+
+
+class TestConverterWriteThreads(unittest.TestCase):
+    """转换器后台写入测试"""
+
+    def test_same_output_as_direct_write(self):
+        """测试后台写入与直接写入的输出和转换记录顺序一致"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            pages = root / "logseq" / "pages"
+            pages.mkdir(parents=True)
+            for index in range(30):
+                (pages / f"p{index}.md").write_text(
+                    f"- 第 {index} 页 [[p{index + 1}]]\n  - 子块 #wiki", encoding="utf-8"
+                )
+
+            outputs = []
+            for threads in (0, 4):
+                output_dir = root / f"out-{threads}"
+                options = ConversionOptions(
+                    write_threads=threads, copy_assets=False, write_report=False
+                )
+                with redirect_stdout(io.StringIO()):
+                    result = Converter(root / "logseq", output_dir, options).run()
+                self.assertTrue(result.success)
+                outputs.append(
+                    (
+                        [c["source_file"] for c in result.conversions],
+                        {
+                            path.relative_to(output_dir): path.read_bytes()
+                            for path in output_dir.rglob("*.md")
+                        },
+                    )
+                )
+
+        self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+按需解析结果测试
+验证 blocks、references 等字段只在第一次访问时计算，并且用法与 dict 一致
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.logseq_parser import LogseqParser, ParseResult
+from src.obsidian_formatter import ObsidianFormatter
+
+CONTENT = """title:: 示例
+- #wiki
+
+- 第一块 [[页面A]] ((uuid-1))
+  id:: 6470a1b2-0000-4000-8000-000000000001
+  - 子块 ![图](../assets/a.png) [[页面B]]"""
+
+
+class TestParseResult(unittest.TestCase):
+    """ParseResult 测试"""
+
+    def setUp(self):
+        self.parser = LogseqParser()
+        self.result = self.parser.parse_content(CONTENT, "example.md")
+
+    def test_mapping_interface(self):
+        """测试 in、len、遍历包含尚未计算的字段"""
+        self.assertIsInstance(self.result, ParseResult)
+        self.assertIn("blocks", self.result)
+        self.assertEqual(
+            set(self.result),
+            {
+                "filename",
+                "content",
+                "meta_properties",
+                "blocks",
+                "references",
+                "page_links",
+                "block_refs",
+                "assets",
+            },
+        )
+        self.assertEqual(len(self.result), 8)
+        self.assertIsNone(self.result.get("missing"))
+
+    def test_computed_on_first_access(self):
+        """测试只在第一次访问时计算，之后使用缓存"""
+        with mock.patch.object(
+            self.parser, "build_block_table", wraps=self.parser.build_block_table
+        ) as build, mock.patch.object(
+            self.parser, "iter_references", wraps=self.parser.iter_references
+        ) as references:
+            self.assertEqual(self.result["meta_properties"][0].key, "title")
+            ObsidianFormatter(category_tag="wiki").detect_category_folder(self.result)
+            self.assertEqual(build.call_count, 0)
+            self.assertEqual(references.call_count, 0)
+
+            self.assertEqual(len(self.result["blocks"]), 3)
+            self.assertEqual(len(self.result["blocks"]), 3)
+            self.assertEqual(build.call_count, 1)
+
+    def test_reference_groups(self):
+        """测试按类型分组的字段与完整引用列表一致"""
+        page_links = self.result["page_links"]
+        self.assertEqual([ref.target for ref in page_links], ["页面A", "页面B"])
+
+        fresh = self.parser.parse_content(CONTENT, "example.md")
+        references = fresh["references"]
+        for key, reference_type in (
+            ("page_links", "page_link"),
+            ("block_refs", "block_ref"),
+            ("assets", "asset"),
+        ):
+            with self.subTest(key=key):
+                expected = [ref for ref in references if ref.type == reference_type]
+                self.assertEqual(fresh[key], expected)
+                self.assertEqual(self.result[key], expected)
+
+    def test_assign_and_delete(self):
+        """测试赋值覆盖尚未计算的字段，删除后不再计算"""
+        self.result["blocks"] = []
+        self.assertEqual(self.result["blocks"], [])
+
+        del self.result["assets"]
+        self.assertNotIn("assets", self.result)
+        with self.assertRaises(KeyError):
+            self.result["assets"]
+
+        self.result["has_encoding_errors"] = False
+        self.assertIn("has_encoding_errors", self.result)
+
+    def test_equals_plain_dict(self):
+        """测试转换为 dict 后包含所有字段"""
+        data = dict(self.result)
+        self.assertEqual(data["blocks"], self.result["blocks"])
+        self.assertEqual(data, self.result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+解析器生成器接口测试
+验证 iter_blocks / iter_references 与 parse_content 的结果一致，并且按需逐行读取
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.file_manager import FileManager
+from src.logseq_parser import LogseqParser, iter_lines
+
+CONTENT = """title:: 示例
+cover:: ![封面](../assets/cover.png)
+- #tag
+
+- 第一块 [[页面A]] ((uuid-1))
+  id:: 6470a1b2-0000-4000-8000-000000000001
+  - 子块 ![图](../assets/a.png) [[页面B]]
+- 末尾"""
+
+
+class TestParserIterators(unittest.TestCase):
+    """iter_blocks / iter_references 测试"""
+
+    def setUp(self):
+        self.parser = LogseqParser()
+        self.parsed = self.parser.parse_content(CONTENT, "example.md")
+
+    def test_iter_lines(self):
+        """测试逐行产出与 split 一致"""
+        for text in ["", "a", "a\n", "\n\nb"]:
+            self.assertEqual(list(iter_lines(text)), text.split("\n"))
+
+    def test_matches_parse_content(self):
+        """测试与 parse_content 的 blocks、references 一致"""
+        self.assertEqual(list(self.parser.iter_blocks(CONTENT)), self.parsed["blocks"])
+        self.assertEqual(
+            list(self.parser.iter_references(CONTENT)), self.parsed["references"]
+        )
+        for key, reference_type in (
+            ("page_links", "page_link"),
+            ("block_refs", "block_ref"),
+            ("assets", "asset"),
+        ):
+            self.assertEqual(
+                list(self.parser.iter_references(CONTENT, types=[reference_type])),
+                self.parsed[key],
+            )
+
+    def test_include_meta(self):
+        """测试包含 meta 区域中的引用"""
+        assets = self.parser.iter_references(
+            CONTENT, types=["asset"], include_meta=True
+        )
+        self.assertEqual(
+            [ref.target for ref in assets], ["../assets/cover.png", "../assets/a.png"]
+        )
+
+    def test_consumes_lines_lazily(self):
+        """测试只读取产出下一项所需的行"""
+        consumed = []
+
+        def lines():
+            for line in CONTENT.split("\n"):
+                consumed.append(line)
+                yield line
+
+        blocks = self.parser.iter_blocks(lines())
+        first = next(blocks)
+        self.assertEqual(first.content, "- 第一块 [[页面A]] ((uuid-1))")
+        self.assertEqual(len(consumed), 5)
+
+
+class TestIteratorCallers(unittest.TestCase):
+    """使用生成器接口的调用方测试"""
+
+    def test_get_asset_paths(self):
+        """测试 get_asset_paths 只返回存在的 ../assets/ 资源"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            logseq_dir = Path(temp_dir)
+            (logseq_dir / "assets").mkdir()
+            (logseq_dir / "assets" / "cover.png").write_bytes(b"")
+            (logseq_dir / "assets" / "a.png").write_bytes(b"")
+
+            paths = FileManager(logseq_dir / "out", dry_run=True).get_asset_paths(
+                logseq_dir, CONTENT + "\n- ![缺失](../assets/missing.png)"
+            )
+
+        self.assertEqual(
+            [p.name for p in paths],
+            ["cover.png", "a.png"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
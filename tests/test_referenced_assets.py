@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+引用资源复制测试
+验证 referenced 模式只复制页面引用的资源文件（包括 PDF 高亮截图），
+以及增量转换、索引缓存、大文件模式下收集到的资源一致
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.conversion_pipeline import asset_relative_path
+from src.converter import ASSET_MODE_REFERENCED, ConversionOptions, Converter
+
+HIGHLIGHT_UUID = "6470a1b2-0000-4000-8000-000000000001"
+HLS_UUID = "6470a1b2-0000-4000-8000-0000000000aa"
+
+PAGE_A = f"""cover:: ![封面](../assets/cover.png)
+
+- 图片 ![图](../assets/images/a.png)
+- 编码的文件名 ![图](../assets/my%20photo.png)
+- 高亮 (({HIGHLIGHT_UUID}))"""
+
+PAGE_B = f"""- 高亮链接 [[hls__notes_1#{HLS_UUID}]]
+- 不存在的资源 ![缺失](../assets/missing.png)
+- 目录之外 ![外部](../assets/../secret.txt)"""
+
+HLS_PAGE = f"""file-path:: ../assets/notes.pdf
+
+- 笔记高亮
+  id:: {HLS_UUID}
+  hl-page:: 2"""
+
+BOOK_EDN = f"""{{:highlights [{{:id #uuid "{HIGHLIGHT_UUID}", :page 3,
+  :position {{:bounding {{:x1 1, :y1 2, :x2 3, :y2 4, :width 5, :height 6}}, :page 3}}}}]}}"""
+
+EXPECTED = [
+    "book.pdf",
+    "book/3_6470a1b2-0000-4000-8000-000000000001_1690000000000.png",
+    "cover.png",
+    "images/a.png",
+    "my photo.png",
+    "notes.pdf",
+]
+
+
+class TestAssetRelativePath(unittest.TestCase):
+    """asset_relative_path 测试"""
+
+    def test_prefixes(self):
+        """测试各种资源路径前缀，以及指向 assets 目录之外的路径"""
+        self.assertEqual(asset_relative_path("../assets/a/b.png"), "a/b.png")
+        self.assertEqual(asset_relative_path("../attachments/book.pdf"), "book.pdf")
+        self.assertEqual(asset_relative_path("attachments/book/1.png"), "book/1.png")
+        self.assertEqual(asset_relative_path("../assets/a/../b.png"), "b.png")
+        self.assertIsNone(asset_relative_path("../assets/../secret.txt"))
+        self.assertIsNone(asset_relative_path("https://example.com/a.png"))
+
+
+class TestReferencedAssets(unittest.TestCase):
+    """referenced 资源复制模式测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.logseq_dir = self.root / "logseq"
+        pages = self.logseq_dir / "pages"
+        pages.mkdir(parents=True)
+        (pages / "a.md").write_text(PAGE_A, encoding="utf-8")
+        (pages / "b.md").write_text(PAGE_B, encoding="utf-8")
+        (pages / "hls__notes_1.md").write_text(HLS_PAGE, encoding="utf-8")
+
+        assets = self.logseq_dir / "assets"
+        (assets / "book").mkdir(parents=True)
+        (assets / "images").mkdir()
+        (assets / "book.edn").write_text(BOOK_EDN, encoding="utf-8")
+        for name in EXPECTED + ["orphan.png", "images/orphan.png", "book/other.png"]:
+            (assets / name).write_bytes(name.encode("utf-8"))
+        (self.root / "secret.txt").write_text("secret", encoding="utf-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def convert(self, name="out", **options):
+        output_dir = self.root / name
+        options = ConversionOptions(
+            asset_mode=ASSET_MODE_REFERENCED, write_report=False, **options
+        )
+        output = io.StringIO()
+        with redirect_stdout(output):
+            result = Converter(self.logseq_dir, output_dir, options).run()
+        self.assertTrue(result.success)
+        attachments = output_dir / "attachments"
+        copied = sorted(
+            path.relative_to(attachments).as_posix()
+            for path in attachments.rglob("*")
+            if path.is_file()
+        )
+        return copied, output.getvalue()
+
+    def test_only_referenced_assets_copied(self):
+        """测试只复制页面引用的资源、PDF 和高亮截图，缺失的资源给出警告"""
+        copied, output = self.convert()
+        self.assertEqual(copied, EXPECTED)
+        self.assertIn("引用的资源文件不存在", output)
+        self.assertIn("missing.png", output)
+        self.assertNotIn("secret", output)
+
+    def test_incremental_rerun(self):
+        """测试增量转换时未重新读取的页面仍然计入引用"""
+        self.convert(incremental=True)
+        for path in (self.root / "out" / "attachments").rglob("*.png"):
+            path.unlink()
+        copied, _ = self.convert(incremental=True)
+        self.assertEqual(copied, EXPECTED)
+
+    def test_index_cache_and_large_files(self):
+        """测试使用索引缓存、大文件模式时收集到的资源不变"""
+        cache = self.root / "index.sqlite"
+        for name in ("cold", "warm"):
+            with self.subTest(name):
+                copied, _ = self.convert(name, index_cache=cache)
+                self.assertEqual(copied, EXPECTED)
+
+        copied, _ = self.convert("large", large_file_threshold=1)
+        self.assertEqual(copied, EXPECTED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+稳定块ID测试
+验证 stable 模式下块ID只由 UUID 决定，不随文件遍历顺序和其他页面的增删而变化
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import obsidian_formatter
+from src.converter import ConversionOptions, Converter
+from src.obsidian_formatter import BLOCK_ID_STABLE, ObsidianFormatter
+
+
+def build_map(pages):
+    """按给定顺序为页面分配 stable 块ID，返回块ID映射"""
+    formatter = ObsidianFormatter(block_id_mode=BLOCK_ID_STABLE)
+    for _, data in pages:
+        formatter.collect_referenced_uuids(data)
+    for filename, data in pages:
+        formatter.collect_block_mappings(filename, data)
+    return formatter.block_uuid_map
+
+
+class TestStableBlockIds(unittest.TestCase):
+    """stable 块ID模式测试"""
+
+    def setUp(self):
+        self.pages = [
+            ("a.md", {"content": "- A\n  id:: uuid-a\n- ((uuid-b))"}),
+            ("b.md", {"content": "- B\n  id:: uuid-b\n- ((uuid-a))"}),
+        ]
+
+    def test_ids_independent_of_order(self):
+        """测试块ID与遍历顺序无关"""
+        forward = build_map(self.pages)
+        backward = build_map(list(reversed(self.pages)))
+
+        self.assertEqual(forward, backward)
+        self.assertRegex(forward["uuid-a"][1], r"^block-[0-9a-f]{8}$")
+        self.assertEqual(forward["uuid-a"][0], "a.md")
+
+    def test_ids_unaffected_by_new_pages(self):
+        """测试新增页面不改变已有块的ID"""
+        before = build_map(self.pages)
+        new_page = ("0.md", {"content": "- 新块\n  id:: uuid-0\n- ((uuid-0))"})
+        after = build_map([new_page] + self.pages)
+
+        self.assertEqual(after["uuid-a"], before["uuid-a"])
+        self.assertEqual(after["uuid-b"], before["uuid-b"])
+
+    def test_collisions_use_full_hash(self):
+        """测试短ID冲突时改用完整哈希，且结果与顺序无关"""
+        pages = [
+            (f"p{i}.md", {"content": f"- 块\n  id:: uuid-{i}\n- ((uuid-{i}))"})
+            for i in range(40)
+        ]
+        # 1 位十六进制前缀必然冲突
+        with mock.patch.object(obsidian_formatter, "STABLE_BLOCK_ID_LENGTH", 1):
+            forward = build_map(pages)
+            backward = build_map(list(reversed(pages)))
+
+        self.assertEqual(forward, backward)
+        block_ids = [block_id for _, block_id in forward.values()]
+        self.assertEqual(len(block_ids), len(set(block_ids)))
+
+    def test_summary_counts_stable_ids(self):
+        """测试转换摘要对两种模式的块ID统计一致"""
+        data = {"content": "- A ((uuid-a))\n  id:: uuid-a", "meta_properties": []}
+        counts = []
+        for formatter in (
+            ObsidianFormatter(),
+            ObsidianFormatter(block_id_mode=BLOCK_ID_STABLE),
+        ):
+            formatter.collect_referenced_uuids(data)
+            formatter.collect_block_mappings("a.md", data)
+            converted = formatter.format_content(data, "a.md")
+            summary = formatter.get_conversion_summary(data, converted)
+            counts.append(summary["converted"]["block_ids"])
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertGreater(counts[1], 0)
+
+    def test_unknown_mode_rejected(self):
+        """测试未知的块ID模式"""
+        with self.assertRaises(ValueError):
+            ObsidianFormatter(block_id_mode="random")
+
+
+class TestStableBlockIdsIncremental(unittest.TestCase):
+    """stable 模式下的增量转换测试"""
+
+    def test_new_page_does_not_rewrite_others(self):
+        """测试新增页面时只转换新页面"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            logseq_dir = Path(temp_dir) / "logseq"
+            pages_dir = logseq_dir / "pages"
+            pages_dir.mkdir(parents=True)
+            (pages_dir / "a.md").write_text("- 块 A\n  id:: aaaa-1111\n", "utf-8")
+            (pages_dir / "b.md").write_text("- 引用 ((aaaa-1111))\n", "utf-8")
+
+            options = ConversionOptions(
+                copy_assets=False,
+                write_report=False,
+                incremental=True,
+                block_id_mode=BLOCK_ID_STABLE,
+            )
+            output_dir = Path(temp_dir) / "obsidian"
+            Converter(logseq_dir, output_dir, options).run()
+
+            new_page = pages_dir / "0.md"
+            new_page.write_text("- 新块\n  id:: zzzz-0000\n- ((zzzz-0000))\n", "utf-8")
+            stat = new_page.stat()
+            os.utime(new_page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+            result = Converter(logseq_dir, output_dir, options).run()
+            converted = {
+                c["source_file"] for c in result.conversions if not c.get("skipped")
+            }
+            self.assertEqual(converted, {"pages/0.md"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+存储后端测试
+验证转换结果可以写入内存或只统计写入量，内容与写入本地目录时一致
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.converter import ConversionOptions, Converter
+from src.file_manager import FileManager
+from src.storage import LocalStorage, MemoryStorage, NullStorage, StorageBackend
+
+
+class TestStorageBackends(unittest.TestCase):
+    """各存储后端的基本操作测试"""
+
+    def test_read_exists_remove(self):
+        """测试本地目录和内存后端写入后可以读取和删除"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for storage in (LocalStorage(Path(temp_dir) / "out"), MemoryStorage()):
+                with self.subTest(storage=type(storage).__name__):
+                    storage.write_lines("sub/a.md", iter(["- 一", "- 二"]))
+                    storage.write_bytes("data.json", b"{}")
+                    self.assertTrue(storage.exists("sub/a.md"))
+                    self.assertEqual(
+                        storage.read_bytes("sub/a.md"), "- 一\n- 二".encode("utf-8")
+                    )
+                    self.assertTrue(storage.remove("data.json"))
+                    self.assertFalse(storage.remove("data.json"))
+                    self.assertIsNone(storage.read_bytes("data.json"))
+
+    def test_remove_stays_in_root(self):
+        """测试只删除输出目录之内的文件，删除失败时给出警告而不中断"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            outside = root / "outside.md"
+            outside.write_text("保留", encoding="utf-8")
+            (root / "out" / "folder.md").mkdir(parents=True)
+            messages = []
+            storage = LocalStorage(root / "out", log=messages.append)
+
+            self.assertFalse(storage.remove("../outside.md"))
+            self.assertFalse(storage.remove(str(outside)))
+            self.assertTrue(outside.exists())
+            self.assertFalse(storage.remove("folder.md"))
+            self.assertEqual(len(messages), 3)
+
+    def test_incomplete_backend(self):
+        """测试未实现全部抽象方法的后端在创建时报错"""
+
+        class WriteOnly(StorageBackend):
+            def write_lines(self, name, lines):
+                pass
+
+        with self.assertRaises(TypeError):
+            WriteOnly()
+
+    def test_null_storage_counts(self):
+        """测试空后端不保存内容，只统计文件数和字节数"""
+        storage = NullStorage()
+        file_manager = FileManager(
+            Path("out"), log=lambda message: None, storage=storage
+        )
+        file_manager.write_file("a.md", "- 第一行\n- 第二行")
+        file_manager.write_manifest({}, "manifest.json")
+        self.assertEqual(storage.files_written, 2)
+        self.assertEqual(storage.bytes_written, len("- 第一行\n- 第二行".encode("utf-8")) + 2)
+        self.assertFalse(storage.exists("a.md"))
+        self.assertFalse(Path("out").exists())
+
+
+class TestConverterStorage(unittest.TestCase):
+    """转换器使用内存后端的测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.logseq_dir = self.root / "logseq"
+        (self.logseq_dir / "pages").mkdir(parents=True)
+        (self.logseq_dir / "journals").mkdir()
+        (self.logseq_dir / "assets").mkdir()
+        for index in range(12):
+            (self.logseq_dir / "pages" / f"p{index}.md").write_text(
+                f"- 第 {index} 页 [[p{index + 1}]] ![图](../assets/a.png)",
+                encoding="utf-8",
+            )
+        (self.logseq_dir / "journals" / "2024_01_01.md").write_text(
+            "- 日记", encoding="utf-8"
+        )
+        (self.logseq_dir / "assets" / "a.png").write_bytes(b"png")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def convert(self, output: Path, **options):
+        options = ConversionOptions(write_report=False, **options)
+        with redirect_stdout(io.StringIO()):
+            result = Converter(self.logseq_dir, output, options).run()
+        self.assertTrue(result.success)
+        return result
+
+    def test_same_content_as_directory(self):
+        """测试内存中的文件与写入目录时一致（串行、并行、大文件模式）"""
+        output_dir = self.root / "vault"
+        self.convert(output_dir)
+        expected = {
+            path.relative_to(output_dir).as_posix(): path.read_bytes()
+            for path in output_dir.rglob("*")
+            if path.is_file()
+        }
+        self.assertIn("attachments/a.png", expected)
+
+        for options in ({}, {"jobs": 2}, {"large_file_threshold": 1}):
+            with self.subTest(options=options):
+                storage = MemoryStorage()
+                self.convert(self.root / "memory", storage=storage, **options)
+                self.assertEqual(storage.files, expected)
+                self.assertFalse((self.root / "memory").exists())
+
+    def test_incremental(self):
+        """测试内存后端中保留的清单用于增量转换"""
+        storage = MemoryStorage()
+        self.assertEqual(
+            self.convert(self.root, storage=storage, incremental=True).skipped, 0
+        )
+        result = self.convert(self.root, storage=storage, incremental=True)
+        self.assertEqual(result.skipped, 13)
+
+        del storage.files["p3.md"]
+        result = self.convert(self.root, storage=storage, incremental=True)
+        self.assertEqual(result.skipped, 12)
+        self.assertIn("p3.md", storage.files)
+
+    def test_null_storage_parallel(self):
+        """测试空后端在并行格式化时由主进程统计写入"""
+        storage = NullStorage()
+        self.convert(self.root / "null", storage=storage, jobs=2)
+        self.assertEqual(storage.files_written, 14)
+        self.assertFalse((self.root / "null").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()